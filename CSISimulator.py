@@ -101,7 +101,164 @@ class CSISimulator:
         except KeyboardInterrupt:
             print("\nSimülasyon durduruldu.")
 
+# Çoklu cihaz modu: durum kodları ve label.csv karşılıkları
+STATES = ("empty", "walking", "fall", "lying_down")
+EMPTY, WALKING, FALL, LYING_DOWN = range(len(STATES))
+LABELS = {"empty": "no_person", "walking": "walking", "fall": "get_down", "lying_down": "lying"}
+
+class MultiDeviceSimulator:
+    def __init__(self, num_devices=1000, num_subcarriers=1026, rate_hz=100, seed=None, noise_pool_size=1 << 22):
+        """
+        CSISimulator'ın vektörel hali: her çağrıda (cihaz, paket, alt taşıyıcı) bloğu tek seferde üretilir.
+        Her sanal cihazın kendi empty/walking/fall/lying_down durum makinesi vardır, tüm cihazlar
+        aynı NumPy işlemleriyle ilerletilir (cihaz başına Python döngüsü yok).
+        num_subcarriers: Paket boyutu (modelle aynı olması için 1026).
+        rate_hz: Cihaz başına saniyedeki paket sayısı.
+        noise_pool_size: Gürültü önceden üretilmiş bir havuzdan rastgele ofsetlerle okunur;
+            her pakete yeni normal sayı üretmek binlerce cihazda tek çekirdeği doldurur.
+            Havuz en az iki blok boyutuna büyütülür.
+        """
+        self.num_devices = num_devices
+        self.num_subcarriers = num_subcarriers
+        self.rate_hz = rate_hz
+        self.rng = np.random.default_rng(seed)
+        self.device_ids = [f"sim-{i:05d}" for i in range(num_devices)]
+
+        # Cihaza özgü ortam: temel seviye 40 civarı, alt taşıyıcılar arasında küçük sabit fark
+        self.base = (40.0 + self.rng.normal(0, 2.0, (num_devices, 1))
+                     + self.rng.normal(0, 1.0, (num_devices, num_subcarriers))).astype(np.float32)
+        self.state = np.zeros(num_devices, dtype=np.int8)
+        self.packets_in_state = np.zeros(num_devices, dtype=np.int64)
+        self.packet_index = 0
+        # Başlangıçta herkes aynı anda hareket etmesin
+        self.phase = self.rng.uniform(0, 2 * np.pi, num_devices)
+
+        # Durum başına gürültü seviyesi ve sabit etki (CSISimulator.generate_packet ile aynı)
+        self.noise_level = np.array([0.5, 3.0, 8.0, 0.8], dtype=np.float32)
+        self.offset = np.array([0.0, 0.0, 0.0, -10.0], dtype=np.float32)
+        self.walk_angles = np.linspace(0, 3 * np.pi, num_subcarriers).astype(np.float32)
+        self._sin_s, self._cos_s = np.sin(self.walk_angles), np.cos(self.walk_angles)
+
+        # 3 Hz'deki geçiş olasılıkları (%5, %4, %10: randint(0, 100) ile dice > 95 / > 96 / > 90) saniye başına orana, sonra paket başına olasılığa çevrilir
+        per_tick = {EMPTY: 5 / 101, WALKING: 4 / 101, LYING_DOWN: 10 / 101}
+        self.transition_p = np.zeros(len(STATES))
+        for state, p in per_tick.items():
+            self.transition_p[state] = 1 - np.exp(np.log(1 - p) * 3 / rate_hz)
+        self.next_state = np.array([WALKING, FALL, LYING_DOWN, WALKING], dtype=np.int8)
+        self.fall_packets = max(1, int(round(0.6 * rate_hz)))  # düşme ~0.6 sn sürer
+
+        self.noise_pool = self.rng.standard_normal(noise_pool_size, dtype=np.float32)
+
+    def _advance(self, packets):
+        """Durum makinesini paket paket ilerletir; döngü sadece paket sayısı kadar, cihazlar vektörel."""
+        states = np.empty((self.num_devices, packets), dtype=np.int8)
+        for p in range(packets):
+            self.packets_in_state += 1
+            change = self.rng.random(self.num_devices) < self.transition_p[self.state]
+            change |= (self.state == FALL) & (self.packets_in_state >= self.fall_packets)
+            self.state = np.where(change, self.next_state[self.state], self.state)
+            self.packets_in_state[change] = 0
+            states[:, p] = self.state
+        return states
+
+    def _noise(self, shape):
+        """Havuzun rastgele bir noktasından başlayan bitişik bir dilim (kopya yok)."""
+        size = int(np.prod(shape))
+        if len(self.noise_pool) < 2 * size:
+            self.noise_pool = self.rng.standard_normal(2 * size, dtype=np.float32)
+        start = int(self.rng.integers(0, len(self.noise_pool) - size))
+        return self.noise_pool[start:start + size].reshape(shape)
+
+    def step(self, packets=10, out=None):
+        """
+        Sonraki `packets` paketi üretir.
+        out: Tekrar kullanılacak (num_devices, packets, num_subcarriers) float32 dizi; her blokta yeni
+            bellek ayırmak (page fault) üretim süresinin önemli bir kısmıdır.
+        Returns (csi, states, timestamps_ns):
+            csi: (num_devices, packets, num_subcarriers) float32 genlik
+            states: (num_devices, packets) int8 durum kodu (STATES, doğru etiket)
+            timestamps_ns: (packets,) int64, tüm cihazlar için ortak zaman damgası
+        """
+        states = self._advance(packets)
+        t = (self.packet_index + np.arange(packets)) / self.rate_hz
+        self.packet_index += packets
+
+        shape = (self.num_devices, packets, self.num_subcarriers)
+        csi = out if out is not None and out.shape == shape else np.empty(shape, dtype=np.float32)
+        np.multiply(self._noise(shape), self.noise_level[states][:, :, None], out=csi)
+        csi += self.base[:, None, :]
+        csi += self.offset[states][:, :, None]
+
+        # Yürüme: sin(açı + 5t) * 5 = sin(açı)cos(5t) + cos(açı)sin(5t), alt taşıyıcı ekseninde tekrar hesaplanmaz
+        walking = states == WALKING
+        if walking.any():
+            d, p = np.nonzero(walking)
+            b = t[p] * 5 + self.phase[d]
+            csi[d, p] += 5 * (np.cos(b)[:, None] * self._sin_s + np.sin(b)[:, None] * self._cos_s)
+
+        # Düşme: her pakette ani sıçrama (spike)
+        falling = states == FALL
+        if falling.any():
+            d, p = np.nonzero(falling)
+            csi[d, p] += self.rng.choice(np.array([20, -20, 25], dtype=np.float32), size=(len(d), self.num_subcarriers))
+
+        # Negatif değerleri engelle (Genlik negatif olamaz)
+        np.abs(csi, out=csi)
+        timestamps_ns = (t * 1e9).astype(np.int64)
+        return csi, states, timestamps_ns
+
+    def labels(self, states):
+        """Durum kodlarını label.csv etiketlerine çevirir."""
+        return np.array([LABELS[s] for s in STATES])[states]
+
+    def run(self, duration=None, block_packets=10, realtime=True):
+        """
+        Gerçek zamanlı (rate_hz) veya olabildiğince hızlı blok üretir ve saniyede bir özet yazdırır.
+        """
+        print(f"--- Çoklu Cihaz CSI Simülatörü: {self.num_devices} cihaz x {self.rate_hz} Hz x "
+              f"{self.num_subcarriers} alt taşıyıcı ---")
+        interval = block_packets / self.rate_hz
+        start = last_report = time.perf_counter()
+        generated = 0
+        busy = 0.0
+        buffer = None
+        try:
+            while duration is None or time.perf_counter() - start < duration:
+                block_start = time.perf_counter()
+                csi, states, _ = self.step(block_packets, out=buffer)
+                buffer = csi
+                busy += time.perf_counter() - block_start
+                generated += csi.shape[0] * csi.shape[1]
+
+                now = time.perf_counter()
+                if now - last_report >= 1.0:
+                    counts = np.bincount(self.state, minlength=len(STATES))
+                    summary = " ".join(f"{name}={n}" for name, n in zip(STATES, counts))
+                    print(f"[{time.strftime('%H:%M:%S')}] {generated / (now - last_report):,.0f} paket/sn | "
+                          f"CPU %{100 * busy / (now - last_report):.0f} | {summary}")
+                    last_report, generated, busy = now, 0, 0.0
+
+                if realtime:
+                    sleep_time = interval - (time.perf_counter() - block_start)
+                    if sleep_time > 0:
+                        time.sleep(sleep_time)
+        except KeyboardInterrupt:
+            print("\nSimülasyon durduruldu.")
+
 # Çalıştır
 if __name__ == "__main__":
-    sim = CSISimulator(rate_hz=3)
-    sim.run()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="CSI simülatörü. --devices verilmezse tek cihazlı 3 Hz demo çalışır.")
+    parser.add_argument("--devices", type=int, default=None, help="Çoklu cihaz modu: sanal cihaz sayısı")
+    parser.add_argument("--subcarriers", type=int, default=1026)
+    parser.add_argument("--rate", type=int, default=100, help="Cihaz başına paket/sn")
+    parser.add_argument("--block", type=int, default=10, help="Çağrı başına cihaz başına paket")
+    parser.add_argument("--duration", type=float, default=None, help="Saniye (varsayılan: Ctrl+C'ye kadar)")
+    parser.add_argument("--max-speed", action="store_true", help="Beklemeden üret (kapasite ölçümü)")
+    args = parser.parse_args()
+    if args.devices is None:
+        sim = CSISimulator(rate_hz=3)
+        sim.run()
+    else:
+        sim = MultiDeviceSimulator(args.devices, args.subcarriers, args.rate)
+        sim.run(args.duration, args.block, realtime=not args.max_speed)
\ No newline at end of file
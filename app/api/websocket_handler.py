@@ -1,29 +1,251 @@
 from fastapi import WebSocket
-from typing import List
+from typing import Dict, List, Set
+import asyncio
 import json
+import logging
+import os
+import time
+from app.core.metrics import Counter, Gauge, Histogram
+
+try:
+    import msgpack
+except ImportError:  # optional: pip install msgpack for binary frames
+    msgpack = None
+
+logger = logging.getLogger("ConnectionManager")
+
+BROADCAST_SECONDS = Histogram("csi_ws_broadcast_seconds", "ConnectionManager.broadcast latency (encode and enqueue)")
+FRAMES_QUEUED = Counter("csi_ws_frames_queued_total", "Frames put on client send queues")
+
+# Topics a message can be published on, clients receive the union of their subscriptions
+ALL_TOPICS = "*"
+TOPIC_PREDICTIONS = "predictions"
+TOPIC_EMERGENCY = "emergency"
+TOPIC_LIVE = "live"
+
+def device_topic(device_id):
+    return f"device:{device_id}"
+
+def magnitude_topic(rate, device_id=None):
+    """Downsampled magnitude stream: magnitude:<rate> for all devices, magnitude:<device>:<rate> for one."""
+    return f"magnitude:{rate}" if device_id is None else f"magnitude:{device_id}:{rate}"
+
+ENCODING_JSON = "json"
+ENCODING_MSGPACK = "msgpack"
+
+def encode_frame(message: dict, encoding: str):
+    """Text frame for JSON, binary frame for MessagePack."""
+    if encoding == ENCODING_MSGPACK:
+        return msgpack.packb(message, use_bin_type=True)
+    return json.dumps(message)
+
+# What to do when a client's send queue is full
+DROP_OLDEST = "drop_oldest"  # discard the oldest queued frame, keep the new one
+DROP_NEW = "drop_new"        # discard the new frame
+LATEST = "latest"            # discard everything queued, keep only the new frame
+
+class ClientConnection:
+    def __init__(self, websocket: WebSocket, queue_size: int, encoding: str = ENCODING_JSON):
+        """One subscriber: a bounded send queue drained by its own writer task."""
+        self.websocket = websocket
+        self.encoding = encoding
+        self.topics: Set[str] = set()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.writer_task = None
+        self.sent = 0
+        self.dropped = 0
+        self.consecutive_drops = 0
 
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    def __init__(self, queue_size=None, overflow_policy=None, max_consecutive_drops=None, send_timeout=None):
+        """
+        queue_size: Frames buffered per client (CSI_WS_QUEUE_SIZE, default 32).
+        overflow_policy: drop_oldest | drop_new | latest (CSI_WS_OVERFLOW_POLICY, default drop_oldest).
+        max_consecutive_drops: A client that overflows this many times in a row is disconnected
+            (CSI_WS_MAX_DROPS, default 200, 0 = never).
+        send_timeout: Seconds a single send may take before the client is disconnected (CSI_WS_SEND_TIMEOUT, default 10).
 
-    async def connect(self, websocket: WebSocket):
+        broadcast only enqueues, so its cost does not depend on how fast any client reads.
+        """
+        self.queue_size = queue_size or int(os.getenv("CSI_WS_QUEUE_SIZE", "32"))
+        self.overflow_policy = overflow_policy or os.getenv("CSI_WS_OVERFLOW_POLICY", DROP_OLDEST)
+        self.max_consecutive_drops = max_consecutive_drops if max_consecutive_drops is not None else int(os.getenv("CSI_WS_MAX_DROPS", "200"))
+        self.send_timeout = send_timeout or float(os.getenv("CSI_WS_SEND_TIMEOUT", "10"))
+        self.clients: Dict[WebSocket, ClientConnection] = {}
+        self.subscribers: Dict[str, Set[ClientConnection]] = {}
+        self._close_tasks = set()  # closes of slow clients, referenced until done
+        self.stats = {"broadcasts": 0, "encodes": 0, "frames_dropped": 0, "slow_disconnects": 0}
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.clients)
+
+    async def connect(self, websocket: WebSocket, topics=None, encoding: str = ENCODING_JSON):
+        """
+        topics: Initial subscriptions, defaults to everything (ALL_TOPICS).
+        encoding: "json" (text frames) or "msgpack" (binary frames, needs the msgpack package).
+        """
         await websocket.accept()
-        self.active_connections.append(websocket)
+        client = ClientConnection(websocket, self.queue_size)
+        self.clients[websocket] = client
+        self.set_encoding(websocket, encoding)
+        self.subscribe(websocket, topics or [ALL_TOPICS])
+        client.writer_task = asyncio.create_task(self._writer(client))
+
+    def subscribe(self, websocket: WebSocket, topics):
+        client = self.clients.get(websocket)
+        if client is None:
+            return
+        for topic in topics:
+            client.topics.add(topic)
+            self.subscribers.setdefault(topic, set()).add(client)
+
+    def unsubscribe(self, websocket: WebSocket, topics):
+        client = self.clients.get(websocket)
+        if client is None:
+            return
+        for topic in topics:
+            client.topics.discard(topic)
+            subscribers = self.subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(client)
+                if not subscribers:
+                    del self.subscribers[topic]
+
+    def set_encoding(self, websocket: WebSocket, encoding: str):
+        """Returns the encoding actually used; MessagePack falls back to JSON when not installed."""
+        client = self.clients.get(websocket)
+        if client is None:
+            return None
+        if encoding == ENCODING_MSGPACK and msgpack is None:
+            logger.warning("msgpack is not installed, using JSON frames")
+            encoding = ENCODING_JSON
+        client.encoding = encoding if encoding in (ENCODING_JSON, ENCODING_MSGPACK) else ENCODING_JSON
+        return client.encoding
+
+    async def handle_command(self, websocket: WebSocket, text: str):
+        """
+        Client control messages on /ws/monitor:
+            {"subscribe": ["device:esp32-1", "emergency"]}, {"unsubscribe": ["*"]}, {"encoding": "msgpack"}
+        Anything else (pings, legacy clients) is ignored. Malformed topic lists are answered with an
+        {"error": ...} frame and change nothing.
+        """
+        try:
+            command = json.loads(text)
+        except ValueError:
+            return
+        if not isinstance(command, dict):
+            return
+        client = self.clients.get(websocket)
+        for key in ("subscribe", "unsubscribe"):
+            topics = command.get(key)
+            # A bare string would otherwise be iterated into one-character topics
+            if key in command and not (isinstance(topics, list) and all(isinstance(topic, str) for topic in topics)):
+                if client is not None:
+                    self._enqueue(client, encode_frame({"error": f"{key} expects a list of topic strings"}, client.encoding))
+                return
+        if "unsubscribe" in command:
+            self.unsubscribe(websocket, command["unsubscribe"])
+        if "subscribe" in command:
+            self.subscribe(websocket, command["subscribe"])
+        if "encoding" in command:
+            self.set_encoding(websocket, command["encoding"])
+        if client is not None and any(key in command for key in ("subscribe", "unsubscribe", "encoding")):
+            # Acknowledged through the client's own queue so ordering with data frames holds
+            self._enqueue(client, encode_frame({"subscribed": sorted(client.topics), "encoding": client.encoding}, client.encoding))
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        """Idempotent: safe to call from the endpoint, the writer and the slow-client policy."""
+        client = self.clients.get(websocket)
+        if client is None:
+            return
+        self.unsubscribe(websocket, list(client.topics))
+        del self.clients[websocket]
+        if client.writer_task is not None and client.writer_task is not asyncio.current_task():
+            client.writer_task.cancel()
+
+    async def _writer(self, client: ClientConnection):
+        websocket = client.websocket
+        try:
+            while True:
+                frame = await client.queue.get()
+                if isinstance(frame, bytes):
+                    await asyncio.wait_for(websocket.send_bytes(frame), self.send_timeout)
+                else:
+                    await asyncio.wait_for(websocket.send_text(frame), self.send_timeout)
+                client.sent += 1
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            # Handle stale / too slow connections
+            logger.info(f"Dropping WebSocket client: {type(e).__name__} {e}")
+            self.disconnect(websocket)
+            await self._close(websocket)
 
-    async def broadcast(self, message: dict):
+    async def _close(self, websocket: WebSocket):
+        try:
+            await websocket.close()
+        except Exception:
+            pass
+
+    def _enqueue(self, client: ClientConnection, frame):
+        queue = client.queue
+        if not queue.full():
+            queue.put_nowait(frame)
+            client.consecutive_drops = 0
+            return
+
+        client.dropped += 1
+        client.consecutive_drops += 1
+        self.stats["frames_dropped"] += 1
+        if self.overflow_policy == LATEST:
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(frame)
+        elif self.overflow_policy == DROP_OLDEST:
+            queue.get_nowait()
+            queue.put_nowait(frame)
+
+        if self.max_consecutive_drops and client.consecutive_drops >= self.max_consecutive_drops:
+            self.stats["slow_disconnects"] += 1
+            logger.info("Disconnecting slow WebSocket client")
+            self.disconnect(client.websocket)
+            task = asyncio.create_task(self._close(client.websocket))
+            self._close_tasks.add(task)
+            task.add_done_callback(self._close_tasks.discard)
+
+    async def broadcast(self, message: dict, topics=()):
         """
-        Broadcasts a message to all connected clients.
-        message: Dictionary that will be converted to JSON.
+        Broadcasts a message to every client subscribed to one of its topics (or to ALL_TOPICS).
+        message: Dictionary encoded at most once per encoding, the frame is shared by all recipients.
         """
-        message_json = json.dumps(message)
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message_json)
-            except Exception:
-                # Handle stale connections
-                self.active_connections.remove(connection)
+        start = time.perf_counter()
+        self.stats["broadcasts"] += 1
+        recipients = set(self.subscribers.get(ALL_TOPICS, ()))
+        for topic in topics:
+            recipients.update(self.subscribers.get(topic, ()))
+        if not recipients:
+            BROADCAST_SECONDS.observe(time.perf_counter() - start)
+            return
+
+        frames = {}
+        for client in recipients:
+            frame = frames.get(client.encoding)
+            if frame is None:
+                frame = frames[client.encoding] = encode_frame(message, client.encoding)
+                self.stats["encodes"] += 1
+            self._enqueue(client, frame)
+        FRAMES_QUEUED.inc(len(recipients))
+        BROADCAST_SECONDS.observe(time.perf_counter() - start)
+
+    def queue_depths(self):
+        return [client.queue.qsize() for client in self.clients.values()]
 
 manager = ConnectionManager()
+
+# Read from the shared manager when /metrics is scraped
+Gauge("csi_ws_clients", "Connected /ws/monitor clients", function=lambda: len(manager.clients))
+Gauge("csi_ws_send_queue_frames", "Frames waiting in client send queues", ["stat"],
+      function=lambda: {("total",): sum(manager.queue_depths()), ("max",): max(manager.queue_depths(), default=0)})
+Counter("csi_ws_frames_dropped_total", "Frames dropped by the overflow policy", function=lambda: manager.stats["frames_dropped"])
+Counter("csi_ws_slow_disconnects_total", "Clients disconnected for overflowing", function=lambda: manager.stats["slow_disconnects"])
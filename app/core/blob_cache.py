@@ -0,0 +1,234 @@
+import os
+import re
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger("BlobCache")
+
+# Walrus blob ids are url-safe base64, anything else is not used as a file name
+_BLOB_ID = re.compile(r"^[A-Za-z0-9_-]{1,128}$")
+
+def is_blob_id(blob_id):
+    """True for strings shaped like a Walrus blob id (safe to use as a file name)."""
+    return isinstance(blob_id, str) and _BLOB_ID.fullmatch(blob_id) is not None
+
+class BlobCache:
+    def __init__(self, fetch, max_memory_bytes=None, cache_dir=None, max_disk_bytes=None, prefetch_concurrency=None,
+                 negative_ttl=None):
+        """
+        Two-tier read-through cache for immutable, content-addressed Walrus blobs.
+        fetch: async callable(blob_id) -> bytes or None, called on a miss in both tiers.
+        max_memory_bytes: In-memory LRU budget (WALRUS_CACHE_MEMORY_BYTES, default 32 MB).
+        cache_dir: On-disk store, one file per blob id (WALRUS_CACHE_DIR, default app/data/blob_cache, "" disables).
+        max_disk_bytes: Disk budget, least recently used files go first (WALRUS_CACHE_DISK_BYTES, default 512 MB).
+        prefetch_concurrency: Fetches in flight during prefetch (WALRUS_CACHE_PREFETCH, default 8).
+        negative_ttl: Seconds a failed fetch is remembered before the aggregator is asked again
+            (WALRUS_CACHE_NEGATIVE_TTL, default 30, 0 disables).
+
+        Concurrent reads of the same id share one fetch. Blobs never change, so there is no invalidation.
+        """
+        self.fetch = fetch
+        self.max_memory_bytes = max_memory_bytes or int(os.getenv("WALRUS_CACHE_MEMORY_BYTES", str(32 * 1024 * 1024)))
+        self.cache_dir = cache_dir if cache_dir is not None else os.getenv("WALRUS_CACHE_DIR", "app/data/blob_cache")
+        self.max_disk_bytes = max_disk_bytes or int(os.getenv("WALRUS_CACHE_DISK_BYTES", str(512 * 1024 * 1024)))
+        self.prefetch_concurrency = prefetch_concurrency or int(os.getenv("WALRUS_CACHE_PREFETCH", "8"))
+        self.negative_ttl = negative_ttl if negative_ttl is not None else float(os.getenv("WALRUS_CACHE_NEGATIVE_TTL", "30"))
+        self._memory = OrderedDict()  # blob_id -> bytes, most recently used last
+        self.memory_bytes = 0
+        self.disk_bytes = None  # scanned lazily on the first disk write
+        self._disk_lock = threading.Lock()  # disk_bytes is shared by concurrent to_thread writers
+        self._inflight = {}  # blob_id -> Future shared by concurrent readers
+        self._failed = OrderedDict()  # blob_id -> monotonic time its failed fetch expires, oldest first
+        self._background = set()  # warm() tasks, referenced until done so they are not collected
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "coalesced": 0, "fetch_errors": 0, "negative_hits": 0}
+
+    # --- memory tier ---
+
+    def _remember(self, blob_id, data):
+        if len(data) > self.max_memory_bytes:
+            return
+        previous = self._memory.pop(blob_id, None)
+        if previous is not None:
+            self.memory_bytes -= len(previous)
+        self._memory[blob_id] = data
+        self.memory_bytes += len(data)
+        while self.memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self.memory_bytes -= len(evicted)
+
+    # --- disk tier (runs in worker threads) ---
+
+    def _path(self, blob_id):
+        if not is_blob_id(blob_id):
+            raise ValueError(f"Invalid blob id {blob_id!r}")
+        # Two-character shards keep directories small
+        return os.path.join(self.cache_dir, blob_id[:2], blob_id)
+
+    def _disk_read(self, blob_id):
+        try:
+            with open(self._path(blob_id), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(self._path(blob_id))  # mtime doubles as last-used time for disk eviction
+        except OSError:
+            pass
+        return data
+
+    def _disk_write(self, blob_id, data):
+        path = self._path(blob_id)
+        if os.path.exists(path):
+            return
+        with self._disk_lock:
+            if self.disk_bytes is None:
+                self.disk_bytes = sum(size for _, size, _ in self._disk_files())
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)  # readers never see a partial blob
+        with self._disk_lock:
+            self.disk_bytes += len(data)
+            if self.disk_bytes > self.max_disk_bytes:
+                self._disk_evict()
+
+    def _disk_files(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+        for shard in os.scandir(self.cache_dir):
+            if shard.is_dir():
+                for entry in os.scandir(shard.path):
+                    if not entry.name.endswith(".tmp"):
+                        stat = entry.stat()
+                        yield entry.path, stat.st_size, stat.st_mtime
+
+    def _disk_evict(self):
+        """Removes least recently used files until the store is at 90% of its budget (under _disk_lock)."""
+        target = self.max_disk_bytes * 0.9
+        for path, size, _ in sorted(self._disk_files(), key=lambda item: item[2]):
+            if self.disk_bytes <= target:
+                break
+            try:
+                os.remove(path)
+                self.disk_bytes -= size
+            except OSError:
+                pass
+
+    # --- async API ---
+
+    async def get(self, blob_id: str):
+        """Returns the blob bytes, or None when the blob cannot be fetched."""
+        data = self._memory.get(blob_id)
+        if data is not None:
+            self._memory.move_to_end(blob_id)
+            self.stats["memory_hits"] += 1
+            return data
+
+        if self._failed:
+            expires = self._failed.get(blob_id)
+            if expires is not None:
+                if expires > time.monotonic():
+                    self.stats["negative_hits"] += 1
+                    return None
+                del self._failed[blob_id]
+
+        pending = self._inflight.get(blob_id)
+        if pending is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[blob_id] = future
+        try:
+            data = await self._load(blob_id)
+            future.set_result(data)
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # retrieved here so a reader-less failure is not logged as unhandled
+            raise
+        finally:
+            del self._inflight[blob_id]
+        return data
+
+    def _remember_failure(self, blob_id):
+        if self.negative_ttl <= 0:
+            return
+        now = time.monotonic()
+        self._failed.pop(blob_id, None)
+        self._failed[blob_id] = now + self.negative_ttl
+        # Same TTL for every entry, so the oldest insertions expire first
+        while self._failed and next(iter(self._failed.values())) <= now:
+            self._failed.popitem(last=False)
+
+    async def _load(self, blob_id):
+        use_disk = bool(self.cache_dir) and is_blob_id(blob_id)
+        if use_disk:
+            data = await asyncio.to_thread(self._disk_read, blob_id)
+            if data is not None:
+                self.stats["disk_hits"] += 1
+                self._remember(blob_id, data)
+                return data
+
+        self.stats["misses"] += 1
+        data = await self.fetch(blob_id)
+        if data is None:
+            self.stats["fetch_errors"] += 1
+            self._remember_failure(blob_id)
+            return None
+        await self.put(blob_id, data, use_disk=use_disk)
+        return data
+
+    async def put(self, blob_id: str, data: bytes, use_disk=None):
+        """Stores a blob whose content is already known (e.g. right after publishing it)."""
+        self._remember(blob_id, data)
+        self._failed.pop(blob_id, None)
+        if use_disk is None:
+            use_disk = bool(self.cache_dir) and is_blob_id(blob_id)
+        if use_disk:
+            try:
+                await asyncio.to_thread(self._disk_write, blob_id, data)
+            except OSError as e:
+                logger.warning(f"Could not write blob {blob_id} to disk cache: {e}")
+
+    async def prefetch(self, blob_ids):
+        """
+        Loads many blobs with bounded concurrency instead of one round trip after another.
+        Returns {blob_id: bytes or None}.
+        """
+        blob_ids = list(dict.fromkeys(b for b in blob_ids if b))
+        slots = asyncio.Semaphore(self.prefetch_concurrency)
+
+        async def load(blob_id):
+            async with slots:
+                try:
+                    return await self.get(blob_id)
+                except Exception as e:
+                    logger.error(f"Prefetch of blob {blob_id} failed: {e}")
+                    return None
+
+        results = await asyncio.gather(*(load(blob_id) for blob_id in blob_ids))
+        return dict(zip(blob_ids, results))
+
+    def warm(self, blob_ids):
+        """
+        Starts a background prefetch and returns without waiting for it.
+        The task is referenced until it finishes, so it cannot be garbage-collected mid-flight.
+        """
+        task = asyncio.create_task(self.prefetch(blob_ids))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
+
+    def info(self):
+        return {
+            **self.stats,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self.memory_bytes,
+            "disk_bytes": self.disk_bytes,
+            "inflight": len(self._inflight),
+            "negative_entries": len(self._failed),
+        }
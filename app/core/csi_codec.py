@@ -0,0 +1,98 @@
+import struct
+import numpy as np
+
+# Binary CSI frame, all fields little-endian:
+#   magic     2s  b"CS"
+#   version   B   FRAME_VERSION
+#   dtype     B   0 = float32, 1 = int16
+#   seq       I   device sequence number (wraps)
+#   ts_ns     q   device timestamp, ns since epoch (0 = use server receive time)
+#   rows      H   e.g. 1 for a flat packet, subcarriers for (subcarriers, antennas)
+#   cols      H   e.g. 1026
+#   id_len    H   length of the utf-8 device id that follows
+# followed by the device id and rows * cols raw values. Frames can be concatenated.
+BINARY_CONTENT_TYPE = "application/octet-stream"
+FRAME_MAGIC = b"CS"
+FRAME_VERSION = 1
+HEADER = struct.Struct("<2sBBIqHHH")
+
+DTYPE_CODES = {
+    0: np.dtype("<f4"),
+    1: np.dtype("<i2"),
+}
+DTYPE_NAMES = {"float32": 0, "int16": 1}
+
+def decode_frame(buffer, offset=0):
+    """
+    Decodes one frame starting at offset.
+    Returns (packet, next_offset) where packet is a dict with device_id, seq, timestamp_ns and csi.
+    csi is an np.frombuffer view over buffer (no copy), shaped (rows, cols) or (cols,) when rows == 1.
+    Raises ValueError on malformed input.
+    """
+    if len(buffer) - offset < HEADER.size:
+        raise ValueError("Truncated CSI frame header")
+    magic, version, dtype_code, seq, timestamp_ns, rows, cols, id_len = HEADER.unpack_from(buffer, offset)
+    if magic != FRAME_MAGIC:
+        raise ValueError("Bad CSI frame magic")
+    if version != FRAME_VERSION:
+        raise ValueError(f"Unsupported CSI frame version {version}")
+    dtype = DTYPE_CODES.get(dtype_code)
+    if dtype is None:
+        raise ValueError(f"Unsupported CSI frame dtype code {dtype_code}")
+
+    position = offset + HEADER.size
+    device_id = bytes(buffer[position:position + id_len]).decode("utf-8")
+    position += id_len
+    count = rows * cols
+    end = position + count * dtype.itemsize
+    if end > len(buffer):
+        raise ValueError("Truncated CSI frame payload")
+
+    csi = np.frombuffer(buffer, dtype=dtype, count=count, offset=position)
+    if rows != 1:
+        csi = csi.reshape(rows, cols)
+    return {
+        "device_id": device_id or None,
+        "seq": seq,
+        "timestamp_ns": timestamp_ns or None,
+        "csi": csi,
+    }, end
+
+def decode_frames(buffer):
+    """Decodes every frame in a buffer of concatenated frames."""
+    packets = []
+    offset = 0
+    while offset < len(buffer):
+        packet, offset = decode_frame(buffer, offset)
+        packets.append(packet)
+    return packets
+
+def encode_frame(csi, device_id="", seq=0, timestamp_ns=0, dtype="float32"):
+    """Encodes a CSI packet (1-D or 2-D array) into a binary frame."""
+    dtype_code = DTYPE_NAMES[dtype]
+    values = np.ascontiguousarray(csi, dtype=DTYPE_CODES[dtype_code])
+    rows, cols = (1, values.size) if values.ndim == 1 else values.shape
+    device_bytes = device_id.encode("utf-8")
+    header = HEADER.pack(FRAME_MAGIC, FRAME_VERSION, dtype_code, seq & 0xFFFFFFFF,
+                         int(timestamp_ns), rows, cols, len(device_bytes))
+    return header + device_bytes + values.tobytes()
+
+def group_packets(packets, default_device_id):
+    """
+    Groups decoded packets by device so each device's buffer gets one bulk write.
+    packets: dicts with csi and optional device_id / timestamp_ns, in arrival order.
+    Returns {device_id: (csi_block, timestamps_ns or None)} in first-seen order.
+    """
+    grouped = {}
+    for packet in packets:
+        device_id = packet.get("device_id") or default_device_id
+        grouped.setdefault(device_id, []).append(packet)
+
+    blocks = {}
+    for device_id, device_packets in grouped.items():
+        block = np.stack([np.asarray(p["csi"]).reshape(-1) for p in device_packets])
+        timestamps = [p.get("timestamp_ns") for p in device_packets]
+        if any(ts is None for ts in timestamps):
+            timestamps = None
+        blocks[device_id] = (block, timestamps)
+    return blocks
@@ -1,57 +1,322 @@
 import numpy as np
-from collections import deque
+from app.core.features import window_mean
 import asyncio
-from datetime import datetime
+import math
+import time
+
+class RollingFeatures:
+    def __init__(self, track_variance=False, track_minmax=False, recompute_every=1000):
+        """
+        Incremental per-feature statistics over the CSIBuffer window.
+        Each packet costs O(features): the entering row is added and the evicted row subtracted,
+        so the feature vector can be read without reducing the whole window.
+        track_variance / track_minmax: Also maintain var() / min() / max(); off by default since the
+            model input is the mean only, and each costs extra work on every packet.
+        recompute_every: Exact recompute from the window after this many updates (stops float drift)
+        """
+        self.track_variance = track_variance
+        self.track_minmax = track_minmax
+        self.recompute_every = recompute_every
+        self.n = 0
+        self.updates_since_recompute = 0
+        self._sum = None
+        self._sumsq = None
+        self._min = None
+        self._max = None
+        self._dirty = None  # Columns whose min/max left the window and must be recomputed
+
+    def _allocate(self, n_features):
+        self._sum = np.zeros(n_features, dtype=np.float64)
+        if self.track_variance:
+            self._sumsq = np.zeros(n_features, dtype=np.float64)
+        if self.track_minmax:
+            self._min = np.full(n_features, np.inf, dtype=np.float64)
+            self._max = np.full(n_features, -np.inf, dtype=np.float64)
+            self._dirty = np.zeros(n_features, dtype=bool)
+
+    def remove(self, row):
+        """Subtracts a row that is about to leave the window."""
+        self._sum -= row
+        if self.track_variance:
+            self._sumsq -= np.square(row, dtype=np.float64)
+        if self.track_minmax:
+            self._dirty |= (row <= self._min) | (row >= self._max)
+        self.n -= 1
+
+    def add(self, row):
+        """Adds a row that just entered the window."""
+        if self._sum is None:
+            self._allocate(row.size)
+        self._sum += row
+        if self.track_variance:
+            self._sumsq += np.square(row, dtype=np.float64)
+        if self.track_minmax:
+            np.minimum(self._min, row, out=self._min)
+            np.maximum(self._max, row, out=self._max)
+        self.n += 1
+        self.updates_since_recompute += 1
+
+    def remove_block(self, rows):
+        """Subtracts several rows (time, features) leaving the window at once."""
+        if len(rows) == 0:
+            return
+        self._sum -= np.sum(rows, axis=0, dtype=np.float64)
+        if self.track_variance:
+            self._sumsq -= np.einsum("ij,ij->j", rows, rows, dtype=np.float64)
+        if self.track_minmax:
+            self._dirty |= (rows.min(axis=0) <= self._min) | (rows.max(axis=0) >= self._max)
+        self.n -= len(rows)
+
+    def add_block(self, rows):
+        """Adds several rows (time, features) entering the window at once."""
+        if self._sum is None:
+            self._allocate(rows.shape[1])
+        self._sum += np.sum(rows, axis=0, dtype=np.float64)
+        if self.track_variance:
+            self._sumsq += np.einsum("ij,ij->j", rows, rows, dtype=np.float64)
+        if self.track_minmax:
+            np.minimum(self._min, rows.min(axis=0), out=self._min)
+            np.maximum(self._max, rows.max(axis=0), out=self._max)
+        self.n += len(rows)
+        self.updates_since_recompute += len(rows)
+
+    def due_for_recompute(self):
+        # A NaN/inf row leaves the running sums non-finite even after it is subtracted (inf - inf
+        # is NaN), so they are recomputed from the window until that row has left it
+        return self.updates_since_recompute >= self.recompute_every or not math.isfinite(self._sum.sum())
+
+    def recompute(self, window):
+        """Exact recompute from the (time, features) window, order independent."""
+        if self._sum is None:
+            self._allocate(window.shape[1])
+        self.n = len(window)
+        np.sum(window, axis=0, dtype=np.float64, out=self._sum)
+        if self.track_variance:
+            np.einsum("ij,ij->j", window, window, dtype=np.float64, out=self._sumsq)
+        if self.track_minmax:
+            np.min(window, axis=0, out=self._min)
+            np.max(window, axis=0, out=self._max)
+            self._dirty[:] = False
+        self.updates_since_recompute = 0
+
+    def _refresh_minmax(self, window):
+        if self._dirty.any():
+            columns = np.flatnonzero(self._dirty)
+            self._min[columns] = window[:, columns].min(axis=0)
+            self._max[columns] = window[:, columns].max(axis=0)
+            self._dirty[:] = False
+
+    def mean(self):
+        if self.n == 0:
+            return None
+        return self._sum / self.n
+
+    def var(self):
+        if self.n == 0 or not self.track_variance:
+            return None
+        mean = self._sum / self.n
+        return np.maximum(self._sumsq / self.n - mean * mean, 0.0)
+
+    def min(self, window):
+        """window: current CSIBuffer window, only touched for columns whose minimum was evicted."""
+        if self.n == 0 or not self.track_minmax:
+            return None
+        self._refresh_minmax(window)
+        return self._min.copy()
+
+    def max(self, window):
+        if self.n == 0 or not self.track_minmax:
+            return None
+        self._refresh_minmax(window)
+        return self._max.copy()
 
 class CSIBuffer:
-    def __init__(self, window_size_seconds=2, sampling_rate=50):
+    def __init__(self, window_size_seconds=2, sampling_rate=50, n_features=None, features=None):
         """
         window_size_seconds: 2 seconds as per requirement
         sampling_rate: Expected packets per second (e.g., 50Hz or 100Hz)
+        n_features: Values per packet (e.g., 1026). Inferred from the first packet if None.
+        features: Optional RollingFeatures kept in sync with the window on every append.
+
+        Packets are kept in a preallocated (max_len, n_features) float32 ring buffer with a
+        parallel int64 timestamp array (ns since epoch), so appending never allocates.
         """
-        self.max_len = int(window_size_seconds * sampling_rate)
-        self.buffer = deque(maxlen=self.max_len)
+        self.max_len = int(round(window_size_seconds * sampling_rate))
+        self.n_features = None
+        self.count = 0  # Total packets written since creation
+        self._data = None
+        self._timestamps = np.zeros(self.max_len, dtype=np.int64)
+        self.features = features
         self.lock = asyncio.Lock()
+        if n_features is not None:
+            self._allocate(n_features)
+
+    def _allocate(self, n_features):
+        self.n_features = int(n_features)
+        self._data = np.zeros((self.max_len, self.n_features), dtype=np.float32)
+
+    def __len__(self):
+        return min(self.count, self.max_len)
+
+    def append(self, csi_matrix, timestamp_ns=None):
+        """
+        Synchronous append used by add_packet. Returns the ring index that was written.
+        """
+        # We store the magnitude immediately to save memory and processing time later
+        # This aligns with KVKK requirement: process and don't store raw if possible
+        values = np.asarray(csi_matrix)
+        if self._data is None:
+            self._allocate(values.size)
+        elif values.size != self.n_features:
+            raise ValueError(f"Expected {self.n_features} CSI values per packet, got {values.size}")
+
+        index = self.count % self.max_len
+        if self.features is not None and self.count >= self.max_len:
+            self.features.remove(self._data[index])
+        # np.abs writes straight into the ring row (casting to float32), no temporary window copy
+        np.abs(values.reshape(-1), out=self._data[index], casting="unsafe")
+        self._timestamps[index] = time.time_ns() if timestamp_ns is None else timestamp_ns
+        self.count += 1
+
+        if self.features is not None:
+            self.features.add(self._data[index])
+            if self.features.due_for_recompute():
+                self.features.recompute(self._data[:len(self)])
+        return index
 
-    async def add_packet(self, csi_matrix):
+    def extend(self, csi_block, timestamps_ns=None):
+        """
+        Bulk append of a (packets, ...) block in one vectorized write.
+        timestamps_ns: None (server time for all rows), a scalar or one value per packet.
+        """
+        values = np.asarray(csi_block)
+        n = values.shape[0]
+        if n == 0:
+            return
+        values = values.reshape(n, -1)
+        if self._data is None:
+            self._allocate(values.shape[1])
+        elif values.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} CSI values per packet, got {values.shape[1]}")
+
+        if timestamps_ns is None:
+            timestamps_ns = time.time_ns()
+        timestamps_ns = np.broadcast_to(np.asarray(timestamps_ns, dtype=np.int64), (n,))
+
+        # Only the newest max_len packets can survive, older ones are skipped entirely
+        overflow = n >= self.max_len
+        if n > self.max_len:
+            self.count += n - self.max_len
+            values = values[-self.max_len:]
+            timestamps_ns = timestamps_ns[-self.max_len:]
+            n = self.max_len
+
+        sequence = self.count + np.arange(n)
+        positions = sequence % self.max_len
+        if self.features is not None and not overflow:
+            evicted = positions[sequence >= self.max_len]
+            if len(evicted):
+                self.features.remove_block(self._data[evicted])
+
+        magnitudes = np.abs(values).astype(np.float32, copy=False)
+        self._data[positions] = magnitudes
+        self._timestamps[positions] = timestamps_ns
+        self.count += n
+
+        if self.features is not None:
+            if overflow:
+                self.features.recompute(self._data)
+            else:
+                self.features.add_block(magnitudes)
+                if self.features.due_for_recompute():
+                    self.features.recompute(self._data[:len(self)])
+
+    async def add_packets(self, csi_block, timestamps_ns=None):
+        async with self.lock:
+            self.extend(csi_block, timestamps_ns)
+
+    async def add_packet(self, csi_matrix, timestamp_ns=None):
         """
         csi_matrix: numpy array of shape (subcarriers, antennas) or similar
         """
         async with self.lock:
-            # We store the magnitude immediately to save memory and processing time later
-            # This aligns with KVKK requirement: process and don't store raw if possible
-            magnitude = np.abs(csi_matrix)
-            self.buffer.append({
-                "magnitude": magnitude,
-                "timestamp": datetime.utcnow()
-            })
-
-    async def get_window(self):
+            self.append(csi_matrix, timestamp_ns)
+
+    def window_view(self, ordered=True):
+        """
+        Returns the current window without taking the lock.
+        ordered=False returns the ring storage itself (zero-copy, rows rotated), which is enough
+        for order-independent reductions such as mean/variance/min/max.
+        ordered=True returns rows oldest -> newest: a view when the ring is aligned, otherwise
+        exactly one contiguous copy.
+        Views are only valid until the next append.
+        """
+        if self.count < self.max_len:
+            return None
+        if not ordered:
+            return self._data
+        head = self.count % self.max_len
+        if head == 0:
+            return self._data
+        return np.concatenate((self._data[head:], self._data[:head]))
+
+    def feature_vector(self):
+        """
+        Returns the model input for the current window: the per-feature mean.
+        Read from the rolling accumulator when one is attached, otherwise reduced from the window.
+        """
+        if self.count < self.max_len:
+            return None
+        if self.features is not None:
+            return self.features.mean()
+        return window_mean(self._data)
+
+    def timestamps(self):
+        """Returns packet timestamps (ns since epoch) oldest -> newest."""
+        n = len(self)
+        head = self.count % self.max_len if self.count >= self.max_len else 0
+        return np.roll(self._timestamps, -head)[:n]
+
+    def last_timestamp(self):
+        """Timestamp (ns since epoch) of the newest packet, None before the first one."""
+        if self.count == 0:
+            return None
+        return int(self._timestamps[(self.count - 1) % self.max_len])
+
+    async def get_window(self, ordered=True):
         async with self.lock:
-            if len(self.buffer) < self.max_len:
-                return None
-            return list(self.buffer)
+            return self.window_view(ordered)
 
     def is_full(self):
-        return len(self.buffer) == self.max_len
+        return self.count >= self.max_len
 
 class SignalProcessor:
     @staticmethod
     def preprocess_window(window_data):
         """
         Prepares the windowed data for the AI model.
-        window_data: List of dicts with 'magnitude'
+        window_data: (time, features) array from CSIBuffer, or a list of dicts with 'magnitude'
         """
-        # Stack magnitudes into a single matrix (time, subcarriers, antennas)
-        magnitudes = [d["magnitude"] for d in window_data]
-        window_matrix = np.stack(magnitudes)
-        
+        if isinstance(window_data, np.ndarray):
+            # Already a contiguous (time, features) matrix, nothing to stack
+            window_matrix = window_data
+        else:
+            # Stack magnitudes into a single matrix (time, subcarriers, antennas)
+            magnitudes = [d["magnitude"] for d in window_data]
+            window_matrix = np.stack(magnitudes)
+
         # Normalize or reshape based on model requirements
         # Example: window_matrix = (window_matrix - np.mean(window_matrix)) / np.std(window_matrix)
-        
+
         return window_matrix
 
     @staticmethod
     def calculate_current_magnitude(csi_matrix):
         """Returns the mean magnitude of the current packet for monitoring"""
         return float(np.mean(np.abs(csi_matrix)))
+
+    @staticmethod
+    def calculate_magnitudes(csi_block):
+        """Returns the mean magnitude of every packet in a (packets, ...) block"""
+        csi_block = np.asarray(csi_block)
+        return np.abs(csi_block).reshape(len(csi_block), -1).mean(axis=1)
@@ -0,0 +1,129 @@
+import os
+import time
+import logging
+from collections import OrderedDict
+from app.core.csi_processor import CSIBuffer, RollingFeatures
+
+logger = logging.getLogger("DeviceRegistry")
+
+DEFAULT_DEVICE_ID = "default"
+
+class DeviceState:
+    def __init__(self, device_id, window_size_seconds=2, sampling_rate=100, n_features=None):
+        """
+        Everything that must not be shared between two ESP32 nodes:
+        the sliding window, its rolling features and the last prediction.
+        n_features: Values per packet; packets of another size are rejected (first packet decides if None).
+        """
+        self.device_id = device_id
+        self.buffer = CSIBuffer(
+            window_size_seconds=window_size_seconds,
+            sampling_rate=sampling_rate,
+            n_features=n_features,
+            features=RollingFeatures(),
+        )
+        self.last_prediction = None
+        # InferenceScheduler bookkeeping
+        self.packets_since_inference = 0
+        self.inference_task = None
+        self.pending_magnitude = None
+        # StreamAggregator buckets, keyed by rate
+        self.streams = {}
+        # MotionGate detector state
+        self.gate = None
+        self.packets = 0
+        self.created_at = time.monotonic()
+        self.last_seen = self.created_at
+
+    def touch(self, now=None, packets=1):
+        self.packets += packets
+        self.last_seen = time.monotonic() if now is None else now
+
+    def memory_bytes(self):
+        buffer = self.buffer
+        total = buffer._timestamps.nbytes
+        if buffer._data is not None:
+            total += buffer._data.nbytes
+        features = buffer.features
+        for array in (features._sum, features._sumsq, features._min, features._max):
+            if array is not None:
+                total += array.nbytes
+        return total
+
+    def summary(self):
+        return {
+            "device_id": self.device_id,
+            "packets": self.packets,
+            "buffered": len(self.buffer),
+            "window": self.buffer.max_len,
+            "idle_seconds": round(time.monotonic() - self.last_seen, 3),
+            "inference_running": self.inference_task is not None,
+            "last_prediction": self.last_prediction,
+        }
+
+class DeviceRegistry:
+    def __init__(self, window_size_seconds=2, sampling_rate=100, max_devices=None, idle_timeout=None, n_features=None):
+        """
+        Per-device state keyed by device/room id, kept in LRU order.
+        n_features: Values per packet the model expects. Set it whenever it is known: otherwise a
+            device's first packet fixes its buffer width, and one malformed first packet would
+            make every later valid one fail.
+        max_devices: Hard cap; the least recently seen device is evicted beyond it, so memory is
+            bounded by max_devices * window * features * 4 bytes.
+        idle_timeout: Seconds without packets after which a device is dropped.
+        """
+        self.window_size_seconds = window_size_seconds
+        self.sampling_rate = sampling_rate
+        self.n_features = n_features
+        self.max_devices = max_devices or int(os.getenv("CSI_MAX_DEVICES", "2000"))
+        self.idle_timeout = idle_timeout or float(os.getenv("CSI_DEVICE_IDLE_TIMEOUT", "300"))
+        self.devices = OrderedDict()
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self.devices)
+
+    def __contains__(self, device_id):
+        return device_id in self.devices
+
+    def get(self, device_id, now=None, packets=1):
+        """
+        Returns the state for device_id, creating it on first sight, and marks it as most recently seen.
+        packets: Number of packets being ingested with this lookup.
+        """
+        now = time.monotonic() if now is None else now
+        device = self.devices.get(device_id)
+        if device is None:
+            device = DeviceState(device_id, self.window_size_seconds, self.sampling_rate, self.n_features)
+            self.devices[device_id] = device
+            if len(self.devices) > self.max_devices:
+                old_id, _ = self.devices.popitem(last=False)
+                self.evicted += 1
+                logger.info(f"Device registry full, evicted least recently seen device {old_id}")
+        else:
+            self.devices.move_to_end(device_id)
+        device.touch(now, packets)
+        return device
+
+    def peek(self, device_id):
+        """Returns the state without creating it or changing LRU order."""
+        return self.devices.get(device_id)
+
+    def evict_idle(self, now=None):
+        """
+        Drops devices idle for longer than idle_timeout. The OrderedDict is in last-seen order,
+        so this only walks the idle prefix.
+        """
+        now = time.monotonic() if now is None else now
+        evicted = 0
+        while self.devices:
+            device_id, device = next(iter(self.devices.items()))
+            if now - device.last_seen < self.idle_timeout:
+                break
+            del self.devices[device_id]
+            evicted += 1
+        self.evicted += evicted
+        return evicted
+
+    def memory_bytes(self):
+        return sum(device.memory_bytes() for device in self.devices.values())
@@ -0,0 +1,39 @@
+import numpy as np
+
+# Name of the feature function a model was trained with, recorded in its metadata file
+WINDOW_MEAN = "window_mean"
+
+def window_mean(windows):
+    """
+    The model input for one window or a batch of them: the per-feature mean over time.
+    windows: (time, features) or (windows, time, features). Accumulated in float64 like
+    RollingFeatures, so training and the server produce the same numbers.
+    """
+    return np.mean(windows, axis=-2, dtype=np.float64)
+
+FEATURES = {WINDOW_MEAN: window_mean}
+
+def feature_function(name):
+    try:
+        return FEATURES[name]
+    except KeyError:
+        raise ValueError(f"Unknown feature spec {name!r}, expected one of {sorted(FEATURES)}")
+
+def sliding_windows(rows, window, hop):
+    """
+    (windows, window, features) view of consecutive rows, one window every hop rows, ending at
+    rows window-1, window-1+hop, ... like the server scoring a full buffer every hop packets.
+    No data is copied.
+    """
+    rows = np.asarray(rows)
+    if len(rows) < window:
+        return np.empty((0, window) + rows.shape[1:], dtype=rows.dtype)
+    view = np.lib.stride_tricks.sliding_window_view(rows, window, axis=0)[::hop]
+    # sliding_window_view puts the window axis last
+    return np.moveaxis(view, -1, 1)
+
+def window_starts(n_rows, window, hop):
+    """First row of every window produced by sliding_windows."""
+    if n_rows < window:
+        return np.empty(0, dtype=np.int64)
+    return np.arange(0, n_rows - window + 1, hop, dtype=np.int64)
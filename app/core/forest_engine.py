@@ -0,0 +1,106 @@
+import numpy as np
+
+class FlatForest:
+    def __init__(self, feature, threshold, left, right, values, roots, max_depth, classes, n_features, missing_left=None):
+        """
+        A fitted tree ensemble flattened into contiguous NumPy arrays.
+        feature / threshold / left / right: One entry per node of every tree, children already
+            offset into the shared arrays. Leaves point to themselves so extra steps are no-ops.
+        values: (nodes, classes) per-node class probabilities (normalized, as each tree's predict_proba).
+        roots: Index of every tree's root node.
+        missing_left: Per node, whether NaN goes to the left child (sklearn >= 1.3 missing_go_to_left).
+            None sends NaN right, like older sklearn.
+        """
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.values = values
+        self.roots = roots
+        self.missing_left = missing_left if missing_left is not None else np.zeros(len(feature), dtype=bool)
+        self.max_depth = int(max_depth)
+        self.classes_ = classes
+        self.n_features_in_ = int(n_features)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """
+        Exports a fitted RandomForestClassifier / ExtraTreesClassifier (single output).
+        """
+        estimators = getattr(model, "estimators_", None)
+        if not estimators or getattr(model, "n_outputs_", 1) != 1:
+            raise ValueError("FlatForest needs a fitted single-output tree ensemble classifier")
+
+        features, thresholds, lefts, rights, missing_lefts, values, roots = [], [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            n = tree.node_count
+            is_leaf = tree.children_left == -1
+            own_index = np.arange(offset, offset + n, dtype=np.intp)
+
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.intp))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            lefts.append(np.where(is_leaf, own_index, tree.children_left + offset).astype(np.intp))
+            rights.append(np.where(is_leaf, own_index, tree.children_right + offset).astype(np.intp))
+            missing_go_to_left = getattr(tree, "missing_go_to_left", None)
+            missing_lefts.append(np.zeros(n, dtype=bool) if missing_go_to_left is None
+                                 else (np.asarray(missing_go_to_left) != 0) & ~is_leaf)
+
+            # Same normalization as DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :].astype(np.float64)
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(value / normalizer)
+
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += n
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            missing_left=np.concatenate(missing_lefts),
+            values=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            classes=np.asarray(model.classes_),
+            n_features=model.n_features_in_,
+        )
+
+    @property
+    def node_count(self):
+        return len(self.feature)
+
+    def apply(self, X):
+        """
+        Returns the leaf reached in every tree for every row, shape (trees, rows).
+        All trees and rows advance one level per step.
+        """
+        # sklearn evaluates trees on float32 inputs compared against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        n_rows = X.shape[0]
+        nodes = np.repeat(self.roots[:, None], n_rows, axis=1)
+        row_index = np.broadcast_to(np.arange(n_rows), nodes.shape)
+        # NaN compares False and would always go right; only pay for the per-node check when present
+        has_missing = np.isnan(X).any()
+        for _ in range(self.max_depth):
+            values = X[row_index, self.feature[nodes]]
+            go_left = values <= self.threshold[nodes]
+            if has_missing:
+                go_left |= np.isnan(values) & self.missing_left[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def predict_proba(self, X):
+        leaves = self.apply(X)
+        # Summed tree by tree over axis 0, then averaged, matching ForestClassifier.predict_proba
+        return self.values[leaves].sum(axis=0) / len(self.roots)
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
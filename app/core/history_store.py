@@ -0,0 +1,247 @@
+import os
+import time
+import base64
+import sqlite3
+import asyncio
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger("HistoryStore")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    olay TEXT NOT NULL,
+    risk TEXT NOT NULL,
+    user TEXT,
+    device_id TEXT,
+    blob_id TEXT,
+    event_id INTEGER,
+    source TEXT
+);
+CREATE INDEX IF NOT EXISTS events_ts ON events(ts, id);
+CREATE INDEX IF NOT EXISTS events_user_ts ON events(user, ts, id);
+CREATE INDEX IF NOT EXISTS events_device_ts ON events(device_id, ts, id);
+CREATE INDEX IF NOT EXISTS events_risk_ts ON events(risk, ts, id);
+CREATE INDEX IF NOT EXISTS events_event_id ON events(event_id) WHERE event_id IS NOT NULL;
+"""
+
+COLUMNS = ("ts", "olay", "risk", "user", "device_id", "blob_id", "event_id", "source")
+
+def encode_cursor(ts, row_id):
+    return base64.urlsafe_b64encode(f"{ts!r}:{row_id}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """Raises ValueError on anything that is not a cursor returned by query()."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        ts, row_id = raw.split(":")
+        return float(ts), int(row_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+class HistoryStore:
+    def __init__(self, path=None, batch_size=None, flush_interval_ms=None):
+        """
+        Emergency history in SQLite (WAL), newest first with keyset (cursor) pagination.
+        path: Database file (CSI_HISTORY_PATH, default app/data/history.sqlite3).
+        batch_size: Writes applied per transaction at most (CSI_HISTORY_BATCH, default 500).
+        flush_interval_ms: How long writes are collected before a flush (CSI_HISTORY_FLUSH_MS, default 50).
+
+        add() and set_blob_id() only queue the write, a background task applies them in batches.
+        Reads use their own connection, so they never wait behind a write transaction.
+        """
+        self.path = path or os.getenv("CSI_HISTORY_PATH", "app/data/history.sqlite3")
+        self.batch_size = batch_size or int(os.getenv("CSI_HISTORY_BATCH", "500"))
+        self.flush_interval = (flush_interval_ms or float(os.getenv("CSI_HISTORY_FLUSH_MS", "50"))) / 1000
+        self.stats = {"added": 0, "flushes": 0, "writes": 0}
+        self._pending = []  # ("insert", row) | ("blob", (blob_id, event_ids))
+        self._writer_db = None
+        self._reader_db = None
+        self._writer_lock = threading.Lock()
+        self._reader_lock = threading.Lock()
+        self._flush_lock = None
+        self._wakeup = None
+        self._task = None
+
+    # --- storage (runs in worker threads) ---
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def _writer(self):
+        if self._writer_db is None:
+            self._writer_db = self._connect()
+            self._writer_db.executescript(SCHEMA)
+        return self._writer_db
+
+    def _reader(self):
+        if self._reader_db is None:
+            self._writer()  # schema first
+            self._reader_db = self._connect()
+        return self._reader_db
+
+    def _apply(self, ops):
+        with self._writer_lock:
+            db = self._writer()
+            with db:
+                inserts = []
+                for kind, args in ops:
+                    if kind == "insert":
+                        inserts.append(args)
+                        continue
+                    # Keep order: rows queued before this update must exist when it runs
+                    if inserts:
+                        db.executemany(f"INSERT INTO events ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", inserts)
+                        inserts = []
+                    blob_id, event_ids = args
+                    db.executemany("UPDATE events SET blob_id = ? WHERE event_id = ?", [(blob_id, e) for e in event_ids])
+                if inserts:
+                    db.executemany(f"INSERT INTO events ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", inserts)
+
+    def _select(self, limit, cursor, since, until, filters):
+        where, params = [], []
+        for column, value in filters.items():
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            where.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("ts < ?")
+            params.append(until)
+        if cursor is not None:
+            where.append("(ts, id) < (?, ?)")
+            params.extend(cursor)
+        sql = f"SELECT id, {', '.join(COLUMNS)} FROM events"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ts DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+        with self._reader_lock:
+            return self._reader().execute(sql, params).fetchall()
+
+    def _count(self):
+        with self._reader_lock:
+            return self._reader().execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    # --- async API ---
+
+    def add(self, olay, risk, blob_id=None, device_id=None, user=None, event_id=None, source=None, ts=None):
+        """Queues one event; it is visible to query() once flushed (query flushes first)."""
+        row = (ts if ts is not None else time.time(), olay, risk, user, device_id, blob_id, event_id, source)
+        self._pending.append(("insert", row))
+        self.stats["added"] += 1
+        self._notify()
+
+    def set_blob_id(self, event_ids, blob_id):
+        """Attaches the Walrus blob id to events recorded with these outbox ids."""
+        self._pending.append(("blob", (blob_id, list(event_ids))))
+        self._notify()
+
+    def _notify(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def flush(self):
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        # One flush at a time, so batches are applied in the order they were queued
+        async with self._flush_lock:
+            while self._pending:
+                ops, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+                try:
+                    await asyncio.to_thread(self._apply, ops)
+                except Exception:
+                    self._pending[:0] = ops  # retried on the next flush
+                    raise
+                self.stats["flushes"] += 1
+                self.stats["writes"] += len(ops)
+
+    async def query(self, limit=100, cursor=None, since=None, until=None, user=None, device_id=None, risk=None):
+        """
+        Newest events first. since / until: unix seconds, [since, until).
+        cursor: next_cursor from the previous page.
+        Returns (entries, next_cursor or None).
+        """
+        if self._pending:
+            await self.flush()
+        position = decode_cursor(cursor) if cursor else None
+        rows = await asyncio.to_thread(self._select, limit, position, since, until,
+                                       {"user": user, "device_id": device_id, "risk": risk})
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+        return [self._entry(row) for row in rows], next_cursor
+
+    @property
+    def backlog(self):
+        """Writes queued but not yet flushed."""
+        return len(self._pending)
+
+    async def count(self):
+        if self._pending:
+            await self.flush()
+        return await asyncio.to_thread(self._count)
+
+    @staticmethod
+    def _entry(row):
+        row_id, ts, olay, risk, user, device_id, blob_id, event_id, source = row
+        # Same keys the Flutter history page reads
+        return {
+            "id": row_id,
+            "tarih": datetime.fromtimestamp(ts).strftime("%d.%m.%Y %H:%M"),
+            "timestamp": datetime.utcfromtimestamp(ts).isoformat(),
+            "olay": olay,
+            "risk": risk,
+            "blobId": blob_id,
+            "device_id": device_id,
+            "user": user,
+            "eventId": event_id,
+            "source": source,
+        }
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        for lock, attr in ((self._writer_lock, "_writer_db"), (self._reader_lock, "_reader_db")):
+            with lock:
+                db = getattr(self, attr)
+                if db is not None:
+                    db.close()
+                    setattr(self, attr, None)
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if len(self._pending) < self.batch_size:
+                # Let a burst of detections accumulate into one transaction
+                await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"History flush failed: {e}")
+                await asyncio.sleep(1.0)
+                self._wakeup.set()
@@ -0,0 +1,124 @@
+import os
+import asyncio
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+class BatchingPredictor:
+    def __init__(self, predict_batch, max_batch_size=None, max_wait_ms=None, workers=None):
+        """
+        Runs a synchronous batch predictor off the event loop and micro-batches concurrent requests.
+        predict_batch: callable(X of shape (rows, features)) -> sequence with one result per row.
+            Runs in a worker thread; sklearn's tree traversal releases the GIL, so batches from
+            several workers evaluate on several cores.
+        max_batch_size: Rows per predict call (CSI_INFERENCE_MAX_BATCH, default 64).
+        max_wait_ms: How long the first request of a batch waits for company (CSI_INFERENCE_MAX_WAIT_MS, default 5).
+        workers: Worker threads, i.e. batches evaluated concurrently (CSI_INFERENCE_WORKERS, default CPU count).
+        """
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size or int(os.getenv("CSI_INFERENCE_MAX_BATCH", "64"))
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else float(os.getenv("CSI_INFERENCE_MAX_WAIT_MS", "5"))) / 1000.0
+        self.workers = workers or int(os.getenv("CSI_INFERENCE_WORKERS", str(os.cpu_count() or 1)))
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        self.queue = None
+        self.slots = None
+        self.batch_task = None
+        self._batch_tasks = set()  # running _run_batch tasks, referenced until done
+        self.stats = {"requests": 0, "batches": 0, "rows": 0, "max_batch": 0}
+
+    def _ensure_started(self):
+        # Created lazily so they bind to the running event loop
+        if self.batch_task is None or self.batch_task.done():
+            if self.queue is not None:
+                self._fail_pending(self.batch_task)
+            self.queue = asyncio.Queue()
+            self.slots = asyncio.Semaphore(self.workers)
+            self.batch_task = asyncio.create_task(self._batch_loop())
+
+    def _fail_pending(self, task):
+        """Fails the requests still queued for a batch loop that has stopped; nothing would answer them."""
+        error = None
+        if not task.cancelled():
+            error = task.exception()
+        error = error or RuntimeError("Inference batch loop stopped")
+        while not self.queue.empty():
+            _, future = self.queue.get_nowait()
+            if not future.done():
+                future.set_exception(error)
+
+    async def submit(self, features):
+        """
+        features: 1-D feature vector. Returns predict_batch's result for this row.
+        """
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((features, future))
+        self.stats["requests"] += 1
+        return await future
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        batch = []
+        try:
+            while True:
+                batch = [await self.queue.get()]
+                deadline = loop.time() + self.max_wait
+                while len(batch) < self.max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        # Still take whatever is already queued without waiting
+                        while len(batch) < self.max_batch_size and not self.queue.empty():
+                            batch.append(self.queue.get_nowait())
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+                # Bounded number of batches in flight, so a slow model applies backpressure here
+                await self.slots.acquire()
+                # The loop only keeps weak references to tasks, an unreferenced batch could be collected
+                task = asyncio.create_task(self._run_batch(batch))
+                self._batch_tasks.add(task)
+                task.add_done_callback(self._batch_tasks.discard)
+                batch = []
+        except asyncio.CancelledError:
+            # Requests already taken off the queue but not dispatched
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(RuntimeError("Inference batch loop stopped"))
+            raise
+
+    async def _run_batch(self, batch):
+        try:
+            futures = [future for _, future in batch]
+            self.stats["batches"] += 1
+            self.stats["rows"] += len(batch)
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+            try:
+                X = np.stack([features for features, _ in batch])
+                results = await asyncio.get_running_loop().run_in_executor(self.executor, self.predict_batch, X)
+            except Exception as e:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            for future, result in zip(futures, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self.slots.release()
+
+    def close(self):
+        if self.batch_task is not None:
+            self.batch_task.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def aclose(self):
+        """Stops batching, lets running batches answer their callers and fails whatever is still queued."""
+        if self.batch_task is not None:
+            self.batch_task.cancel()
+            await asyncio.gather(self.batch_task, return_exceptions=True)
+            self._fail_pending(self.batch_task)
+        if self._batch_tasks:
+            await asyncio.gather(*self._batch_tasks, return_exceptions=True)
+        self.executor.shutdown(wait=False, cancel_futures=True)
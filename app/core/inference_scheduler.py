@@ -0,0 +1,83 @@
+import os
+import asyncio
+import logging
+
+logger = logging.getLogger("InferenceScheduler")
+
+class InferenceScheduler:
+    def __init__(self, run_inference, hop=None, max_in_flight=None, gate=None):
+        """
+        Decides when a device's window is scored instead of scoring on every packet.
+        run_inference: async callable(device, magnitude) that scores the device's *current* window.
+        hop: Packets between two inferences of the same device (CSI_INFERENCE_HOP, default 25).
+        max_in_flight: Global cap on concurrently running inference tasks (CSI_MAX_INFERENCE_TASKS).
+        gate: Optional MotionGate; due windows of a device it considers idle are skipped.
+
+        At most one inference task runs per device. Requests arriving while it runs are coalesced
+        into a single pending run, which reads the latest window when it starts.
+        """
+        self.run_inference = run_inference
+        self.hop = hop or int(os.getenv("CSI_INFERENCE_HOP", "25"))
+        self.max_in_flight = max_in_flight or int(os.getenv("CSI_MAX_INFERENCE_TASKS", "64"))
+        self.gate = gate
+        self.in_flight = 0
+        self.stats = {
+            "requested": 0,   # hop reached, a window is due
+            "scheduled": 0,   # new inference task started
+            "coalesced": 0,   # folded into an already running/pending inference for the device
+            "dropped": 0,     # skipped because max_in_flight was reached
+            "gated": 0,       # skipped because the motion gate saw no activity
+            "completed": 0,
+            "failed": 0,
+        }
+
+    def notify(self, device, magnitude, packets=1):
+        """
+        Called after packets were added to a full device buffer. Never blocks.
+        """
+        device.packets_since_inference += packets
+        if device.packets_since_inference < self.hop:
+            return
+        device.packets_since_inference = 0
+        self.stats["requested"] += 1
+
+        if self.gate is not None and not self.gate.should_score(device):
+            self.stats["gated"] += 1
+            return
+
+        if device.inference_task is not None:
+            # Only the latest window matters, the pending run reads it when it starts
+            self.stats["coalesced"] += 1
+            device.pending_magnitude = magnitude
+            return
+
+        if self.in_flight >= self.max_in_flight:
+            self.stats["dropped"] += 1
+            return
+
+        self.in_flight += 1
+        self.stats["scheduled"] += 1
+        device.inference_task = asyncio.create_task(self._run(device, magnitude))
+
+    async def _run(self, device, magnitude):
+        try:
+            while True:
+                try:
+                    await self.run_inference(device, magnitude)
+                    self.stats["completed"] += 1
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    logger.error(f"Inference failed for device {device.device_id}: {e}")
+                if device.pending_magnitude is None:
+                    break
+                magnitude = device.pending_magnitude
+                device.pending_magnitude = None
+        finally:
+            device.inference_task = None
+            self.in_flight -= 1
+
+    def snapshot(self):
+        snapshot = {**self.stats, "in_flight": self.in_flight, "hop": self.hop, "max_in_flight": self.max_in_flight}
+        if self.gate is not None:
+            snapshot["gate"] = self.gate.snapshot()
+        return snapshot
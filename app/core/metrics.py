@@ -0,0 +1,183 @@
+import math
+import os
+from bisect import bisect_left
+
+# Seconds, 100 us to 10 s: the hot path is sub-millisecond, Walrus publishes take seconds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value):
+    value = float(value)
+    # The text format spells these NaN, +Inf and -Inf, not Python's nan / inf
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if value.is_integer() else repr(value)
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, documentation, labelnames=(), function=None, registry=None):
+        """
+        name, documentation: Prometheus metric name and HELP text.
+        labelnames: Label names; values are bound once with labels(...) and the child kept.
+        function: Optional callable evaluated at scrape time instead of recorded values.
+            Returns a number, or {label values tuple: number} when the metric has labels.
+            Keeps state the app already tracks (queue sizes, per-device counters) off the hot path.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.function = function
+        self._children = {}
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def labels(self, *values, **kwargs):
+        """Returns the child for these label values; bind it once and reuse it on hot paths."""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = self._new_child()
+        return child
+
+    def _samples(self):
+        """(suffix, label values, extra label, value) tuples for render()."""
+        if self.function is not None:
+            value = self.function()
+            if isinstance(value, dict):
+                for key, v in value.items():
+                    yield "", key if isinstance(key, tuple) else (key,), None, v
+            else:
+                yield "", (), None, value
+            return
+        for key, child in self._children.items():
+            yield from child.samples(key)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, values, extra, value in self._samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, values, extra)} {_format_value(value)}")
+        return lines
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount=1):
+        if ENABLED:
+            self.value += amount
+
+    def set(self, value):
+        if ENABLED:
+            self.value = value
+
+    def samples(self, key):
+        yield "", key, None, self.value
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not self.labelnames and self.function is None:
+            self._default = self.labels()
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        if ENABLED:
+            self._default.value += amount
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value):
+        if ENABLED:
+            self._default.value = value
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        if ENABLED:
+            # Per-bucket counts, made cumulative only when scraped
+            self.counts[bisect_left(self.bounds, value)] += 1
+            self.sum += value
+            self.count += 1
+
+    def samples(self, key):
+        cumulative = 0
+        for bound, n in zip(self.bounds + (math.inf,), self.counts):
+            cumulative += n
+            yield "_bucket", key, f'le="{_format_value(bound)}"', cumulative
+        yield "_sum", key, None, self.sum
+        yield "_count", key, None, self.count
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry=registry)
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+class Registry:
+    """Holds every metric and renders them in the Prometheus text exposition format."""
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+
+    def unregister(self, name):
+        self.metrics.pop(name, None)
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                # A failing scrape-time callback must not take the other metrics down
+                lines.append(f"# {metric.name} unavailable: {_escape(e)}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+# CSI_METRICS=0 turns every inc/set/observe into a no-op (scrape-time functions still report)
+ENABLED = os.getenv("CSI_METRICS", "1") != "0"
+
+def set_enabled(enabled):
+    global ENABLED
+    ENABLED = bool(enabled)
@@ -1,13 +1,93 @@
 import os
+import json
+import time
+import asyncio
 import joblib
 import numpy as np
 import logging
+from app.core.inference_pool import BatchingPredictor
+from app.core.forest_engine import FlatForest
+from app.core.features import WINDOW_MEAN, feature_function
+from app.core.metrics import Counter, Histogram
+
+# Predictions that trigger an alert and a Walrus record
+EMERGENCY_CLASSES = ("Düşme", "Hareketsizlik")
+
+PREDICT_SECONDS = Histogram("csi_predict_seconds", "ModelManager.predict latency, including the micro-batching wait")
+PREDICTIONS = Counter("csi_predictions_total", "Windows scored, by predicted class", ["prediction"])
+
+def metadata_path(model_path):
+    """model.pkl -> model.meta.json, written by scripts/train_model.py next to the model."""
+    return os.path.splitext(model_path)[0] + ".meta.json"
+
+def read_metadata(model_path):
+    """
+    Training metadata (feature spec, window_size, hop, sampling_rate, ...) or {} for models
+    saved without one, which were trained on single rows and are served on the window mean.
+    """
+    path = metadata_path(model_path)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+class LoadedModel:
+    def __init__(self, model, predict_proba, version, path=None, engine="sklearn", meta=None):
+        """
+        Everything inference needs from one model version. Never mutated after creation, so a
+        worker that grabbed it keeps a consistent view while a newer version is swapped in.
+        """
+        self.model = model
+        self.predict_proba = predict_proba
+        self.version = version
+        self.path = path
+        self.engine = engine
+        # Class metadata is fixed per model, resolve it once instead of per inference
+        self.classes = [str(c) for c in model.classes_]
+        self.emergency_mask = np.isin(self.classes, EMERGENCY_CLASSES)
+        self.n_features = getattr(model, "n_features_in_", None)
+        self.meta = meta or {}
+        # Same function the training pipeline applied to its windows
+        self.features = feature_function(self.meta.get("feature", WINDOW_MEAN))
+        self.loaded_at = time.time()
+
+    def info(self):
+        return {
+            "version": self.version,
+            "path": self.path,
+            "engine": self.engine,
+            "classes": self.classes,
+            "n_features": self.n_features,
+            "loaded_at": self.loaded_at,
+            "meta": self.meta,
+        }
 
 class ModelManager:
-    def __init__(self, model_path="app/models/model.pkl"):
+    def __init__(self, model_path="app/models/model.pkl", engine=None, mmap_mode=None, versions_dir=None):
+        """
+        engine: "sklearn" (predict_proba) or "flat" (FlatForest, vectorized over trees and rows).
+            Defaults to CSI_INFERENCE_ENGINE, then "sklearn".
+        mmap_mode: joblib mmap_mode (e.g. "r", CSI_MODEL_MMAP). Arrays are memory-mapped from disk
+            so several uvicorn workers share one page-cache copy. With the flat engine the exported
+            arrays are cached next to the model and mapped directly.
+        versions_dir: Directory of versioned models (<version>.pkl) selectable via reload().
+        """
         self.model_path = model_path
-        self.model = None
+        self.engine = engine or os.getenv("CSI_INFERENCE_ENGINE", "sklearn")
+        self.mmap_mode = mmap_mode or os.getenv("CSI_MODEL_MMAP") or None
+        self.versions_dir = versions_dir or os.path.join(os.path.dirname(model_path), "versions")
+        self.active = None
+        self.reload_lock = asyncio.Lock()
         self.logger = logging.getLogger("ModelManager")
+        # Window the server was started with; buffers are sized once, so a model trained on another window needs a restart
+        self.serving_meta = read_metadata(model_path)
+        # Forest evaluation runs in worker threads, concurrent windows share one predict call
+        self.batcher = BatchingPredictor(self.predict_batch)
+
+    @property
+    def model(self):
+        active = self.active
+        return active.model if active is not None else None
 
     def load_model(self):
         """
@@ -15,44 +95,219 @@ class ModelManager:
         """
         if os.path.exists(self.model_path):
             try:
-                self.model = joblib.load(self.model_path)
-                self.logger.info(f"Model loaded successfully from {self.model_path}")
+                self.active = self._load(self.model_path)
+                self.logger.info(f"Model {self.active.version} loaded successfully from {self.model_path}")
             except Exception as e:
                 self.logger.error(f"Error loading model: {e}")
-                self.model = None
+                self.active = None
         else:
             self.logger.warning(f"Model file {self.model_path} not found. Using mock inference.")
-            self.model = None
+            self.active = None
+
+    def _version_for(self, path):
+        stem = os.path.splitext(os.path.basename(path))[0]
+        modified = time.strftime("%Y%m%d%H%M%S", time.localtime(os.path.getmtime(path)))
+        return f"{stem}-{modified}"
+
+    def _load(self, path, version=None):
+        """
+        Loads a model file into a LoadedModel without touching the active one. Blocking.
+        """
+        version = version or self._version_for(path)
+        meta = read_metadata(path)
+        window = meta.get("window_size")
+        if window is not None and window != self.serving_meta.get("window_size", window):
+            self.logger.warning(f"Model {version} was trained on {window}-packet windows, the server buffers "
+                                f"{self.serving_meta['window_size']}; restart to resize the buffers")
+        if self.engine == "flat":
+            flat = self._load_flat_cache(path)
+            if flat is not None:
+                return LoadedModel(flat, flat.predict_proba, version, path, engine="flat", meta=meta)
+        return self._prepare(joblib.load(path, mmap_mode=self.mmap_mode), version, path, meta)
+
+    def _prepare(self, model, version, path=None, meta=None):
+        # Parallelism comes from BatchingPredictor workers; joblib fan-out per
+        # single-row call costs more than the trees themselves
+        if hasattr(model, "n_jobs"):
+            model.n_jobs = 1
+        if self.engine == "flat":
+            try:
+                flat = FlatForest.from_sklearn(model)
+                self.logger.info(f"Using flat forest engine ({flat.node_count} nodes, depth {flat.max_depth})")
+                if path is not None:
+                    self._save_flat_cache(path, flat)
+                return LoadedModel(model, flat.predict_proba, version, path, engine="flat", meta=meta)
+            except ValueError as e:
+                self.logger.warning(f"Flat engine unavailable, falling back to sklearn: {e}")
+        return LoadedModel(model, model.predict_proba, version, path, meta=meta)
+
+    def _flat_cache_path(self, path):
+        return path + ".flat.joblib"
+
+    def _source_signature(self, path):
+        stat = os.stat(path)
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def _load_flat_cache(self, path):
+        """
+        Returns the exported FlatForest for path if the cache matches the model file, else None.
+        sklearn trees copy their nodes on unpickling, the flat arrays can stay memory-mapped.
+        """
+        cache_path = self._flat_cache_path(path)
+        if not os.path.exists(cache_path):
+            return None
+        try:
+            cached = joblib.load(cache_path, mmap_mode=self.mmap_mode)
+            # Caches exported before FlatForest carried missing_left are rebuilt from the model
+            if list(cached["source"]) == self._source_signature(path) and hasattr(cached["forest"], "missing_left"):
+                return cached["forest"]
+        except Exception as e:
+            self.logger.warning(f"Ignoring flat forest cache {cache_path}: {e}")
+        return None
+
+    def _save_flat_cache(self, path, flat):
+        cache_path = self._flat_cache_path(path)
+        try:
+            tmp_path = cache_path + ".tmp"
+            # Uncompressed so it can be memory-mapped
+            joblib.dump({"source": self._source_signature(path), "forest": flat}, tmp_path)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            self.logger.warning(f"Could not write flat forest cache {cache_path}: {e}")
+
+    def set_model(self, model, version="manual", meta=None):
+        """
+        Installs an in-memory fitted classifier.
+        """
+        self.active = self._prepare(model, version, meta=meta)
+
+    def available_versions(self):
+        if not os.path.isdir(self.versions_dir):
+            return []
+        return sorted(os.path.splitext(name)[0] for name in os.listdir(self.versions_dir) if name.endswith(".pkl"))
+
+    def version_path(self, version):
+        """
+        Path of a registered version. The name comes from API requests, so only names listed by
+        available_versions() are accepted; anything else could point joblib at an arbitrary file.
+        """
+        if not isinstance(version, str) or not version or "/" in version or "\\" in version or ".." in version:
+            raise ValueError(f"Invalid model version {version!r}")
+        if version not in self.available_versions():
+            raise FileNotFoundError(f"Model version {version} not found in {self.versions_dir}")
+        return os.path.join(self.versions_dir, f"{version}.pkl")
+
+    async def reload(self, version=None, path=None):
+        """
+        Loads a model version in a background thread and swaps it in atomically.
+        version: Name of a file in versions_dir (ValueError if malformed, FileNotFoundError if not
+            registered); path: explicit file. Defaults to model_path.
+        In-flight predictions finish on the version they started with. Raises on failure,
+        leaving the active model untouched.
+        """
+        if version is not None:
+            path = self.version_path(version)
+        path = path or self.model_path
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Model file {path} not found")
+        async with self.reload_lock:
+            loaded = await asyncio.get_running_loop().run_in_executor(None, self._load, path, version)
+            previous = self.active
+            self.active = loaded
+        self.logger.info(f"Model swapped: {previous.version if previous else None} -> {loaded.version}")
+        return loaded.info()
+
+    async def watch(self, interval):
+        """
+        Polls model_path and hot-reloads it when the file changes (e.g. a retrained model.pkl is deployed).
+        """
+        last_signature = self._source_signature(self.model_path) if os.path.exists(self.model_path) else None
+        while True:
+            await asyncio.sleep(interval)
+            if not os.path.exists(self.model_path):
+                continue
+            signature = self._source_signature(self.model_path)
+            if signature == last_signature:
+                continue
+            last_signature = signature
+            try:
+                await self.reload()
+            except Exception as e:
+                self.logger.error(f"Model hot-reload failed, keeping current model: {e}")
+
+    def info(self):
+        active = self.active
+        return {
+            "active": active.info() if active is not None else None,
+            "versions": self.available_versions(),
+        }
 
     async def predict(self, processed_window):
         """
         Performs inference on the processed window.
-        processed_window: numpy array (100, 1026) or similar.
-        
-        Since the model was trained on individual rows of 1026 features, 
-        we will take the mean of the window features for inference.
+        processed_window: numpy array (100, 1026) or similar, or an already reduced
+        (1026,) feature vector such as CSIBuffer.feature_vector().
+
+        A window is reduced with the feature function named in the model's metadata
+        (the window mean, same as scripts/train_model.py).
+
+        Returns (prediction, confidence, probabilities, is_emergency) where probabilities maps
+        every class to its probability.
         """
-        if self.model is None:
+        start = time.perf_counter()
+        result = await self._predict(processed_window)
+        PREDICT_SECONDS.observe(time.perf_counter() - start)
+        PREDICTIONS.labels(result[0]).inc()
+        return result
+
+    async def _predict(self, processed_window):
+        active = self.active
+        if active is None:
             # Fallback to mock if model didn't load
             classes = ["Normal", "Düşme", "Hareketsizlik"]
-            prediction = np.random.choice(classes, p=[0.8, 0.1, 0.1])
+            prediction = str(np.random.choice(classes, p=[0.8, 0.1, 0.1]))
             confidence = float(np.random.uniform(0.7, 0.99))
-            return prediction, confidence
-        
+            probabilities = {c: (confidence if c == prediction else (1.0 - confidence) / 2) for c in classes}
+            return prediction, confidence, probabilities, prediction in EMERGENCY_CLASSES
+
         try:
-            # If processed_window is (window_size, features), take the mean across the window
-            # to get a single vector of 1026 features.
+            # If processed_window is (window_size, features), reduce it to a single feature vector
             if processed_window.ndim > 1:
-                input_data = np.mean(processed_window, axis=0).reshape(1, -1)
+                input_data = active.features(processed_window)
             else:
-                input_data = processed_window.reshape(1, -1)
-            
-            prediction = self.model.predict(input_data)[0]
-            # Random Forest doesn't always give simple confidence, use predict_proba
-            probabilities = self.model.predict_proba(input_data)[0]
-            confidence = float(np.max(probabilities))
-            
-            return str(prediction), confidence
+                input_data = processed_window.reshape(-1)
+            # Reject bad rows here so they cannot fail a shared batch
+            expected = active.n_features or input_data.size
+            if input_data.size != expected:
+                raise ValueError(f"X has {input_data.size} features, but the model is expecting {expected} features as input.")
+
+            return await self.batcher.submit(input_data)
         except Exception as e:
             self.logger.error(f"Inference error: {e}")
-            return "Normal", 0.0
+            return "Normal", 0.0, {}, False
+
+    def predict_batch(self, X):
+        """
+        Synchronous inference for a (rows, features) batch, called from BatchingPredictor workers.
+        Returns one (prediction, confidence, probabilities, is_emergency) tuple per row.
+
+        A single predict_proba pass: RandomForestClassifier.predict is argmax over the same
+        probabilities, so calling both would walk every tree twice.
+        """
+        # One snapshot for the whole batch, a concurrent reload cannot mix versions
+        active = self.active
+        probabilities = active.predict_proba(X)
+        best = np.argmax(probabilities, axis=1)
+        confidences = probabilities[np.arange(len(best)), best]
+        emergencies = active.emergency_mask[best]
+        classes = active.classes
+        return [
+            (classes[i], float(c), dict(zip(classes, row.tolist())), bool(e))
+            for i, c, row, e in zip(best, confidences, probabilities, emergencies)
+        ]
+
+    def close(self):
+        self.batcher.close()
+
+    async def aclose(self):
+        await self.batcher.aclose()
@@ -0,0 +1,131 @@
+import os
+import numpy as np
+
+class GateState:
+    """Per-device detector state, kept on DeviceState.gate so it is evicted with the device."""
+    __slots__ = ("packets", "last_magnitude", "sta", "lta", "noise", "last_active_ns", "last_scored_ns", "last_ns")
+
+    def __init__(self):
+        self.packets = 0
+        self.last_magnitude = None
+        self.sta = 0.0
+        self.lta = 0.0
+        self.noise = None
+        self.last_active_ns = None
+        self.last_scored_ns = None
+        self.last_ns = 0
+
+class MotionGate:
+    def __init__(self, sampling_rate=100, sta_seconds=None, lta_seconds=None, ratio=None, floor=None,
+                 hold_seconds=None, heartbeat_seconds=None, noise_adapt_seconds=None):
+        """
+        First-stage motion detector that decides whether a window is worth running the classifier on.
+        Works on the per-packet magnitude (SignalProcessor.calculate_magnitudes), so it costs O(1) per
+        packet instead of a forest evaluation per hop.
+
+        Energy is the squared packet-to-packet magnitude change. Two exponential averages of it are kept:
+        a short-term one (STA) and a long-term one (LTA), plus a slowly adapting noise floor (the idle room).
+        A device is "active" when
+            STA > ratio * LTA   (onset: the signal just started moving) or
+            STA > floor * noise (sustained motion well above the empty-room level).
+        sta_seconds / lta_seconds: Averaging time constants (CSI_GATE_STA, CSI_GATE_LTA, default 0.5 / 10).
+        ratio: Onset threshold (CSI_GATE_RATIO, default 2.0).
+        floor: Sustained-motion threshold over the noise floor (CSI_GATE_FLOOR, default 3.0).
+        hold_seconds: Windows keep being scored this long after the last activity (CSI_GATE_HOLD, default 3),
+            so the end of a fall and the stillness after it are classified.
+        heartbeat_seconds: An idle device is still scored this often (CSI_GATE_HEARTBEAT, default 5),
+            which keeps last_prediction fresh and lets the classifier report Hareketsizlik.
+        noise_adapt_seconds: Time constant for the noise floor to follow a higher baseline (CSI_GATE_NOISE_ADAPT, default 1800).
+        """
+        self.sampling_rate = sampling_rate
+        sta_seconds = sta_seconds or float(os.getenv("CSI_GATE_STA", "0.5"))
+        lta_seconds = lta_seconds or float(os.getenv("CSI_GATE_LTA", "10"))
+        noise_adapt_seconds = noise_adapt_seconds or float(os.getenv("CSI_GATE_NOISE_ADAPT", "1800"))
+        self.sta_alpha = 1.0 / max(1.0, sta_seconds * sampling_rate)
+        self.lta_alpha = 1.0 / max(1.0, lta_seconds * sampling_rate)
+        self.noise_alpha = 1.0 / max(1.0, noise_adapt_seconds * sampling_rate)
+        self.warmup_packets = int(lta_seconds * sampling_rate)
+        self.ratio = ratio or float(os.getenv("CSI_GATE_RATIO", "2.0"))
+        self.floor = floor or float(os.getenv("CSI_GATE_FLOOR", "3.0"))
+        self.hold_ns = int((hold_seconds if hold_seconds is not None else float(os.getenv("CSI_GATE_HOLD", "3"))) * 1e9)
+        self.heartbeat_ns = int((heartbeat_seconds if heartbeat_seconds is not None else float(os.getenv("CSI_GATE_HEARTBEAT", "5"))) * 1e9)
+        self.stats = {"windows": 0, "scored": 0, "gated": 0, "heartbeats": 0}
+
+    @staticmethod
+    def _ema(value, alpha, samples):
+        """Exponential average after feeding samples, in closed form (no per-packet Python loop)."""
+        n = len(samples)
+        decay = 1.0 - alpha
+        weights = alpha * decay ** np.arange(n - 1, -1, -1)
+        return value * decay ** n + float(weights @ samples)
+
+    def update(self, device, magnitudes, timestamps_ns):
+        """
+        Feeds the packets just ingested for a device.
+        magnitudes: One value or an array (one per packet, arrival order).
+        timestamps_ns: Matching timestamp(s) in ns since epoch.
+        """
+        state = device.gate
+        if state is None:
+            state = device.gate = GateState()
+        magnitudes = np.atleast_1d(np.asarray(magnitudes, dtype=np.float64))
+        state.last_ns = int(np.max(timestamps_ns))
+        if state.last_magnitude is not None:
+            diffs = np.diff(magnitudes, prepend=state.last_magnitude)
+        else:
+            diffs = np.diff(magnitudes)
+        state.last_magnitude = float(magnitudes[-1])
+        if len(diffs) == 0:
+            return
+        energy = diffs * diffs
+        if state.packets == 0:
+            state.sta = state.lta = float(energy.mean())
+        state.sta = self._ema(state.sta, self.sta_alpha, energy)
+        state.lta = self._ema(state.lta, self.lta_alpha, energy)
+        state.packets += len(energy)
+
+        if state.packets >= self.warmup_packets:
+            if state.noise is None or state.lta < state.noise:
+                state.noise = state.lta
+            else:
+                state.noise += (state.lta - state.noise) * min(1.0, self.noise_alpha * len(energy))
+
+        if self.is_active(state):
+            state.last_active_ns = state.last_ns
+
+    def is_active(self, state):
+        if state.noise is None:
+            return True  # still learning this room's baseline
+        return state.sta > self.ratio * state.lta or state.sta > self.floor * state.noise
+
+    def should_score(self, device):
+        """Called when a window is due; counts the decision."""
+        state = device.gate
+        self.stats["windows"] += 1
+        if state is None:
+            self.stats["scored"] += 1
+            return True
+        now = state.last_ns
+        if state.last_active_ns is not None and now - state.last_active_ns <= self.hold_ns:
+            score = True
+        elif state.last_scored_ns is None or now - state.last_scored_ns >= self.heartbeat_ns:
+            score = True
+            self.stats["heartbeats"] += 1
+        else:
+            score = False
+        if score:
+            state.last_scored_ns = now
+            self.stats["scored"] += 1
+        else:
+            self.stats["gated"] += 1
+        return score
+
+    def snapshot(self):
+        windows = self.stats["windows"]
+        return {**self.stats, "gated_ratio": round(self.stats["gated"] / windows, 4) if windows else 0.0}
+
+def gate_from_env(sampling_rate=100):
+    """MotionGate unless disabled with CSI_MOTION_GATE=0."""
+    if os.getenv("CSI_MOTION_GATE", "1") == "0":
+        return None
+    return MotionGate(sampling_rate=sampling_rate)
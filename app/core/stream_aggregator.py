@@ -0,0 +1,71 @@
+import os
+import numpy as np
+from datetime import datetime
+
+class StreamAggregator:
+    def __init__(self, rates=None):
+        """
+        Downsamples each device's per-packet magnitude into fixed-rate buckets, the server-side
+        version of the HEDEF_FPS resampling in csi_analysis.py.
+        rates: Output rates in Hz (CSI_STREAM_RATES, default "3,10").
+
+        Bucket state lives on the DeviceState (device.streams) so it is evicted with the device.
+        A point is emitted when the first packet of a later bucket arrives.
+        """
+        if rates is None:
+            rates = [float(r) for r in os.getenv("CSI_STREAM_RATES", "3,10").split(",") if r.strip()]
+        self.rates = [self._rate_key(r) for r in rates]
+        self.periods_ns = [int(1e9 / r) for r in self.rates]
+
+    @staticmethod
+    def _rate_key(rate):
+        # 3.0 -> 3 so topics read magnitude:3, not magnitude:3.0
+        return int(rate) if float(rate).is_integer() else float(rate)
+
+    def add(self, device, magnitudes, timestamps_ns):
+        """
+        magnitudes: One value or an array (one per packet, arrival order).
+        timestamps_ns: Matching timestamp(s) in ns since epoch.
+        Returns a list of (rate, point) for every bucket closed by these packets.
+        """
+        magnitudes = np.atleast_1d(np.asarray(magnitudes, dtype=np.float64))
+        timestamps = np.broadcast_to(np.asarray(timestamps_ns, dtype=np.int64), magnitudes.shape)
+        points = []
+        for rate, period in zip(self.rates, self.periods_ns):
+            buckets = timestamps // period
+            state = device.streams.get(rate)  # [bucket, count, sum, min, max]
+            # Runs of packets that fall into the same bucket
+            boundaries = np.flatnonzero(np.diff(buckets)) + 1
+            starts = np.concatenate(([0], boundaries))
+            ends = np.concatenate((boundaries, [len(buckets)]))
+            for start, end in zip(starts, ends):
+                bucket = int(buckets[start])
+                segment = magnitudes[start:end]
+                if state is not None and bucket <= state[0]:
+                    # Same bucket (or a late packet): merge
+                    state[1] += len(segment)
+                    state[2] += float(segment.sum())
+                    state[3] = min(state[3], float(segment.min()))
+                    state[4] = max(state[4], float(segment.max()))
+                    continue
+                if state is not None:
+                    points.append((rate, self._point(device.device_id, rate, period, state)))
+                state = [bucket, len(segment), float(segment.sum()), float(segment.min()), float(segment.max())]
+            device.streams[rate] = state
+        return points
+
+    @staticmethod
+    def _point(device_id, rate, period, state):
+        bucket, count, total, low, high = state
+        start_s = bucket * period / 1e9
+        return {
+            "type": "magnitude",
+            "device_id": device_id,
+            "rate": rate,
+            "t": start_s,
+            "timestamp": datetime.utcfromtimestamp(start_s).isoformat(),
+            "min": low,
+            "mean": total / count,
+            "max": high,
+            "count": count,
+        }
@@ -1,16 +1,30 @@
 import httpx
+import importlib.util
 import json
 import logging
 from datetime import datetime
 import os
+import time
+from app.core.blob_cache import BlobCache
+from app.core.metrics import Counter, Histogram
 
 logger = logging.getLogger("WalrusClient")
 
+PUBLISH_SECONDS = Histogram("csi_walrus_publish_seconds", "WalrusClient.publish_blob latency, failures included")
+PUBLISHES = Counter("csi_walrus_publishes_total", "Walrus publishes by result", ["result"])
+PUBLISH_SUCCESS = PUBLISHES.labels("success")
+PUBLISH_FAILURE = PUBLISHES.labels("failure")
+
 class WalrusClient:
     def __init__(
         self,
         publisher_url: str | None = None,
         aggregator_url: str | None = None,
+        timeout: float | None = None,
+        connect_timeout: float | None = None,
+        max_connections: int | None = None,
+        max_keepalive_connections: int | None = None,
+        http2: bool | None = None,
     ):
         # Allow override via env vars for deployments / custom funded publisher
         publisher_url = publisher_url or os.getenv("WALRUS_PUBLISHER_URL", "https://publisher.walrus-testnet.walrus.space")
@@ -18,6 +32,42 @@ class WalrusClient:
         self.publisher_url = publisher_url.rstrip("/")
         self.aggregator_url = aggregator_url.rstrip("/")
 
+        # One pooled keep-alive client for all publishes and reads (no TCP+TLS handshake per call)
+        self.timeout = timeout or float(os.getenv("WALRUS_TIMEOUT", "30"))
+        self.connect_timeout = connect_timeout or float(os.getenv("WALRUS_CONNECT_TIMEOUT", "5"))
+        self.max_connections = max_connections or int(os.getenv("WALRUS_MAX_CONNECTIONS", "20"))
+        self.max_keepalive_connections = max_keepalive_connections or int(os.getenv("WALRUS_MAX_KEEPALIVE", "10"))
+        if http2 is None:
+            http2 = os.getenv("WALRUS_HTTP2", "1") == "1"
+        # HTTP/2 needs the optional h2 package (httpx[http2] in requirements.txt)
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        if http2 and not self.http2:
+            logger.warning("WALRUS_HTTP2 is enabled but the h2 package is not installed, using HTTP/1.1 "
+                           "(pip install 'httpx[http2]')")
+        self._client: httpx.AsyncClient | None = None
+        # Blob ids are content-addressed, so reads are cached in memory and on disk indefinitely
+        self.cache = BlobCache(self._fetch_blob)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=60.0,
+                ),
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            )
+        return self._client
+
+    async def aclose(self):
+        """Closes pooled connections, call on application shutdown."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
     async def publish_blob(self, data: dict, data_type: str = "event", epochs: int = 10):
         """
         Publishes data to Walrus as a blob.
@@ -35,43 +85,69 @@ class WalrusClient:
             }
         }
 
+        body = json.dumps(payload).encode()
+        start = time.perf_counter()
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.put(
-                    url, 
-                    content=json.dumps(payload),
-                    params={"epochs": epochs}, # store duration (epochs)
-                    timeout=30.0
-                )
-                
-                if response.status_code in [200, 201]:
-                    result = response.json()
-                    blob_id = result.get("newBlob", {}).get("blobId") or result.get("alreadyCertified", {}).get("blobId")
-                    logger.info(f"Published {data_type} to Walrus. Blob ID: {blob_id}")
-                    return blob_id
-                else:
-                    logger.error(f"Failed to publish {data_type} to Walrus: {response.status_code} - {response.text}")
-                    return None
+            response = await self.client.put(
+                url, 
+                content=body,
+                params={"epochs": epochs}, # store duration (epochs)
+            )
+            
+            if response.status_code in [200, 201]:
+                result = response.json()
+                blob_id = result.get("newBlob", {}).get("blobId") or result.get("alreadyCertified", {}).get("blobId")
+                logger.info(f"Published {data_type} to Walrus. Blob ID: {blob_id}")
+                PUBLISH_SECONDS.observe(time.perf_counter() - start)
+                (PUBLISH_SUCCESS if blob_id else PUBLISH_FAILURE).inc()
+                if blob_id:
+                    # The blob is exactly what was sent, later reads need no round trip
+                    await self.cache.put(blob_id, body)
+                return blob_id
+            else:
+                logger.error(f"Failed to publish {data_type} to Walrus: {response.status_code} - {response.text}")
         except Exception as e:
             logger.error(f"Walrus publication error: {e}")
-            return None
+        PUBLISH_SECONDS.observe(time.perf_counter() - start)
+        PUBLISH_FAILURE.inc()
+        return None
 
-    async def read_blob(self, blob_id: str):
-        """
-        Reads a blob from Walrus aggregator.
-        """
+    async def _fetch_blob(self, blob_id: str):
+        """Raw blob bytes from the aggregator, None when unavailable."""
         url = f"{self.aggregator_url}/v1/blobs/{blob_id}"
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, timeout=30.0)
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    logger.error(f"Failed to read blob {blob_id}: {response.status_code}")
-                    return None
+            response = await self.client.get(url)
+            if response.status_code == 200:
+                return response.content
+            else:
+                logger.error(f"Failed to read blob {blob_id}: {response.status_code}")
+                return None
         except Exception as e:
             logger.error(f"Walrus read error: {e}")
             return None
 
+    @staticmethod
+    def _decode(blob_id, data):
+        if data is None:
+            return None
+        try:
+            return json.loads(data)
+        except ValueError:
+            logger.error(f"Blob {blob_id} is not JSON")
+            return None
+
+    async def read_blob(self, blob_id: str):
+        """
+        Reads a blob from Walrus aggregator (through the blob cache).
+        """
+        return self._decode(blob_id, await self.cache.get(blob_id))
+
+    async def read_blobs(self, blob_ids):
+        """
+        Reads many blobs concurrently, returns {blob_id: data or None}.
+        """
+        blobs = await self.cache.prefetch(blob_ids)
+        return {blob_id: self._decode(blob_id, data) for blob_id, data in blobs.items()}
+
 # Singleton instance
 walrus_client = WalrusClient()
@@ -0,0 +1,239 @@
+import os
+import json
+import time
+import random
+import sqlite3
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger("WalrusOutbox")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    data_type TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    epochs INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    blob_id TEXT,
+    published_at REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox(next_attempt_at) WHERE blob_id IS NULL;
+CREATE INDEX IF NOT EXISTS outbox_published ON outbox(published_at) WHERE blob_id IS NOT NULL;
+"""
+
+class WalrusOutbox:
+    def __init__(self, walrus_client, path=None, concurrency=None, batch_size=None,
+                 base_backoff=None, max_backoff=None, retention_seconds=None):
+        """
+        Durable write-behind queue in front of WalrusClient.publish_blob.
+        Events are appended to a local SQLite file (WAL) before anything else happens, then a
+        background publisher drains it. Unpublished rows survive restarts and are retried.
+        path: SQLite file (WALRUS_OUTBOX_PATH, default app/data/walrus_outbox.sqlite3).
+        concurrency: Publishes in flight at once (WALRUS_OUTBOX_CONCURRENCY, default 4).
+        batch_size: Events of the same type combined into one blob (WALRUS_OUTBOX_BATCH, default 1 = no batching).
+        base_backoff / max_backoff: Exponential retry delay bounds in seconds (default 1 / 300).
+        retention_seconds: Published rows older than this are pruned (default 7 days).
+        """
+        self.walrus_client = walrus_client
+        self.path = path or os.getenv("WALRUS_OUTBOX_PATH", "app/data/walrus_outbox.sqlite3")
+        self.concurrency = concurrency or int(os.getenv("WALRUS_OUTBOX_CONCURRENCY", "4"))
+        self.batch_size = batch_size or int(os.getenv("WALRUS_OUTBOX_BATCH", "1"))
+        self.base_backoff = base_backoff or float(os.getenv("WALRUS_OUTBOX_BASE_BACKOFF", "1"))
+        self.max_backoff = max_backoff or float(os.getenv("WALRUS_OUTBOX_MAX_BACKOFF", "300"))
+        self.retention_seconds = retention_seconds or float(os.getenv("WALRUS_OUTBOX_RETENTION", str(7 * 24 * 3600)))
+        self.listeners = []  # async callables(event_ids, blob_id, data_type)
+        self.stats = {"enqueued": 0, "published": 0, "failed_attempts": 0, "blobs": 0}
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._wakeup = None
+        self._in_flight = set()
+        self._publish_tasks = set()  # running _publish tasks, referenced until done
+        self._slots = None
+        self._task = None
+
+    # --- storage (runs in worker threads) ---
+
+    def _connect(self):
+        if self._db is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.executescript(SCHEMA)
+            self._db = db
+        return self._db
+
+    def _execute(self, fn):
+        with self._db_lock:
+            db = self._connect()
+            with db:
+                return fn(db)
+
+    def _insert(self, data_type, payload, epochs, now):
+        return self._execute(lambda db: db.execute(
+            "INSERT INTO outbox (data_type, payload, epochs, created_at, next_attempt_at) VALUES (?, ?, ?, ?, ?)",
+            (data_type, payload, epochs, now, now),
+        ).lastrowid)
+
+    def _fetch_due(self, now, limit, exclude):
+        def query(db):
+            rows = db.execute(
+                "SELECT id, data_type, payload, epochs, attempts FROM outbox "
+                "WHERE blob_id IS NULL AND next_attempt_at <= ? ORDER BY next_attempt_at, id LIMIT ?",
+                (now, limit + len(exclude)),
+            ).fetchall()
+            next_due = db.execute("SELECT MIN(next_attempt_at) FROM outbox WHERE blob_id IS NULL AND next_attempt_at > ?", (now,)).fetchone()[0]
+            return [row for row in rows if row[0] not in exclude][:limit], next_due
+        return self._execute(query)
+
+    def _mark_published(self, ids, blob_id, now):
+        self._execute(lambda db: db.executemany(
+            "UPDATE outbox SET blob_id = ?, published_at = ?, attempts = attempts + 1, last_error = NULL WHERE id = ?",
+            [(blob_id, now, event_id) for event_id in ids],
+        ))
+
+    def _mark_failed(self, rows, error, now):
+        updates = []
+        for event_id, _, _, _, attempts in rows:
+            delay = min(self.max_backoff, self.base_backoff * (2 ** attempts)) * random.uniform(0.8, 1.2)
+            updates.append((now + delay, error, event_id))
+        self._execute(lambda db: db.executemany(
+            "UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ?, last_error = ? WHERE id = ?", updates,
+        ))
+
+    def _prune(self, now):
+        return self._execute(lambda db: db.execute(
+            "DELETE FROM outbox WHERE blob_id IS NOT NULL AND published_at < ?", (now - self.retention_seconds,),
+        ).rowcount)
+
+    def _pending_count(self):
+        return self._execute(lambda db: db.execute("SELECT COUNT(*) FROM outbox WHERE blob_id IS NULL").fetchone()[0])
+
+    # --- async API ---
+
+    async def enqueue(self, data: dict, data_type: str = "event", epochs: int = 1):
+        """
+        Durably records an event for publication and returns its outbox id. Does not touch the network.
+        """
+        payload = json.dumps(data)
+        event_id = await asyncio.to_thread(self._insert, data_type, payload, epochs, time.time())
+        self.stats["enqueued"] += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return event_id
+
+    async def pending(self):
+        return await asyncio.to_thread(self._pending_count)
+
+    def start(self):
+        """Starts the background publisher; anything left from a previous run is picked up first."""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout=10.0):
+        """
+        Stops the publisher. Publishes already running get timeout seconds to finish, the rest are
+        cancelled; their rows are still unpublished in the outbox and go out after the next start.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._publish_tasks:
+            _, running = await asyncio.wait(set(self._publish_tasks), timeout=timeout)
+            for task in running:
+                task.cancel()
+            if running:
+                logger.warning(f"Cancelled {len(running)} Walrus publishes at shutdown, they will be retried")
+                await asyncio.gather(*running, return_exceptions=True)
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    async def _run(self):
+        last_prune = 0.0
+        while True:
+            try:
+                now = time.time()
+                if now - last_prune > 3600:
+                    last_prune = now
+                    pruned = await asyncio.to_thread(self._prune, now)
+                    if pruned:
+                        logger.info(f"Pruned {pruned} published outbox rows")
+
+                limit = self.concurrency * self.batch_size
+                rows, next_due = await asyncio.to_thread(self._fetch_due, now, limit, set(self._in_flight))
+                for batch in self._batches(rows):
+                    await self._slots.acquire()
+                    self._in_flight.update(row[0] for row in batch)
+                    task = asyncio.create_task(self._publish(batch))
+                    self._publish_tasks.add(task)
+                    task.add_done_callback(self._publish_tasks.discard)
+
+                if len(rows) >= limit:
+                    continue
+                # Sleep until woken by enqueue/publish completion or the next retry becomes due
+                timeout = 5.0 if next_due is None else max(0.05, min(5.0, next_due - time.time()))
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Outbox publisher error: {e}")
+                await asyncio.sleep(1.0)
+
+    def _batches(self, rows):
+        """Groups due rows by (data_type, epochs) into chunks of batch_size."""
+        groups = {}
+        for row in rows:
+            groups.setdefault((row[1], row[3]), []).append(row)
+        for group in groups.values():
+            for start in range(0, len(group), self.batch_size):
+                yield group[start:start + self.batch_size]
+
+    async def _publish(self, batch):
+        ids = [row[0] for row in batch]
+        data_type, epochs = batch[0][1], batch[0][3]
+        try:
+            if len(batch) == 1:
+                blob_id = await self.walrus_client.publish_blob(json.loads(batch[0][2]), data_type=data_type, epochs=epochs)
+            else:
+                events = [{"outboxId": row[0], "data": json.loads(row[2])} for row in batch]
+                blob_id = await self.walrus_client.publish_blob({"events": events}, data_type=f"{data_type}_batch", epochs=epochs)
+
+            if blob_id:
+                await asyncio.to_thread(self._mark_published, ids, blob_id, time.time())
+                self.stats["published"] += len(ids)
+                self.stats["blobs"] += 1
+                for listener in self.listeners:
+                    try:
+                        await listener(ids, blob_id, data_type)
+                    except Exception as e:
+                        logger.error(f"Outbox listener error: {e}")
+            else:
+                self.stats["failed_attempts"] += 1
+                await asyncio.to_thread(self._mark_failed, batch, "publish failed", time.time())
+        except Exception as e:
+            self.stats["failed_attempts"] += 1
+            logger.error(f"Outbox publish error: {e}")
+            await asyncio.to_thread(self._mark_failed, batch, str(e), time.time())
+        finally:
+            self._in_flight.difference_update(ids)
+            self._slots.release()
+            self._wakeup.set()
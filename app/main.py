@@ -1,13 +1,26 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, Body
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, Response, Query, Body, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.csi_processor import CSIBuffer, SignalProcessor
+from app.core.csi_processor import SignalProcessor
+from app.core.device_registry import DeviceRegistry, DEFAULT_DEVICE_ID
+from app.core.csi_codec import BINARY_CONTENT_TYPE, decode_frame, decode_frames, group_packets
+from app.core.inference_scheduler import InferenceScheduler
+from app.core.motion_gate import gate_from_env
 from app.core.model_manager import ModelManager
-from app.api.websocket_handler import manager
+from app.api.websocket_handler import (
+    manager, device_topic, magnitude_topic, TOPIC_PREDICTIONS, TOPIC_EMERGENCY, TOPIC_LIVE,
+)
+from app.core.stream_aggregator import StreamAggregator
 from app.core.walrus_client import walrus_client
-from datetime import datetime
+from app.core.blob_cache import is_blob_id
+from app.core.walrus_outbox import WalrusOutbox
+from app.core.history_store import HistoryStore
+from app.core.metrics import REGISTRY, CONTENT_TYPE, Counter, Gauge, Histogram
+from datetime import datetime, timezone
 import numpy as np
 import asyncio
+import json
 import logging
+import os
 import random
 import time
 
@@ -26,7 +39,7 @@ current_user_profile = {
     "chronicDiseases": "-",
     "walrusBlobId": None
 }
-emergency_history = [] # Local cache of Walrus blob IDs
+pending_events = {} # outbox event id -> device id, until its Walrus blobId is known
 
 # --- Fake CSI live feed (for Flutter /live_data demo) ---
 live_data_cache = {
@@ -47,18 +60,65 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Initialize Components
-csi_buffer = CSIBuffer(window_size_seconds=2, sampling_rate=100)
 model_manager = ModelManager(model_path="app/models/model.pkl")
+# Buffers match the window the model was trained on (model.meta.json), 2 s at 100 Hz without one
+SAMPLING_RATE = model_manager.serving_meta.get("sampling_rate", 100)
+WINDOW_SECONDS = model_manager.serving_meta.get("window_size", 2 * SAMPLING_RATE) / SAMPLING_RATE
+# Packet width comes from the model metadata, or from the model itself once it is loaded at startup
+device_registry = DeviceRegistry(window_size_seconds=WINDOW_SECONDS, sampling_rate=SAMPLING_RATE,
+                                 n_features=model_manager.serving_meta.get("n_features"))
+stream_aggregator = StreamAggregator()
+# Cheap STA/LTA motion detector in front of the classifier (CSI_MOTION_GATE=0 disables it)
+motion_gate = gate_from_env(sampling_rate=SAMPLING_RATE)
+# Emergency events are written to a durable local outbox and published to Walrus in the background
+walrus_outbox = WalrusOutbox(walrus_client)
+# Persistent emergency history (SQLite), paginated by /history
+history_store = HistoryStore()
+
+# Hot-path metrics for /metrics; children are bound once so recording is a few attribute updates
+INGEST_SECONDS = Histogram("csi_ingest_seconds", "Ingest handler latency per request or WebSocket message", ["endpoint"])
+INGEST_PACKETS = Counter("csi_ingest_packets_total", "CSI packets ingested", ["endpoint"])
+INGEST_ERRORS = Counter("csi_ingest_errors_total", "Rejected ingest bodies", ["endpoint"])
+INGEST_LATENCY = {endpoint: INGEST_SECONDS.labels(endpoint) for endpoint in ("ingest", "batch", "ws")}
+INGEST_COUNT = {endpoint: INGEST_PACKETS.labels(endpoint) for endpoint in ("ingest", "batch", "ws")}
+PROCESS_SECONDS = Histogram("csi_process_seconds", "process_and_broadcast latency: features, predict, outbox and broadcast")
+EMERGENCIES = Counter("csi_emergencies_total", "Emergency predictions recorded in the outbox")
 
 @app.on_event("startup")
 async def startup_event():
     model_manager.load_model()
+    if device_registry.n_features is None and model_manager.active is not None:
+        device_registry.n_features = model_manager.active.n_features
     logger.info("Application started and model loaded.")
+    history_store.start()
+    walrus_outbox.listeners.append(on_events_published)
+    walrus_outbox.start()
     # start fake live feed for /live_data demo
     asyncio.create_task(fake_live_data_loop())
+    asyncio.create_task(evict_idle_devices_loop())
+    # hot-reload a redeployed model.pkl without restarting uvicorn
+    watch_interval = float(os.getenv("CSI_MODEL_WATCH_INTERVAL", "10"))
+    if watch_interval > 0:
+        asyncio.create_task(model_manager.watch(watch_interval))
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await model_manager.aclose()
+    await walrus_outbox.stop()
+    await history_store.stop()
+    await walrus_client.aclose()
+
+async def evict_idle_devices_loop():
+    """Periodically drops devices that stopped sending so the registry stays bounded."""
+    while True:
+        await asyncio.sleep(30)
+        evicted = device_registry.evict_idle()
+        if evicted:
+            logger.info(f"Evicted {evicted} idle devices, {len(device_registry)} active")
 
 @app.get("/live_data")
 async def live_data():
@@ -86,10 +146,71 @@ async def update_profile(profile: dict = Body(...)):
 async def get_profile():
     return current_user_profile
 
+def _parse_time(value):
+    """Unix seconds or an ISO 8601 timestamp (naive = UTC)."""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid time: {value}")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
 @app.get("/history")
-async def get_history():
-    """Returns local cache of emergency events (ideally these would be fetched from Walrus)"""
-    return emergency_history
+async def get_history(
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    user: str | None = None,
+    device_id: str | None = None,
+    risk: str | None = None,
+    expand: bool = False,
+):
+    """
+    Emergency events, newest first. The body stays a plain list (what the Flutter app reads);
+    when more events exist the X-Next-Cursor header holds the value to pass as ?cursor= for the next page.
+    since / until: Unix seconds or ISO 8601, [since, until).
+    expand: Also attach each event's Walrus blob ("data"), fetched concurrently through the blob cache.
+    """
+    try:
+        entries, next_cursor = await history_store.query(
+            limit=limit, cursor=cursor, since=_parse_time(since), until=_parse_time(until),
+            user=user, device_id=device_id, risk=risk,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    blob_ids = [entry["blobId"] for entry in entries if entry.get("blobId")]
+    if not expand:
+        # Warm the cache in the background so opening an event does not wait on the aggregator
+        if blob_ids:
+            walrus_client.cache.warm(blob_ids)
+        return entries
+    blobs = await walrus_client.read_blobs(blob_ids)
+    return [{**entry, "data": blobs.get(entry.get("blobId"))} for entry in entries]
+
+@app.get("/walrus/blob/{blob_id}")
+async def walrus_blob(blob_id: str):
+    if not is_blob_id(blob_id):
+        raise HTTPException(status_code=400, detail="Invalid blob id")
+    data = await walrus_client.read_blob(blob_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Blob not found")
+    return data
+
+@app.get("/walrus/cache")
+async def walrus_cache_stats():
+    return walrus_client.cache.info()
 
 @app.post("/walrus/test_event")
 async def walrus_test_event(payload: dict = Body(default={})):
@@ -114,62 +235,184 @@ async def walrus_test_event(payload: dict = Body(default={})):
     blob_id = await walrus_client.publish_blob(event, data_type="event")
     if blob_id:
         live_data_cache["walrusBlobId"] = blob_id
-        emergency_history.insert(0, {
-            "tarih": datetime.now().strftime("%d.%m.%Y %H:%M"),
-            "olay": event["prediction"],
-            "risk": risk,
-            "blobId": blob_id
-        })
+        history_store.add(event["prediction"], risk, blob_id=blob_id, user=event["user"], source=event["source"])
     return {"blobId": blob_id, "event": event}
 
+@app.get("/devices")
+async def get_devices():
+    """Returns the devices currently tracked by the ingest registry."""
+    return [device.summary() for device in device_registry.devices.values()]
+
 @app.post("/ingest")
 async def ingest_csi(request: Request):
-    data = await request.json()
-    csi_matrix = np.array(data["csi"])
-    await csi_buffer.add_packet(csi_matrix)
+    """
+    Accepts one CSI packet either as JSON {"csi": [...], "device_id": "...", "timestamp_ns": 0} or, with
+    Content-Type: application/octet-stream, as a binary frame (see app/core/csi_codec.py).
+    """
+    start = time.perf_counter()
+    try:
+        if request.headers.get("content-type", "").startswith(BINARY_CONTENT_TYPE):
+            packet, _ = decode_frame(await request.body())
+            device_id = packet["device_id"] or request.query_params.get("device_id") or DEFAULT_DEVICE_ID
+            csi_matrix = packet["csi"]
+            timestamp_ns = packet["timestamp_ns"]
+        else:
+            data = await request.json()
+            if not isinstance(data, dict):
+                raise TypeError("Expected a JSON object")
+            # device_id / room_id lets several ESP32 nodes share the endpoint without mixing windows
+            device_id = str(data.get("device_id") or data.get("room_id") or request.query_params.get("device_id") or DEFAULT_DEVICE_ID)
+            csi_matrix = np.array(data["csi"])
+            timestamp_ns = data.get("timestamp_ns")
+        # A packet whose length does not match the device's buffer is rejected here, like in /ingest/batch
+        await ingest_packet(device_id, csi_matrix, timestamp_ns)
+    except (ValueError, KeyError, TypeError) as e:
+        INGEST_ERRORS.labels("ingest").inc()
+        raise HTTPException(status_code=400, detail=str(e))
+    INGEST_COUNT["ingest"].inc()
+    INGEST_LATENCY["ingest"].observe(time.perf_counter() - start)
+    return {"status": "received", "device_id": device_id}
+
+@app.post("/ingest/batch")
+async def ingest_batch(request: Request):
+    """
+    Accepts many packets in one body, either JSON
+        {"device_id": "...", "packets": [[...], {"csi": [...], "device_id": "...", "timestamp_ns": 0}, ...]}
+    or concatenated binary frames (application/octet-stream).
+    Each device's packets are written to its buffer in bulk and scored at most once.
+    """
+    start = time.perf_counter()
+    default_device_id = request.query_params.get("device_id") or DEFAULT_DEVICE_ID
+    try:
+        if request.headers.get("content-type", "").startswith(BINARY_CONTENT_TYPE):
+            packets = decode_frames(await request.body())
+        else:
+            packets = parse_json_batch(await request.json())
+        received = await ingest_batch_packets(packets, default_device_id)
+    except (ValueError, KeyError, TypeError) as e:
+        INGEST_ERRORS.labels("batch").inc()
+        raise HTTPException(status_code=400, detail=str(e))
+    INGEST_COUNT["batch"].inc(len(packets))
+    INGEST_LATENCY["batch"].observe(time.perf_counter() - start)
+    return {"status": "received", "packets": len(packets), "devices": received}
+
+def parse_json_batch(data):
+    """Turns a JSON batch body (or a single-packet body) into packet dicts. TypeError if malformed."""
+    if not isinstance(data, dict):
+        raise TypeError("Expected a JSON object")
+    default_device_id = data.get("device_id") or data.get("room_id")
+    if "packets" not in data:
+        return [{"device_id": default_device_id, "csi": data["csi"], "timestamp_ns": data.get("timestamp_ns")}]
+    if not isinstance(data["packets"], list):
+        raise TypeError("packets must be a list")
+    packets = []
+    for item in data["packets"]:
+        if isinstance(item, dict):
+            packets.append({
+                "device_id": item.get("device_id") or default_device_id,
+                "csi": item["csi"],
+                "timestamp_ns": item.get("timestamp_ns"),
+            })
+        else:
+            packets.append({"device_id": default_device_id, "csi": item, "timestamp_ns": None})
+    return packets
+
+async def ingest_batch_packets(packets, default_device_id=DEFAULT_DEVICE_ID):
+    """Bulk-ingests decoded packets. Returns {device_id: packet count}."""
+    received = {}
+    for device_id, (block, timestamps) in group_packets(packets, default_device_id).items():
+        await ingest_packets(str(device_id), block, timestamps)
+        received[device_id] = len(block)
+    return received
+
+async def ingest_packet(device_id, csi_matrix, timestamp_ns=None):
+    device = device_registry.get(device_id)
+    timestamp_ns = timestamp_ns or time.time_ns()
+    await device.buffer.add_packet(csi_matrix, timestamp_ns)
     magnitude = SignalProcessor.calculate_current_magnitude(csi_matrix)
-    
-    if csi_buffer.is_full():
-        asyncio.create_task(process_and_broadcast(magnitude))
-    else:
-        await manager.broadcast({
-            "magnitude": magnitude,
-            "prediction": "Buffering...",
-            "confidence": 0.0,
-            "is_emergency": False,
-            "timestamp": datetime.utcnow().isoformat()
-        })
-    return {"status": "received"}
-
-async def process_and_broadcast(current_magnitude):
-    window_data = await csi_buffer.get_window()
-    if window_data:
-        processed_window = SignalProcessor.preprocess_window(window_data)
-        prediction, confidence = await model_manager.predict(processed_window)
-        is_emergency = prediction in ["Düşme", "Hareketsizlik"]
+    await after_ingest(device, magnitude, magnitude, timestamp_ns)
+
+async def ingest_packets(device_id, csi_block, timestamps_ns=None):
+    device = device_registry.get(device_id, packets=len(csi_block))
+    if timestamps_ns is None:
+        timestamps_ns = time.time_ns()
+    await device.buffer.add_packets(csi_block, timestamps_ns)
+    magnitudes = SignalProcessor.calculate_magnitudes(csi_block)
+    await after_ingest(device, float(magnitudes[-1]), magnitudes, timestamps_ns, len(csi_block))
+
+async def after_ingest(device, magnitude, magnitudes, timestamps_ns, packets=1):
+    # Raw per-packet magnitudes are never fanned out, only the downsampled min/mean/max points
+    for rate, point in stream_aggregator.add(device, magnitudes, timestamps_ns):
+        await manager.broadcast(point, topics=(magnitude_topic(rate), magnitude_topic(rate, device.device_id)))
+
+    if motion_gate is not None:
+        motion_gate.update(device, magnitudes, timestamps_ns)
+
+    if device.buffer.is_full():
+        # Scored every CSI_INFERENCE_HOP packets, overlapping requests are coalesced per device
+        inference_scheduler.notify(device, magnitude, packets)
+
+async def process_and_broadcast(device, current_magnitude):
+    start = time.perf_counter()
+    # Window mean is maintained incrementally by RollingFeatures, no full-window reduction here
+    async with device.buffer.lock:
+        feature_vector = device.buffer.feature_vector()
+        packet_timestamp_ns = device.buffer.last_timestamp()
+    if feature_vector is not None:
+        prediction, confidence, probabilities, is_emergency = await model_manager.predict(feature_vector)
         
         output = {
+            "device_id": device.device_id,
             "magnitude": current_magnitude,
             "prediction": prediction,
             "confidence": confidence,
+            "probabilities": probabilities,
             "is_emergency": is_emergency,
             "timestamp": datetime.utcnow().isoformat(),
+            # Newest packet in the scored window, lets clients measure ingest -> broadcast latency
+            "packet_timestamp_ns": packet_timestamp_ns,
             "user": current_user_profile["username"]
         }
         
         if is_emergency:
-            # Save to Walrus as a permanent record
-            blob_id = await walrus_client.publish_blob(output, data_type="event", epochs=1)
-            if blob_id:
-                output["walrusBlobId"] = blob_id
-                emergency_history.insert(0, {
-                    "tarih": datetime.now().strftime("%d.%m.%Y %H:%M"),
-                    "olay": prediction,
-                    "risk": "KRİTİK" if prediction == "Düşme" else "UYARI",
-                    "blobId": blob_id
-                })
+            # Recorded durably first, the Walrus publish happens in the background so the alert is not delayed
+            event_id = await walrus_outbox.enqueue(output, data_type="event", epochs=1)
+            output["eventId"] = event_id
+            history_store.add(
+                prediction, "KRİTİK" if prediction == "Düşme" else "UYARI",
+                device_id=device.device_id, user=current_user_profile.get("username"), event_id=event_id,
+            )
+            pending_events[event_id] = device.device_id
+            EMERGENCIES.inc()
         
-        await manager.broadcast(output)
+        device.last_prediction = output
+        topics = [device_topic(device.device_id), TOPIC_PREDICTIONS]
+        if is_emergency:
+            topics.append(TOPIC_EMERGENCY)
+        await manager.broadcast(output, topics=topics)
+        PROCESS_SECONDS.observe(time.perf_counter() - start)
+
+async def on_events_published(event_ids, blob_id, data_type):
+    """Outbox callback: attach the Walrus blob id to history and tell subscribers."""
+    history_store.set_blob_id(event_ids, blob_id)
+    for event_id in event_ids:
+        # Unknown after a restart, the message then only goes to the emergency topic
+        device_id = pending_events.pop(event_id, None)
+        topics = [TOPIC_EMERGENCY]
+        if device_id:
+            topics.append(device_topic(device_id))
+        await manager.broadcast({
+            "type": "walrus_published",
+            "eventId": event_id,
+            "walrusBlobId": blob_id,
+            "device_id": device_id,
+            "timestamp": datetime.utcnow().isoformat()
+        }, topics=topics)
+
+@app.get("/walrus/outbox")
+async def walrus_outbox_stats():
+    """Outbox counters and the number of events still waiting to be published."""
+    return {**walrus_outbox.stats, "pending": await walrus_outbox.pending()}
 
 async def _publish_fake_emergency(status: str, signal: float):
     """
@@ -197,12 +440,10 @@ async def _publish_fake_emergency(status: str, signal: float):
         _fake_last_published_at = now
         _fake_last_blob_id = blob_id
 
-        emergency_history.insert(0, {
-            "tarih": datetime.now().strftime("%d.%m.%Y %H:%M"),
-            "olay": event["prediction"],
-            "risk": "KRİTİK" if status == "FALL" else "UYARI",
-            "blobId": blob_id
-        })
+        history_store.add(
+            event["prediction"], "KRİTİK" if status == "FALL" else "UYARI",
+            blob_id=blob_id, user=event["user"], source=event["source"],
+        )
 
 async def fake_live_data_loop():
     """
@@ -257,18 +498,112 @@ async def fake_live_data_loop():
                 "is_emergency": live_data_cache["status"] in ("DANGER", "FALL"),
                 "timestamp": live_data_cache["timestamp"],
                 "walrusBlobId": _fake_last_blob_id,
-            })
+            }, topics=(TOPIC_LIVE,))
         except Exception:
             pass
 
         await asyncio.sleep(0.1)
 
+inference_scheduler = InferenceScheduler(
+    process_and_broadcast,
+    hop=int(os.getenv("CSI_INFERENCE_HOP", model_manager.serving_meta.get("hop", 25))),
+    gate=motion_gate,
+)
+
+@app.get("/model")
+async def get_model():
+    """Active model version and the versions available for reload."""
+    return model_manager.info()
+
+@app.post("/model/reload")
+async def reload_model(payload: dict = Body(default={})):
+    """
+    Loads a model in the background and swaps it in atomically.
+    Optional payload: {"version": "<name in app/models/versions>"}; defaults to app/models/model.pkl.
+    """
+    version = payload.get("version")
+    if version is not None:
+        # Checked before anything touches the filesystem: only registered version names are loadable
+        try:
+            model_manager.version_path(version)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except FileNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+    try:
+        return await model_manager.reload(version=version)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logger.error(f"Model reload failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Model reload failed: {e}")
+
+# Scrape-time views of state the components already keep, nothing extra on the hot path
+Gauge("csi_devices", "Devices in the ingest registry", function=lambda: len(device_registry))
+Counter("csi_device_packets_total", "Packets received per device (rate() gives the packet rate)", ["device_id"],
+        function=lambda: {(device_id,): device.packets for device_id, device in device_registry.devices.items()})
+Counter("csi_inference_windows_total", "InferenceScheduler windows by outcome", ["outcome"],
+        function=lambda: {(outcome,): n for outcome, n in inference_scheduler.stats.items()})
+Gauge("csi_inference_tasks", "Inference tasks running or waiting", function=lambda: inference_scheduler.in_flight)
+Gauge("csi_inference_queue", "Windows waiting for a batch in the inference pool",
+      function=lambda: model_manager.batcher.queue.qsize() if model_manager.batcher.queue is not None else 0)
+Counter("csi_walrus_outbox_total", "Walrus outbox counters", ["event"],
+        function=lambda: {(event,): n for event, n in walrus_outbox.stats.items()})
+Gauge("csi_history_backlog", "History writes waiting for the next batch flush", function=lambda: history_store.backlog)
+Gauge("csi_tasks", "Pending asyncio tasks in the server loop", function=lambda: len(asyncio.all_tasks()))
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of the hot-path metrics (CSI_METRICS=0 stops recording)."""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@app.get("/inference/stats")
+async def inference_stats():
+    """Scheduler counters: requested, scheduled, coalesced, dropped and gated windows (plus motion gate stats)."""
+    return inference_scheduler.snapshot()
+
+@app.websocket("/ws/ingest")
+async def websocket_ingest(websocket: WebSocket):
+    """
+    Persistent ingest channel for devices. Every message is one batch: a JSON text message in the
+    /ingest/batch format, or a binary message of concatenated frames. Nothing is sent back on success.
+    """
+    await websocket.accept()
+    default_device_id = websocket.query_params.get("device_id") or DEFAULT_DEVICE_ID
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            start = time.perf_counter()
+            try:
+                if message.get("bytes") is not None:
+                    packets = decode_frames(message["bytes"])
+                else:
+                    packets = parse_json_batch(json.loads(message["text"]))
+                await ingest_batch_packets(packets, default_device_id)
+                INGEST_COUNT["ws"].inc(len(packets))
+                INGEST_LATENCY["ws"].observe(time.perf_counter() - start)
+            except (ValueError, KeyError, TypeError) as e:
+                INGEST_ERRORS.labels("ws").inc()
+                await websocket.send_text(json.dumps({"error": str(e)}))
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.error(f"WebSocket ingest error: {e}")
+
 @app.websocket("/ws/monitor")
 async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+    """
+    Monitor stream. Optional query: ?topics=device:<id>,emergency,predictions,magnitude:<rate>,live&encoding=json|msgpack
+    (default: every topic as JSON). Subscriptions can be changed later with
+    {"subscribe": [...]}, {"unsubscribe": [...]} and {"encoding": "..."} messages.
+    """
+    topics = [t for t in websocket.query_params.get("topics", "").split(",") if t]
+    await manager.connect(websocket, topics=topics, encoding=websocket.query_params.get("encoding", "json"))
     try:
         while True:
-            await websocket.receive_text()
+            await manager.handle_command(websocket, await websocket.receive_text())
     except WebSocketDisconnect:
         manager.disconnect(websocket)
     except Exception as e:
@@ -5,103 +5,215 @@ Bu script:
 1. CSI verisine PCA (Principal Component Analysis) uygular (Boyut indirgeme).
 2. Veriyi saniyede 3 örnek olacak şekilde seyreltir (Downsampling).
 3. X eksenini 5'er saniyelik zaman dilimleriyle görselleştirir.
+
+Veri parça parça (chunk) işlenir, bellek kullanımı dosya boyutundan bağımsızdır:
+  Geçiş 1: Ortalama / varyans (StandardScaler ile aynı) parçalardan birleştirilir.
+  Geçiş 2: Ölçeklenmiş verinin kovaryans matrisi toplanır, PC1 bunun en büyük özvektörüdür.
+  Geçiş 3: Her parça PC1'e izdüşürülür ve doğrudan 3 Hz kutularına (bincount) eklenir.
+--workers ile parçalar birden fazla çekirdeğe dağıtılır, --verify sonucu eski bellek içi
+(StandardScaler + PCA + pandas resample) yöntemle karşılaştırır.
+
+Proje kökünden çalıştırın:
+    python csi_analysis.py --dosya data.csv --workers 4
 """
 
-import pandas as pd
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
-import matplotlib.pyplot as plt
-from sklearn.decomposition import PCA
-from sklearn.preprocessing import StandardScaler
-import matplotlib.ticker as ticker
+from scripts.dataset_cache import cache_file, load_dataset
 
 # --- AYARLAR ---
 # BURAYI KENDİ DONANIMINA GÖRE GÜNCELLEMELİSİN
 ORIJINAL_FPS = 100  # Cihazın saniyede kaç paket gönderdiği (Hz)
 HEDEF_FPS = 3       # Saniyede kaç veri noktası görmek istiyoruz
 DOSYA_ADI = 'data.csv'
-
-# CSV dosyasını okuma
-print("CSI verisi okunuyor...")
-try:
-    # Header=None çünkü CSI verilerinde genelde başlık satırı olmaz
-    df = pd.read_csv(DOSYA_ADI, header=None)
-except FileNotFoundError:
-    print(f"HATA: '{DOSYA_ADI}' dosyası bulunamadı. Lütfen dosya yolunu kontrol edin.")
-    exit()
-
-print(f"Orijinal Veri Boyutu: {df.shape}")
-
-# 1. Veriyi Temizleme ve Hazırlama
-print("Veri temizleniyor...")
-df = df.dropna() # Boş verileri at
-raw_data = df.values
-
-# Sonsuz (inf) değerleri temizle
-raw_data = raw_data[np.isfinite(raw_data).all(axis=1)]
-
-# 2. PCA Uygulama (Principal Component Analysis)
-print("PCA uygulanıyor...")
-
-# PCA öncesi veriyi standartlaştırmak (Scale etmek) önemlidir
-scaler = StandardScaler()
-scaled_data = scaler.fit_transform(raw_data)
-
-# PCA nesnesini oluştur ve uygula (Sadece 1. bileşeni alıyoruz - en baskın sinyal)
-pca = PCA(n_components=1)
-principal_components = pca.fit_transform(scaled_data)
-
-# PCA çıktısını DataFrame'e çevir
-pca_df = pd.DataFrame(data=principal_components, columns=['PC1'])
-
-# 3. Zaman İndeksi Oluşturma ve Downsampling (Örnekleme Hızını Düşürme)
-print(f"Veri {ORIJINAL_FPS} Hz'den {HEDEF_FPS} Hz'e düşürülüyor...")
-
-# Her satırın kaçıncı saniyeye denk geldiğini hesapla
-total_seconds = len(pca_df) / ORIJINAL_FPS
-time_delta_index = pd.to_timedelta(np.arange(len(pca_df)) / ORIJINAL_FPS, unit='s')
-pca_df.index = time_delta_index
-
-# Resample işlemi (Ortalama alarak veriyi küçültür)
-# '333ms' yaklaşık 3 Hz'e denk gelir (1000ms / 3)
-resampled_df = pca_df.resample(f'{int(1000/HEDEF_FPS)}ms').mean()
-
-# Eksik veri oluşursa (resample sırasında) doldur
-resampled_df = resampled_df.interpolate()
-
-# PCA sinyalleri bazen ters dönebilir, mutlak değerini veya karesini almak hareketi netleştirir
-# İstersen bu satırı yorum satırı yapabilirsin:
-final_signal = np.abs(resampled_df['PC1']) 
-# Alternatif: final_signal = resampled_df['PC1']
-
-# 4. Görselleştirme
-print("Grafik oluşturuluyor...")
-
-plt.figure(figsize=(14, 6))
-
-# Zaman ekseni (X ekseni) için saniye cinsinden değerler
-time_seconds = resampled_df.index.total_seconds()
-
-plt.plot(time_seconds, final_signal, linewidth=2, color='#e74c3c', label='PCA (PC1)')
-
-# X Ekseni Ayarları (5 Saniye Aralıklarla)
-ax = plt.gca()
-ax.xaxis.set_major_locator(ticker.MultipleLocator(5)) # 5'er saniye aralık
-ax.xaxis.set_minor_locator(ticker.MultipleLocator(1)) # 1'er saniye küçük çentik
-
-plt.xlabel('Zaman (Saniye)', fontsize=12, fontweight='bold')
-plt.ylabel('PCA Sinyal Genliği (PC1)', fontsize=12, fontweight='bold')
-plt.title(f'Wi-Fi CSI Hareket Analizi (PCA İndirgenmiş)\nÖrnekleme: {HEDEF_FPS} Veri/Saniye', 
-          fontsize=14, fontweight='bold')
-
-plt.grid(True, which='major', linestyle='-', alpha=0.7)
-plt.grid(True, which='minor', linestyle=':', alpha=0.4)
-plt.legend()
-plt.tight_layout()
-
-output_filename = 'csi_pca_analiz.png'
-plt.savefig(output_filename, dpi=300)
-print(f"Grafik kaydedildi: {output_filename}")
-
-plt.show()
-
-print("\nİşlem Tamamlandı.")
\ No newline at end of file
+PARCA_SATIR = 20000  # Bir seferde işlenen satır sayısı
+
+# pandas resample(f'{int(1000/HEDEF_FPS)}ms') ile aynı kutu genişliği (333 ms)
+KUTU_NS = int(1000 / HEDEF_FPS) * 1_000_000
+SATIR_NS = 1_000_000_000 // ORIJINAL_FPS
+
+def _parca(yol, bas, son):
+    """Önbellekten bir parça; boş (NaN) ve sonsuz (inf) değerli satırlar atılır."""
+    X = np.asarray(np.load(yol, mmap_mode="r")[bas:son], dtype=np.float64)
+    return X[np.isfinite(X).all(axis=1)]
+
+def parca_istatistik(yol, bas, son):
+    X = _parca(yol, bas, son)
+    if len(X) == 0:
+        return 0, None, None
+    ortalama = X.mean(axis=0)
+    return len(X), ortalama, ((X - ortalama) ** 2).sum(axis=0)
+
+def parca_kovaryans(yol, bas, son, ortalama, olcek):
+    Z = (_parca(yol, bas, son) - ortalama) / olcek
+    return Z.T @ Z
+
+def parca_kutular(yol, bas, son, ortalama, olcek, bilesen, ofset):
+    """PC1 değerlerinin kutu toplamları ve sayıları; ofset: bu parçadan önce kalan satır sayısı."""
+    pc1 = ((_parca(yol, bas, son) - ortalama) / olcek) @ bilesen
+    if len(pc1) == 0:
+        return 0, np.zeros(0), np.zeros(0, dtype=np.int64)
+    # Satırın zamanı, temizlenmiş verideki sırasıdır (bellek içi yöntemdeki gibi)
+    kutular = ((ofset + np.arange(len(pc1), dtype=np.int64)) * SATIR_NS) // KUTU_NS
+    ilk = int(kutular[0])
+    kutular -= ilk
+    return ilk, np.bincount(kutular, weights=pc1), np.bincount(kutular)
+
+def _birlestir(istatistikler):
+    """Parça ortalama/varyanslarını birleştirir (Chan et al.), tek geçişte StandardScaler'ın sonucu."""
+    n, ortalama, m2 = 0, None, None
+    for n_b, ortalama_b, m2_b in istatistikler:
+        if n_b == 0:
+            continue
+        if n == 0:
+            n, ortalama, m2 = n_b, ortalama_b, m2_b
+            continue
+        fark = ortalama_b - ortalama
+        toplam = n + n_b
+        ortalama = ortalama + fark * (n_b / toplam)
+        m2 = m2 + m2_b + fark ** 2 * (n * n_b / toplam)
+        n = toplam
+    return n, ortalama, m2
+
+def akisli_analiz(yol, satir_sayisi, parca_satir=PARCA_SATIR, workers=1):
+    """
+    Returns (zaman_saniye, pc1_3hz, bilesen): aynı sonucu StandardScaler + PCA(n_components=1)
+    + resample().mean() ile verir, ama veriyi hiçbir zaman tümüyle belleğe almaz.
+    """
+    araliklar = [(bas, min(bas + parca_satir, satir_sayisi)) for bas in range(0, satir_sayisi, parca_satir)]
+    basl, sonl = [a[0] for a in araliklar], [a[1] for a in araliklar]
+    havuz = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    eslestir = havuz.map if havuz is not None else map
+    try:
+        print("Geçiş 1/3: ortalama ve varyans...")
+        istatistikler = list(eslestir(parca_istatistik, [yol] * len(araliklar), basl, sonl))
+        n, ortalama, m2 = _birlestir(istatistikler)
+        if n == 0:
+            raise ValueError("Temizlendikten sonra veri kalmadı")
+        olcek = np.sqrt(m2 / n)
+        olcek[olcek == 0.0] = 1.0  # StandardScaler sabit sütunları ölçeklemez
+
+        print("Geçiş 2/3: kovaryans ve PCA...")
+        k = len(araliklar)
+        kovaryans = sum(eslestir(parca_kovaryans, [yol] * k, basl, sonl, [ortalama] * k, [olcek] * k)) / (n - 1)
+        _, vektorler = np.linalg.eigh(kovaryans)
+        bilesen = vektorler[:, -1]
+        # sklearn ile aynı işaret kuralı: mutlak değerce en büyük eleman pozitif
+        bilesen = bilesen * np.sign(bilesen[np.argmax(np.abs(bilesen))])
+
+        print(f"Geçiş 3/3: PC1 ve {ORIJINAL_FPS} Hz -> {HEDEF_FPS} Hz seyreltme...")
+        ofsetler = np.concatenate(([0], np.cumsum([s[0] for s in istatistikler])[:-1]))
+        sonuclar = list(eslestir(parca_kutular, [yol] * k, basl, sonl, [ortalama] * k, [olcek] * k, [bilesen] * k, ofsetler))
+    finally:
+        if havuz is not None:
+            havuz.shutdown()
+
+    kutu_sayisi = max(ilk + len(sayilar) for ilk, _, sayilar in sonuclar)
+    toplamlar = np.zeros(kutu_sayisi)
+    sayilar = np.zeros(kutu_sayisi, dtype=np.int64)
+    for ilk, t, s in sonuclar:
+        toplamlar[ilk:ilk + len(t)] += t
+        sayilar[ilk:ilk + len(s)] += s
+    with np.errstate(invalid="ignore", divide="ignore"):
+        pc1 = toplamlar / sayilar
+    # Eksik kutu oluşursa doldur (pandas interpolate gibi doğrusal)
+    dolu = sayilar > 0
+    if not dolu.all():
+        pc1 = np.interp(np.arange(kutu_sayisi), np.flatnonzero(dolu), pc1[dolu])
+    zaman = np.arange(kutu_sayisi) * KUTU_NS / 1e9
+    return zaman, pc1, bilesen
+
+def bellek_ici_analiz(raw_data):
+    """Eski yöntem: tüm veri bellekte, StandardScaler + PCA + pandas resample (doğrulama için)."""
+    import pandas as pd
+    from sklearn.decomposition import PCA
+    from sklearn.preprocessing import StandardScaler
+
+    raw_data = np.asarray(raw_data, dtype=np.float64)
+    raw_data = raw_data[np.isfinite(raw_data).all(axis=1)]
+    scaled_data = StandardScaler().fit_transform(raw_data)
+    principal_components = PCA(n_components=1).fit_transform(scaled_data)
+    pca_df = pd.DataFrame(data=principal_components, columns=['PC1'])
+    pca_df.index = pd.to_timedelta(np.arange(len(pca_df)) / ORIJINAL_FPS, unit='s')
+    resampled_df = pca_df.resample(f'{int(1000/HEDEF_FPS)}ms').mean().interpolate()
+    return resampled_df.index.total_seconds().to_numpy(), resampled_df['PC1'].to_numpy()
+
+def grafik(time_seconds, final_signal, show=True):
+    # matplotlib requirements.txt'de yok, sadece grafik çizilirken gerekir
+    import matplotlib.pyplot as plt
+    import matplotlib.ticker as ticker
+
+    print("Grafik oluşturuluyor...")
+
+    plt.figure(figsize=(14, 6))
+
+    plt.plot(time_seconds, final_signal, linewidth=2, color='#e74c3c', label='PCA (PC1)')
+
+    # X Ekseni Ayarları (5 Saniye Aralıklarla)
+    ax = plt.gca()
+    ax.xaxis.set_major_locator(ticker.MultipleLocator(5)) # 5'er saniye aralık
+    ax.xaxis.set_minor_locator(ticker.MultipleLocator(1)) # 1'er saniye küçük çentik
+
+    plt.xlabel('Zaman (Saniye)', fontsize=12, fontweight='bold')
+    plt.ylabel('PCA Sinyal Genliği (PC1)', fontsize=12, fontweight='bold')
+    plt.title(f'Wi-Fi CSI Hareket Analizi (PCA İndirgenmiş)\nÖrnekleme: {HEDEF_FPS} Veri/Saniye',
+              fontsize=14, fontweight='bold')
+
+    plt.grid(True, which='major', linestyle='-', alpha=0.7)
+    plt.grid(True, which='minor', linestyle=':', alpha=0.4)
+    plt.legend()
+    plt.tight_layout()
+
+    output_filename = 'csi_pca_analiz.png'
+    plt.savefig(output_filename, dpi=300)
+    print(f"Grafik kaydedildi: {output_filename}")
+
+    if show:
+        plt.show()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dosya", default=DOSYA_ADI, help="CSI CSV dosyası")
+    parser.add_argument("--parca", type=int, default=PARCA_SATIR, help="Parça başına satır")
+    parser.add_argument("--workers", type=int, default=1, help="Parçaları işleyen süreç sayısı")
+    parser.add_argument("--verify", action="store_true", help="Bellek içi yöntemle karşılaştır (veri RAM'e sığmalı)")
+    parser.add_argument("--no-show", action="store_true", help="Grafiği sadece kaydet")
+    args = parser.parse_args()
+
+    # CSV dosyasını okuma
+    print("CSI verisi okunuyor...")
+    if not os.path.exists(args.dosya):
+        print(f"HATA: '{args.dosya}' dosyası bulunamadı. Lütfen dosya yolunu kontrol edin.")
+        exit()
+    # İlk çalıştırmada CSV bir kez float32 .npy önbelleğine çevrilir, sonrakiler onu memory-map eder
+    raw_data, _ = load_dataset(args.dosya, label_path=None)
+    print(f"Orijinal Veri Boyutu: {raw_data.shape}")
+
+    basla = time.perf_counter()
+    time_seconds, pc1, _ = akisli_analiz(cache_file(args.dosya), len(raw_data), args.parca, args.workers)
+    print(f"Akışlı analiz: {time.perf_counter() - basla:.2f} s")
+
+    # PCA sinyalleri bazen ters dönebilir, mutlak değerini veya karesini almak hareketi netleştirir
+    # İstersen bu satırı yorum satırı yapabilirsin:
+    final_signal = np.abs(pc1)
+    # Alternatif: final_signal = pc1
+
+    if args.verify:
+        basla = time.perf_counter()
+        ref_zaman, ref_pc1 = bellek_ici_analiz(raw_data)
+        print(f"Bellek içi analiz: {time.perf_counter() - basla:.2f} s")
+        # PC1'in işareti yöntemler arasında ters olabilir, grafik mutlak değeri kullanır
+        fark = np.max(np.abs(np.abs(ref_pc1) - final_signal)) if len(ref_pc1) == len(final_signal) else np.inf
+        olcek = max(1e-12, float(np.max(np.abs(ref_pc1))))
+        print(f"Doğrulama: {len(ref_pc1)} / {len(final_signal)} nokta, en büyük fark {fark:.3g} "
+              f"(göreli {fark / olcek:.3g}) -> {'UYUMLU' if fark / olcek < 1e-6 else 'FARKLI'}")
+
+    grafik(time_seconds, final_signal, show=not args.no_show)
+
+    print("\nİşlem Tamamlandı.")
+
+if __name__ == "__main__":
+    main()
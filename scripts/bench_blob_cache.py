@@ -0,0 +1,66 @@
+"""
+Loading a history view of N Walrus blobs against a local stand-in aggregator with artificial latency:
+sequential uncached reads (the previous read_blob) vs cached prefetch (cold, disk-warm, memory-warm),
+plus concurrent reads of one id to show request coalescing.
+
+Run from the project root:
+    python -m scripts.bench_blob_cache --blobs 50 --latency-ms 20
+"""
+import argparse
+import asyncio
+import logging
+import tempfile
+import time
+from app.core.blob_cache import BlobCache
+from app.core.walrus_client import WalrusClient
+from scripts.fake_walrus import start_in_thread
+
+async def run(base_url, app, blobs, cache_dir):
+    client = WalrusClient(publisher_url=base_url, aggregator_url=base_url)
+    # Publishing seeds the disk tier; "disk-warm" below starts from a fresh cache with empty memory
+    client.cache = BlobCache(client._fetch_blob, cache_dir=cache_dir)
+    blob_ids = []
+    for i in range(blobs):
+        blob_ids.append(await client.publish_blob({"prediction": "Düşme", "confidence": 0.9, "seq": i}))
+    results = {}
+
+    async def timed(name, coro):
+        requests = app.state.requests
+        start = time.perf_counter()
+        await coro
+        results[name] = ((time.perf_counter() - start) * 1000, app.state.requests - requests)
+
+    async def sequential_uncached():
+        for blob_id in blob_ids:
+            await client._fetch_blob(blob_id)
+
+    await timed("sequential, no cache", sequential_uncached())
+    client.cache = BlobCache(client._fetch_blob, cache_dir="")
+    await timed("prefetch, cold", client.read_blobs(blob_ids))
+    client.cache = BlobCache(client._fetch_blob, cache_dir=cache_dir)
+    await timed("prefetch, disk-warm", client.read_blobs(blob_ids))
+    await timed("prefetch, memory-warm", client.read_blobs(blob_ids))
+
+    client.cache = BlobCache(client._fetch_blob, cache_dir="")
+    await timed("100 concurrent reads of 1 id", asyncio.gather(*(client.read_blob(blob_ids[0]) for _ in range(100))))
+    await client.aclose()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--blobs", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+    logging.getLogger("WalrusClient").setLevel(logging.WARNING)
+
+    base_url, app, server = start_in_thread(latency_ms=args.latency_ms)
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            results = asyncio.run(run(base_url, app, args.blobs, cache_dir))
+    finally:
+        server.should_exit = True
+    for name, (ms, requests) in results.items():
+        print(f"{name:>30}: {ms:8.1f} ms  {requests:4d} aggregator requests")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+WebSocket broadcast fan-out with many subscribers, some of them slow.
+
+Compares the old sequential broadcast (await send_text per client) with ConnectionManager's
+per-client queues. Reports the time a broadcast call takes and the delivery latency seen by
+fast clients.
+
+Run from the project root:
+    python -m scripts.bench_broadcast --clients 1000 --slow 10 --messages 50
+"""
+import argparse
+import asyncio
+import json
+import time
+from app.api.websocket_handler import ConnectionManager
+from scripts.bench_utils import percentiles
+
+class FakeWebSocket:
+    def __init__(self, delay, latencies):
+        self.delay = delay
+        self.latencies = latencies
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.latencies is not None:
+            sent_at = json.loads(text)["sent_at"]
+            self.latencies.append((time.perf_counter() - sent_at) * 1000)
+
+    async def close(self):
+        pass
+
+async def sequential_broadcast(connections, message):
+    # The previous ConnectionManager.broadcast
+    message_json = json.dumps(message)
+    for connection in connections:
+        await connection.send_text(message_json)
+
+async def run(mode, clients, slow, slow_delay, messages, rate):
+    fast_latencies = []
+    sockets = [FakeWebSocket(slow_delay if i < slow else 0, None if i < slow else fast_latencies) for i in range(clients)]
+    manager = ConnectionManager(max_consecutive_drops=0)
+    if mode == "queued":
+        for ws in sockets:
+            await manager.connect(ws)
+
+    call_ms = []
+    for i in range(messages):
+        message = {"seq": i, "sent_at": time.perf_counter(), "prediction": "Normal", "magnitude": 1.0}
+        start = time.perf_counter()
+        if mode == "queued":
+            await manager.broadcast(message)
+        else:
+            await sequential_broadcast(sockets, message)
+        call_ms.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(1.0 / rate)
+
+    await asyncio.sleep(0.2)
+    for ws in list(manager.clients):
+        manager.disconnect(ws)
+    return percentiles(call_ms, points=(50, 99)), percentiles(fast_latencies, points=(50, 99)), manager.stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--slow", type=int, default=10, help="Clients that take --slow-delay per frame")
+    parser.add_argument("--slow-delay", type=float, default=0.05)
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--rate", type=float, default=10.0, help="Broadcasts per second")
+    args = parser.parse_args()
+
+    print(f"{args.clients} subscribers, {args.slow} slow ({args.slow_delay * 1000:.0f} ms/frame), {args.messages} broadcasts")
+    for mode in ("sequential", "queued"):
+        call, delivery, stats = asyncio.run(run(mode, args.clients, args.slow, args.slow_delay, args.messages, args.rate))
+        print(f"{mode:>10}: broadcast call p50={call['p50']:.2f}ms p99={call['p99']:.2f}ms | "
+              f"fast-client delivery p50={delivery['p50']:.2f}ms p99={delivery['p99']:.2f}ms"
+              + (f" | dropped frames={stats['frames_dropped']}" if mode == "queued" else ""))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Multi-device ingest benchmark.
+
+Feeds N simulated devices at a fixed packet rate through DeviceRegistry (per-device CSIBuffer +
+RollingFeatures) in a single process and reports whether the process keeps up with real time.
+
+Run from the project root:
+    python -m scripts.bench_devices --devices 100 500 1000 --rate 100 --seconds 2
+"""
+import argparse
+import time
+import numpy as np
+from app.core.device_registry import DeviceRegistry
+
+def run(num_devices, rate_hz, seconds, features, hop):
+    registry = DeviceRegistry(window_size_seconds=2, sampling_rate=rate_hz, max_devices=num_devices)
+    rng = np.random.default_rng(0)
+    # Pre-generated packet pool so the benchmark measures ingest, not the RNG
+    pool = rng.normal(0, 1, (64, features)).astype(np.float32)
+    device_ids = [f"esp32-{i:05d}" for i in range(num_devices)]
+    ticks = int(seconds * rate_hz)
+
+    reads = 0
+    start = time.perf_counter()
+    for tick in range(ticks):
+        packet = pool[tick % len(pool)]
+        for device_id in device_ids:
+            device = registry.get(device_id)
+            device.buffer.append(packet)
+            if device.buffer.is_full() and tick % hop == 0:
+                device.buffer.feature_vector()
+                reads += 1
+    elapsed = time.perf_counter() - start
+
+    packets = ticks * num_devices
+    return {
+        "devices": num_devices,
+        "packets": packets,
+        "elapsed_s": elapsed,
+        "packets_per_s": packets / elapsed,
+        "us_per_packet": elapsed / packets * 1e6,
+        "realtime_factor": seconds / elapsed,
+        "feature_reads": reads,
+        "registry_mb": registry.memory_bytes() / 1e6,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--rate", type=int, default=100, help="Packets per second per device")
+    parser.add_argument("--seconds", type=float, default=2.0, help="Simulated seconds per run")
+    parser.add_argument("--features", type=int, default=1026)
+    parser.add_argument("--hop", type=int, default=1, help="Read the feature vector every N packets")
+    args = parser.parse_args()
+
+    print(f"{'devices':>8} {'packets/s':>12} {'us/packet':>10} {'realtime x':>11} {'memory MB':>10}")
+    for num_devices in args.devices:
+        r = run(num_devices, args.rate, args.seconds, args.features, args.hop)
+        print(f"{r['devices']:>8} {r['packets_per_s']:>12.0f} {r['us_per_packet']:>10.2f} "
+              f"{r['realtime_factor']:>11.2f} {r['registry_mb']:>10.1f}")
+
+if __name__ == "__main__":
+    main()
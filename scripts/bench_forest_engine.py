@@ -0,0 +1,52 @@
+"""
+sklearn predict_proba vs FlatForest (CSI_INFERENCE_ENGINE=flat) for several batch sizes.
+Also checks that both engines produce identical probabilities.
+
+Run from the project root:
+    python -m scripts.bench_forest_engine --batches 1 16 64 --repeats 50
+"""
+import argparse
+import time
+import numpy as np
+from app.core.forest_engine import FlatForest
+from scripts.bench_utils import load_or_train_model, sample_inputs, percentiles
+
+def time_engine(predict_proba, inputs, batch, repeats):
+    samples = []
+    for i in range(repeats):
+        start_row = (i * batch) % (len(inputs) - batch + 1)
+        X = inputs[start_row:start_row + batch]
+        start = time.perf_counter()
+        predict_proba(X)
+        samples.append((time.perf_counter() - start) * 1000)
+    return percentiles(samples, points=(50, 99))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batches", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+
+    model, source = load_or_train_model()
+    model.n_jobs = 1
+    start = time.perf_counter()
+    flat = FlatForest.from_sklearn(model)
+    export_ms = (time.perf_counter() - start) * 1000
+    inputs = sample_inputs(model.n_features_in_, rows=max(256, max(args.batches)))
+
+    reference = model.predict_proba(inputs)
+    candidate = flat.predict_proba(inputs)
+    print(f"Model: {source}")
+    print(f"Export: {export_ms:.1f} ms, {flat.node_count} nodes, max depth {flat.max_depth}")
+    print(f"Identical probabilities: {np.array_equal(reference, candidate)} "
+          f"(max abs diff {np.abs(reference - candidate).max():.3g})")
+
+    print(f"{'batch':>6} {'sklearn p50':>12} {'flat p50':>10} {'sklearn p99':>12} {'flat p99':>10} {'speedup':>8}")
+    for batch in args.batches:
+        sk = time_engine(model.predict_proba, inputs, batch, args.repeats)
+        fl = time_engine(flat.predict_proba, inputs, batch, args.repeats)
+        print(f"{batch:>6} {sk['p50']:>10.2f}ms {fl['p50']:>8.2f}ms {sk['p99']:>10.2f}ms {fl['p99']:>8.2f}ms "
+              f"{sk['p50'] / fl['p50']:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+History store at scale: bulk-loads N events into a fresh SQLite HistoryStore, then measures
+/history-style page queries (first page, deep cursor pages, filtered and time-ranged) and the
+cost of add() on the detection path, compared with the old list.insert(0, ...) history.
+
+Run from the project root:
+    python -m scripts.bench_history --events 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from app.core.history_store import HistoryStore
+from scripts.bench_utils import percentiles
+
+async def run(path, events, queries):
+    store = HistoryStore(path=path, batch_size=5000)
+    now = time.time()
+    devices = [f"esp32-{i}" for i in range(100)]
+    start = time.perf_counter()
+    for i in range(events):
+        store.add("Düşme" if i % 3 else "Hareketsizlik", "KRİTİK" if i % 3 else "UYARI",
+                  device_id=random.choice(devices), user=f"user{i % 50}", ts=now - (events - i))
+    add_us = (time.perf_counter() - start) * 1e6 / events
+    start = time.perf_counter()
+    await store.flush()
+    print(f"{events} events: add() {add_us:.2f} us each, flush {time.perf_counter() - start:.1f} s")
+
+    async def measure(name, **kwargs):
+        samples = []
+        for _ in range(queries):
+            start = time.perf_counter()
+            await store.query(**kwargs)
+            samples.append((time.perf_counter() - start) * 1000)
+        stats = percentiles(samples, points=(50, 99))
+        print(f"{name:>28}: " + " ".join(f"{k}={v:.2f}ms" for k, v in stats.items()))
+
+    await measure("first page (100)")
+    cursor = None
+    for _ in range(50):
+        _, cursor = await store.query(cursor=cursor)
+    await measure("page 51 via cursor", cursor=cursor)
+    await measure("device filter", device_id="esp32-7")
+    await measure("user + risk filter", user="user3", risk="UYARI")
+    await measure("last hour", since=now - 3600)
+    await store.stop()
+
+    history = []
+    n = min(events, 200000)
+    start = time.perf_counter()
+    for i in range(n):
+        history.insert(0, {"olay": "Düşme", "risk": "KRİTİK", "blobId": None})
+    print(f"list.insert(0, ...) over {n} events: {(time.perf_counter() - start) * 1e6 / n:.2f} us each "
+          f"(grows with history size)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(os.path.join(directory, "history.sqlite3"), args.events, args.queries))
+
+if __name__ == "__main__":
+    main()
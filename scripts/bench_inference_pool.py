@@ -0,0 +1,67 @@
+"""
+Event-loop latency while the RandomForest runs: inline predict vs BatchingPredictor.
+
+A ticker coroutine measures how late the event loop wakes it up (a stand-in for ingest latency)
+while N devices request inference concurrently.
+
+Run from the project root:
+    python -m scripts.bench_inference_pool --devices 50 --rounds 20
+"""
+import argparse
+import asyncio
+import time
+from app.core.inference_pool import BatchingPredictor
+from scripts.bench_utils import load_or_train_model, sample_inputs, percentiles
+
+async def ticker(lags, stop, interval=0.001):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append((loop.time() - expected) * 1000)
+
+async def run(mode, model, inputs, devices, rounds):
+    lags = []
+    stop = asyncio.Event()
+    tick = asyncio.create_task(ticker(lags, stop))
+    batcher = BatchingPredictor(model.predict_proba) if mode == "pool" else None
+
+    async def inline(x):
+        # What ModelManager.predict used to do: sklearn on the event loop
+        return model.predict_proba(x.reshape(1, -1))[0]
+
+    start = time.perf_counter()
+    for r in range(rounds):
+        rows = [inputs[(r * devices + d) % len(inputs)] for d in range(devices)]
+        if batcher is None:
+            await asyncio.gather(*(inline(x) for x in rows))
+        else:
+            await asyncio.gather(*(batcher.submit(x) for x in rows))
+        await asyncio.sleep(0.005)
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await tick
+    if batcher is not None:
+        batcher.close()
+    return elapsed, percentiles(lags), batcher.stats if batcher else None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=50, help="Concurrent inference requests per round")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    model, source = load_or_train_model()
+    model.n_jobs = 1
+    inputs = sample_inputs(model.n_features_in_)
+    print(f"Model: {source}")
+    for mode in ("inline", "pool"):
+        elapsed, lag, stats = asyncio.run(run(mode, model, inputs, args.devices, args.rounds))
+        windows = args.devices * args.rounds
+        print(f"{mode:>6}: {windows / elapsed:8.0f} windows/s | loop lag ms "
+              + " ".join(f"{k}={v:.2f}" for k, v in lag.items())
+              + (f" | batches={stats['batches']} max_batch={stats['max_batch']}" if stats else ""))
+
+if __name__ == "__main__":
+    main()
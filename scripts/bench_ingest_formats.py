@@ -0,0 +1,77 @@
+"""
+JSON vs binary /ingest throughput comparison.
+
+1. Decode only: json.loads + np.array(data["csi"]) vs csi_codec.decode_frame.
+2. In-process HTTP: POST /ingest through the ASGI app with both body formats.
+
+Run from the project root:
+    python -m scripts.bench_ingest_formats --packets 2000
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+import numpy as np
+import httpx
+from app.core.csi_codec import BINARY_CONTENT_TYPE, decode_frame, encode_frame
+
+def bench_decode(packets, features):
+    csi = np.random.default_rng(0).normal(0, 1, features).astype(np.float32)
+    json_body = json.dumps({"csi": csi.tolist(), "device_id": "bench"}).encode()
+    binary_body = encode_frame(csi, device_id="bench", seq=1, timestamp_ns=time.time_ns())
+
+    start = time.perf_counter()
+    for _ in range(packets):
+        np.array(json.loads(json_body)["csi"])
+    json_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(packets):
+        decode_frame(binary_body)
+    binary_s = time.perf_counter() - start
+    return len(json_body), len(binary_body), json_s, binary_s
+
+async def bench_http(packets, features):
+    # Emergency publishes from mock predictions go to a closed local port instead of the testnet
+    os.environ.setdefault("WALRUS_PUBLISHER_URL", "http://127.0.0.1:9")
+    logging.getLogger("WalrusClient").setLevel(logging.CRITICAL)
+    from app.main import app
+    csi = np.random.default_rng(1).normal(0, 1, features).astype(np.float32)
+    json_body = json.dumps({"csi": csi.tolist(), "device_id": "bench-json"}).encode()
+    binary_body = encode_frame(csi, device_id="bench-binary")
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, body, content_type in (
+            ("json", json_body, "application/json"),
+            ("binary", binary_body, BINARY_CONTENT_TYPE),
+        ):
+            start = time.perf_counter()
+            for _ in range(packets):
+                response = await client.post("/ingest", content=body, headers={"content-type": content_type})
+                response.raise_for_status()
+            results[name] = time.perf_counter() - start
+            # Let inference tasks spawned by this run finish before timing the next format
+            await asyncio.sleep(0.1)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--packets", type=int, default=2000)
+    parser.add_argument("--features", type=int, default=1026)
+    args = parser.parse_args()
+
+    json_size, binary_size, json_s, binary_s = bench_decode(args.packets, args.features)
+    print(f"Body size:   json {json_size} B | binary {binary_size} B ({json_size / binary_size:.1f}x smaller)")
+    print(f"Decode only: json {args.packets / json_s:,.0f} pkt/s | binary {args.packets / binary_s:,.0f} pkt/s "
+          f"({json_s / binary_s:.0f}x)")
+
+    http = asyncio.run(bench_http(args.packets, args.features))
+    print(f"ASGI /ingest: json {args.packets / http['json']:,.0f} pkt/s | binary {args.packets / http['binary']:,.0f} pkt/s "
+          f"({http['json'] / http['binary']:.1f}x)")
+
+if __name__ == "__main__":
+    main()
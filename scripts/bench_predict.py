@@ -0,0 +1,51 @@
+"""
+Per-window inference latency: predict + predict_proba (two forest passes) vs
+ModelManager.predict_batch (one predict_proba pass, argmax mapped to classes_).
+
+Uses app/models/model.pkl when present, otherwise a synthetic forest of the same shape.
+
+Run from the project root:
+    python -m scripts.bench_predict --windows 300
+"""
+import argparse
+import time
+import numpy as np
+from app.core.model_manager import ModelManager
+from scripts.bench_utils import load_or_train_model, sample_inputs, percentiles
+
+def time_calls(fn, inputs, windows):
+    samples = []
+    for i in range(windows):
+        x = inputs[i % len(inputs)].reshape(1, -1)
+        start = time.perf_counter()
+        fn(x)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--windows", type=int, default=300)
+    args = parser.parse_args()
+
+    model, source = load_or_train_model()
+    manager = ModelManager()
+    manager.set_model(model)
+    inputs = sample_inputs(model.n_features_in_)
+
+    def two_pass(x):
+        prediction = model.predict(x)[0]
+        confidence = float(np.max(model.predict_proba(x)[0]))
+        return str(prediction), confidence
+
+    # Same labels as the old path
+    for x in inputs[:50]:
+        assert two_pass(x.reshape(1, -1))[0] == manager.predict_batch(x.reshape(1, -1))[0][0]
+
+    print(f"Model: {source}")
+    for name, fn in (("predict + predict_proba", two_pass), ("single predict_proba", manager.predict_batch)):
+        fn(inputs[:1])  # warm up
+        stats = percentiles(time_calls(fn, inputs, args.windows), points=(50, 90, 99))
+        print(f"{name:>24}: " + " ".join(f"{k}={v:.2f}ms" for k, v in stats.items()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,448 @@
+"""
+Reproducible benchmark suite for the ingest -> inference -> broadcast path.
+
+Microbenchmarks time each stage on its own (buffer append, window build, feature extraction,
+magnitude, body decoding, predict, JSON encoding, broadcast fan-out). End-to-end scenarios drive
+the FastAPI app in-process through ASGI, with a local stand-in Walrus publisher
+(scripts/fake_walrus.py), a fixed synthetic model and the motion gate off, so runs on different
+commits do the same work.
+
+Every run is written as JSON (environment, git commit, per-benchmark metrics). Comparing two
+result files prints the change of each benchmark's primary metric and exits with status 1 when
+one regressed by more than --threshold, so it can gate CI.
+
+Run from the project root:
+    python -m scripts.bench_suite                              # writes bench_results/<time>-<commit>.json
+    python -m scripts.bench_suite --quick --only buffer e2e    # fewer iterations, a subset
+    python -m scripts.bench_suite --baseline bench_results/main.json
+    python -m scripts.bench_suite --compare old.json new.json --threshold 0.1
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import sklearn
+from app.core.csi_codec import BINARY_CONTENT_TYPE, decode_frame, encode_frame
+from app.core.csi_processor import SignalProcessor
+from app.core.device_registry import DeviceState
+from app.core.features import window_mean
+from app.core.forest_engine import FlatForest
+from scripts.bench_broadcast import FakeWebSocket
+from scripts.bench_utils import HdrHistogram, load_or_train_model
+
+SUITE_VERSION = 1
+RESULTS_DIR = "bench_results"
+
+def _stats(per_op_us):
+    # The fastest round is the least disturbed by other processes, like timeit's advice
+    per_op_us = np.asarray(per_op_us)
+    best = float(per_op_us.min())
+    return {"us_per_op": best, "median_us": float(np.median(per_op_us)), "max_us": float(per_op_us.max()),
+            "ops_per_s": 1e6 / best if best else None}
+
+def time_sync(fn, number, repeats):
+    """Per-call time of fn over repeats rounds of number calls (after one warm-up round)."""
+    for _ in range(number):
+        fn()
+    rounds = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((time.perf_counter() - start) / number * 1e6)
+    return _stats(rounds)
+
+class Suite:
+    def __init__(self, features=1026, trees=100, quick=False, devices=10, clients=1000, packets=2000):
+        self.features = features
+        self.trees = trees
+        self.scale = 0.2 if quick else 1.0
+        self.devices = devices
+        self.clients = clients
+        self.packets = max(200, int(packets * self.scale))
+        self.rng = np.random.default_rng(0)
+        self.packet = np.abs(self.rng.normal(40, 3, features)).astype(np.float32)
+        self.block = np.abs(self.rng.normal(40, 3, (25, features))).astype(np.float32)
+        self.results = {}
+        self._model = None
+
+    def n(self, number):
+        return max(1, int(number * self.scale))
+
+    def model(self):
+        if self._model is None:
+            self._model, source = load_or_train_model(n_features=self.features, n_estimators=self.trees)
+            print(f"model: {source}")
+            self._model.n_jobs = 1
+        return self._model
+
+    def add(self, name, metrics, primary="us_per_op", better="lower"):
+        self.results[name] = {"metrics": metrics, "primary": primary, "better": better}
+        value = metrics.get(primary)
+        print(f"  {name:<32} {primary} {value:,.2f}" if value is not None else f"  {name:<32} -")
+
+    def full_device(self):
+        device = DeviceState("bench", window_size_seconds=2, sampling_rate=100)
+        device.buffer.extend(np.abs(self.rng.normal(40, 3, (device.buffer.max_len + 37, self.features))).astype(np.float32))
+        return device
+
+    # --- microbenchmarks ---
+
+    def bench_buffer(self):
+        buffer = self.full_device().buffer
+        self.add("buffer.append", time_sync(lambda: buffer.append(self.packet), self.n(2000), 7))
+        self.add("buffer.extend_25", time_sync(lambda: buffer.extend(self.block), self.n(200), 7))
+        # Ring head in the middle, so the ordered window needs its one copy
+        buffer.append(self.packet)
+        self.add("window.ordered", time_sync(lambda: buffer.window_view(ordered=True), self.n(500), 7))
+        self.add("window.unordered", time_sync(lambda: buffer.window_view(ordered=False), self.n(5000), 7))
+
+    def bench_features(self):
+        buffer = self.full_device().buffer
+        window = buffer.window_view(ordered=False)
+        self.add("features.rolling_mean", time_sync(buffer.feature_vector, self.n(5000), 7))
+        self.add("features.window_mean", time_sync(lambda: window_mean(window), self.n(500), 7))
+        self.add("magnitude.packet", time_sync(lambda: SignalProcessor.calculate_current_magnitude(self.packet), self.n(5000), 7))
+        self.add("magnitude.block_25", time_sync(lambda: SignalProcessor.calculate_magnitudes(self.block), self.n(2000), 7))
+
+    def bench_decode(self):
+        json_body = json.dumps({"csi": self.packet.tolist(), "device_id": "bench"})
+        binary_body = encode_frame(self.packet, device_id="bench", timestamp_ns=time.time_ns())
+        self.add("decode.json", time_sync(lambda: np.array(json.loads(json_body)["csi"]), self.n(500), 7))
+        self.add("decode.binary", time_sync(lambda: decode_frame(binary_body), self.n(5000), 7))
+
+    def bench_predict(self):
+        model = self.model()
+        row = self.rng.normal(40, 3, (1, self.features))
+        batch = self.rng.normal(40, 3, (32, self.features))
+        self.add("predict.sklearn", time_sync(lambda: model.predict_proba(row), self.n(100), 5))
+        flat = FlatForest.from_sklearn(model)
+        self.add("predict.flat", time_sync(lambda: flat.predict_proba(row), self.n(200), 5))
+        self.add("predict.flat_batch_32", time_sync(lambda: flat.predict_proba(batch), self.n(50), 5))
+
+    def bench_encode(self):
+        output = {
+            "device_id": "bench", "magnitude": 40.123, "prediction": "Normal", "confidence": 0.91,
+            "probabilities": {"Düşme": 0.03, "Hareketsizlik": 0.06, "Normal": 0.91},
+            "is_emergency": False, "timestamp": "2024-01-01T00:00:00.000000",
+            "packet_timestamp_ns": time.time_ns(), "user": "guest",
+        }
+        self.add("encode.prediction_json", time_sync(lambda: json.dumps(output), self.n(20000), 7))
+
+    def bench_broadcast(self):
+        asyncio.run(self._broadcast(self.clients))
+
+    async def _broadcast(self, clients):
+        from app.api.websocket_handler import ConnectionManager
+        manager = ConnectionManager(queue_size=1024)
+        sockets = [FakeWebSocket(0, None) for _ in range(clients)]
+        for websocket in sockets:
+            await manager.connect(websocket, topics=["predictions"])
+        await asyncio.sleep(0)
+        message = {"prediction": "Normal", "confidence": 0.9, "device_id": "bench"}
+        messages = self.n(200)
+        calls = []
+        start = time.perf_counter()
+        for _ in range(messages):
+            call_start = time.perf_counter()
+            await manager.broadcast(message, topics=("predictions",))
+            calls.append((time.perf_counter() - call_start) * 1e6)
+            # Writers drain between broadcasts like they would between predictions
+            await asyncio.sleep(0)
+        while any(client.queue.qsize() for client in manager.clients.values()):
+            await asyncio.sleep(0)
+        elapsed = time.perf_counter() - start
+        for websocket in sockets:
+            manager.disconnect(websocket)
+        metrics = _stats(calls)
+        metrics.update({"clients": clients, "frames_per_s": messages * clients / elapsed,
+                        "delivery_ms_per_message": elapsed / messages * 1000})
+        self.add(f"broadcast.fanout_{clients}", metrics)
+
+    # --- end-to-end through the ASGI app ---
+
+    def bench_e2e(self):
+        asyncio.run(self._e2e())
+
+    async def _e2e(self):
+        import httpx
+        from app import main
+        from app.api.websocket_handler import TOPIC_PREDICTIONS, TOPIC_EMERGENCY
+        main.model_manager.set_model(self.model(), version="bench")
+        main.history_store.start()
+        main.walrus_outbox.listeners.append(main.on_events_published)
+        main.walrus_outbox.start()
+
+        subscriber = DeliveryRecorder()
+        await main.manager.connect(subscriber, topics=[TOPIC_PREDICTIONS, TOPIC_EMERGENCY])
+        transport = httpx.ASGITransport(app=main.app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                for name, send in (
+                    ("e2e.ingest_json", self._send_json),
+                    ("e2e.ingest_binary", self._send_binary),
+                    ("e2e.ingest_batch_binary_25", self._send_batch),
+                ):
+                    await self._scenario(name, client, send, subscriber, main)
+                await self._emergency(client, subscriber, main)
+        finally:
+            main.manager.disconnect(subscriber)
+            await main.walrus_outbox.stop()
+            await main.history_store.stop()
+            await main.walrus_client.aclose()
+            main.model_manager.close()
+
+    async def _send_json(self, client, device_id, packets):
+        body = json.dumps({"device_id": device_id, "csi": packets[0].tolist(), "timestamp_ns": time.time_ns()})
+        return await client.post("/ingest", content=body, headers={"content-type": "application/json"})
+
+    async def _send_binary(self, client, device_id, packets):
+        body = encode_frame(packets[0], device_id=device_id, timestamp_ns=time.time_ns())
+        return await client.post("/ingest", content=body, headers={"content-type": BINARY_CONTENT_TYPE})
+
+    async def _send_batch(self, client, device_id, packets):
+        now = time.time_ns()
+        body = b"".join(encode_frame(p, device_id=device_id, timestamp_ns=now - (len(packets) - i - 1) * 10_000_000)
+                        for i, p in enumerate(packets))
+        return await client.post("/ingest/batch", content=body, headers={"content-type": BINARY_CONTENT_TYPE})
+
+    async def _scenario(self, name, client, send, subscriber, main, batch=None):
+        batch = batch or (25 if "batch" in name else 1)
+        device_ids = [f"{name}-{i}" for i in range(self.devices)]
+        packets = np.abs(self.rng.normal(40, 3, (batch, self.features))).astype(np.float32)
+        # Fill every window first so the timed part always includes scoring
+        for device_id in device_ids:
+            main.device_registry.get(device_id).buffer.extend(np.repeat(packets[:1], 200, axis=0))
+        subscriber.reset(prefix=name)
+        requests = HdrHistogram()
+        messages = max(1, self.packets // batch)
+        start = time.perf_counter()
+        for i in range(messages):
+            request_start = time.perf_counter()
+            response = await send(client, device_ids[i % len(device_ids)], packets)
+            response.raise_for_status()
+            requests.record((time.perf_counter() - request_start) * 1e6)
+        sent = time.perf_counter() - start
+        await drain(main)
+        metrics = {
+            "packets": messages * batch,
+            "us_per_packet": sent / (messages * batch) * 1e6,
+            "packets_per_s": messages * batch / sent,
+            "request_ms": requests.summary(scale=1000),
+            "predictions": subscriber.count,
+            "broadcast_ms": subscriber.latency.summary(scale=1000),
+        }
+        self.add(name, metrics, primary="us_per_packet")
+
+    async def _emergency(self, client, subscriber, main):
+        """Every window scored as Düşme: outbox write, broadcast and publish to the stand-in Walrus."""
+        from sklearn.dummy import DummyClassifier
+        model = DummyClassifier(strategy="constant", constant="Düşme")
+        model.fit(np.zeros((3, self.features)), ["Düşme", "Hareketsizlik", "Normal"])
+        main.model_manager.set_model(model, version="bench-emergency")
+        before = main.walrus_outbox.stats.get("published", 0)
+        subscriber.reset(prefix="e2e.emergency")
+        name = "e2e.emergency_publish"
+        device_ids = [f"{name}-{i}" for i in range(self.devices)]
+        packets = np.abs(self.rng.normal(40, 3, (25, self.features))).astype(np.float32)
+        for device_id in device_ids:
+            main.device_registry.get(device_id).buffer.extend(np.repeat(packets[:1], 200, axis=0))
+        start = time.perf_counter()
+        for i in range(self.n(100)):
+            (await self._send_batch(client, device_ids[i % len(device_ids)], packets)).raise_for_status()
+        await drain(main)
+        emergencies = subscriber.emergencies
+        deadline = time.perf_counter() + 30
+        while subscriber.published < emergencies and time.perf_counter() < deadline:
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        metrics = {
+            "emergencies": emergencies,
+            "published": main.walrus_outbox.stats.get("published", 0) - before,
+            "publish_ms": subscriber.publish_latency.summary(scale=1000),
+            "emergencies_per_s": emergencies / elapsed,
+        }
+        metrics["publish_p50_ms"] = metrics["publish_ms"].get("p50")
+        self.add(name, metrics, primary="publish_p50_ms")
+
+class DeliveryRecorder:
+    """Fake /ws/monitor client that measures packet -> broadcast and emergency -> walrus_published latency."""
+    def __init__(self):
+        self.reset()
+
+    def reset(self, prefix=""):
+        self.prefix = prefix
+        self.count = 0
+        self.emergencies = 0
+        self.published = 0
+        self.latency = HdrHistogram()
+        self.publish_latency = HdrHistogram()
+        self._emergency_at = {}
+
+    async def accept(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def send_text(self, text):
+        now_ns = time.time_ns()
+        message = json.loads(text)
+        if not str(message.get("device_id", "")).startswith(self.prefix):
+            return
+        if message.get("type") == "walrus_published":
+            self.published += 1
+            sent_ns = self._emergency_at.pop(message.get("eventId"), None)
+            if sent_ns:
+                self.publish_latency.record((now_ns - sent_ns) / 1000)
+            return
+        self.count += 1
+        if message.get("packet_timestamp_ns"):
+            self.latency.record((now_ns - message["packet_timestamp_ns"]) / 1000)
+        if message.get("eventId"):
+            self.emergencies += 1
+            self._emergency_at[message["eventId"]] = now_ns
+
+async def drain(main, timeout=10.0):
+    """Waits for scheduled inferences and their broadcasts to finish."""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        busy = main.inference_scheduler.in_flight or any(c.queue.qsize() for c in main.manager.clients.values())
+        if not busy:
+            break
+        await asyncio.sleep(0.001)
+    await asyncio.sleep(0.01)
+
+BENCHMARKS = {
+    "buffer": Suite.bench_buffer,
+    "features": Suite.bench_features,
+    "decode": Suite.bench_decode,
+    "predict": Suite.bench_predict,
+    "encode": Suite.bench_encode,
+    "broadcast": Suite.bench_broadcast,
+    "e2e": Suite.bench_e2e,
+}
+
+def git_info():
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], capture_output=True, text=True, timeout=10).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    return {"commit": git("rev-parse", "HEAD"), "subject": git("log", "-1", "--format=%s"),
+            "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+def environment():
+    return {"python": platform.python_version(), "numpy": np.__version__, "sklearn": sklearn.__version__,
+            "platform": platform.platform(), "machine": platform.machine(), "cpu_count": os.cpu_count()}
+
+def prepare_environment(workdir):
+    """Points every side effect of app.main at a temp dir and a local Walrus before it is imported."""
+    from scripts.fake_walrus import start_in_thread
+    url, _, server = start_in_thread()
+    os.environ.update({
+        "WALRUS_PUBLISHER_URL": url,
+        "WALRUS_AGGREGATOR_URL": url,
+        "WALRUS_OUTBOX_PATH": os.path.join(workdir, "outbox.sqlite3"),
+        "WALRUS_CACHE_DIR": os.path.join(workdir, "blob_cache"),
+        "CSI_HISTORY_PATH": os.path.join(workdir, "history.sqlite3"),
+        "CSI_MOTION_GATE": "0",
+        "CSI_MODEL_WATCH_INTERVAL": "0",
+    })
+    return server
+
+def run(args):
+    selected = [name for name in BENCHMARKS if not args.only or any(name.startswith(o) for o in args.only)]
+    suite = Suite(features=args.features, trees=args.trees, quick=args.quick, devices=args.devices, clients=args.clients)
+    with tempfile.TemporaryDirectory() as workdir:
+        server = prepare_environment(workdir)
+        try:
+            for name in selected:
+                print(f"{name}:")
+                BENCHMARKS[name](suite)
+        finally:
+            server.should_exit = True
+    return {
+        "suite_version": SUITE_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git": git_info(),
+        "environment": environment(),
+        "config": {"features": args.features, "trees": args.trees, "quick": args.quick,
+                   "devices": args.devices, "clients": args.clients, "only": args.only},
+        "results": suite.results,
+    }
+
+def compare(base, new, threshold):
+    """Prints the primary metric of every benchmark in both files. Returns the regressed names."""
+    if base["environment"] != new["environment"]:
+        print("note: results come from different environments, differences may not be the code")
+    print(f"base {base['git'].get('commit', '')[:10]} {base['git'].get('subject', '')}")
+    print(f"new  {new['git'].get('commit', '')[:10]} {new['git'].get('subject', '')}")
+    print(f"{'benchmark':<32} {'metric':<16} {'base':>12} {'new':>12} {'change':>8}")
+    regressions = []
+    for name in sorted(set(base["results"]) | set(new["results"])):
+        old_entry, new_entry = base["results"].get(name), new["results"].get(name)
+        if old_entry is None or new_entry is None:
+            print(f"{name:<32} {'(only in ' + ('new' if old_entry is None else 'base') + ')'}")
+            continue
+        primary = new_entry["primary"]
+        old_value, new_value = old_entry["metrics"].get(primary), new_entry["metrics"].get(primary)
+        if not old_value or new_value is None:
+            print(f"{name:<32} {primary:<16} {'-':>12} {'-':>12}")
+            continue
+        change = (new_value - old_value) / old_value
+        worse = change if new_entry["better"] == "lower" else -change
+        status = ""
+        if worse > threshold:
+            status = "  REGRESSION"
+            regressions.append(name)
+        elif worse < -threshold:
+            status = "  faster"
+        print(f"{name:<32} {primary:<16} {old_value:>12.2f} {new_value:>12.2f} {change * 100:>+7.1f}%{status}")
+    return regressions
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", default=None, help=f"Benchmark groups to run: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--quick", action="store_true", help="Fewer iterations (noisier)")
+    parser.add_argument("--features", type=int, default=1026)
+    parser.add_argument("--trees", type=int, default=100, help="Synthetic model size when app/models/model.pkl is missing")
+    parser.add_argument("--devices", type=int, default=10, help="Devices the end-to-end scenarios rotate over")
+    parser.add_argument("--clients", type=int, default=1000, help="Subscribers in the broadcast fan-out benchmark")
+    parser.add_argument("--out", default=None, help=f"Result file (default {RESULTS_DIR}/<time>-<commit>.json)")
+    parser.add_argument("--baseline", default=None, help="Compare this run with an earlier result file")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="Only compare two result files")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(load(args.compare[0]), load(args.compare[1]), args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    # app.main logs at INFO, one line per Walrus request would drown the results
+    for name in ("httpx", "WalrusClient", "WalrusOutbox"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    result = run(args)
+    out = args.out or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{result['git']['commit'][:7] or 'nogit'}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"results written to {out}")
+
+    if args.baseline:
+        regressions = compare(load(args.baseline), result, args.threshold)
+        sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
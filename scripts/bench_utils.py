@@ -0,0 +1,104 @@
+"""
+Shared helpers for the scripts/bench_*.py benchmarks.
+"""
+import os
+import numpy as np
+import joblib
+
+MODEL_PATH = "app/models/model.pkl"
+CLASSES = np.array(["Düşme", "Hareketsizlik", "Normal"])
+
+def load_or_train_model(model_path=MODEL_PATH, n_features=1026, n_estimators=100, rows=3000):
+    """
+    Returns (model, source). Uses the trained model.pkl when present, otherwise fits a forest of
+    the same shape as scripts/train_model.py on synthetic rows so benchmarks run without the dataset.
+    """
+    if os.path.exists(model_path):
+        return joblib.load(model_path), model_path
+    from sklearn.ensemble import RandomForestClassifier
+    rng = np.random.default_rng(42)
+    y = rng.integers(0, len(CLASSES), rows)
+    X = rng.normal(0, 1, (rows, n_features)).astype(np.float32) + y[:, None] * 0.05
+    model = RandomForestClassifier(n_estimators=n_estimators, random_state=42, n_jobs=-1)
+    model.fit(X, CLASSES[y])
+    return model, f"synthetic RandomForest ({n_estimators} trees, {rows} rows)"
+
+def sample_inputs(n_features=1026, rows=256, seed=0):
+    return np.random.default_rng(seed).normal(0, 1, (rows, n_features)).astype(np.float32)
+
+def percentiles(samples, points=(50, 90, 99, 99.9)):
+    samples = np.asarray(samples)
+    return {f"p{p}": float(np.percentile(samples, p)) for p in points}
+
+class HdrHistogram:
+    """
+    Log-linear latency histogram in the style of HdrHistogram: values (integers, e.g. microseconds)
+    below 2**sub_bits are counted exactly, larger ones in buckets 2**-(sub_bits-1) wide relative to the
+    value (sub_bits=11 keeps 3 significant digits). Recording is O(1) and memory is fixed, so it can
+    take millions of samples; histograms of the same shape can be merged.
+    """
+    def __init__(self, highest=3_600_000_000, sub_bits=11):
+        self.sub_bits = sub_bits
+        self.sub_count = 1 << sub_bits
+        self.half_count = self.sub_count >> 1
+        self.highest = highest
+        self.counts = [0] * (self._index(highest) + 1)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        shift = value.bit_length() - self.sub_bits
+        if shift <= 0:
+            return value
+        return self.sub_count + (shift - 1) * self.half_count + (value >> shift) - self.half_count
+
+    def _value(self, index):
+        """Middle of the value range counted at index."""
+        if index < self.sub_count:
+            return index
+        shift = (index - self.sub_count) // self.half_count + 1
+        lower = ((index - self.sub_count) % self.half_count + self.half_count) << shift
+        return lower + (1 << (shift - 1))
+
+    def record(self, value, count=1):
+        value = min(max(int(value), 0), self.highest)
+        self.counts[self._index(value)] += count
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        for index, n in enumerate(other.counts):
+            if n:
+                self.counts[index] += n
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, p):
+        if not self.count:
+            return None
+        target = max(1, int(round(self.count * p / 100)))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(self._value(index), self.max)
+        return self.max
+
+    def percentiles(self, points=(50, 90, 99, 99.9)):
+        return {f"p{p}": self.percentile(p) for p in points}
+
+    def summary(self, scale=1.0, points=(50, 90, 99, 99.9)):
+        """count, mean, percentiles and max, values divided by scale (e.g. 1000 for us -> ms)."""
+        if not self.count:
+            return {"count": 0}
+        result = {"count": self.count, "mean": self.total / self.count / scale}
+        result.update({k: v / scale for k, v in self.percentiles(points).items()})
+        result["max"] = self.max / scale
+        return result
@@ -0,0 +1,61 @@
+"""
+Per-publish latency against a local stand-in publisher: a new httpx.AsyncClient per call
+(the previous WalrusClient behaviour) vs the pooled keep-alive WalrusClient.
+
+Run from the project root:
+    python -m scripts.bench_walrus --publishes 200
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+import httpx
+from app.core.walrus_client import WalrusClient
+from scripts.bench_utils import percentiles
+from scripts.fake_walrus import start_in_thread
+
+async def publish_unpooled(base_url, event):
+    async with httpx.AsyncClient() as client:
+        response = await client.put(f"{base_url}/v1/blobs", content=json.dumps({"type": "event", "data": event}),
+                                    params={"epochs": 1}, timeout=30.0)
+        return response.json()
+
+async def run(base_url, publishes):
+    results = {}
+    event = {"prediction": "Düşme", "confidence": 0.9, "is_emergency": True}
+
+    samples = []
+    for i in range(publishes):
+        start = time.perf_counter()
+        await publish_unpooled(base_url, {**event, "seq": i})
+        samples.append((time.perf_counter() - start) * 1000)
+    results["new client per publish"] = samples
+
+    client = WalrusClient(publisher_url=base_url, aggregator_url=base_url)
+    samples = []
+    for i in range(publishes):
+        start = time.perf_counter()
+        await client.publish_blob({**event, "seq": i + publishes})
+        samples.append((time.perf_counter() - start) * 1000)
+    await client.aclose()
+    results["pooled WalrusClient"] = samples
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--publishes", type=int, default=200)
+    args = parser.parse_args()
+    logging.getLogger("WalrusClient").setLevel(logging.WARNING)
+
+    base_url, _, server = start_in_thread()
+    try:
+        results = asyncio.run(run(base_url, args.publishes))
+    finally:
+        server.should_exit = True
+    for name, samples in results.items():
+        stats = percentiles(samples, points=(50, 90, 99))
+        print(f"{name:>24}: " + " ".join(f"{k}={v:.2f}ms" for k, v in stats.items()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+One-time conversion of the CSI CSV dataset into a float32 .npy cache that training and analysis
+memory-map instead of parsing text on every run.
+
+The CSV is read in fixed-size chunks straight into a preallocated .npy file, so peak RAM during the
+conversion is one chunk regardless of dataset size. Labels are aligned to the data rows and stored
+next to it. The cache is rebuilt automatically when the CSV's size or mtime changes.
+
+Run from the project root (training does this on demand as well):
+    python -m scripts.dataset_cache --data data/dataset/data.csv --labels data/dataset/label.csv
+"""
+import argparse
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+
+DATA_PATH = "data/dataset/data.csv"
+LABEL_PATH = "data/dataset/label.csv"
+CACHE_VERSION = 1
+
+def cache_dir_for(data_path):
+    return os.path.join(os.path.dirname(data_path) or ".", "cache")
+
+def _stem(data_path):
+    return os.path.splitext(os.path.basename(data_path))[0]
+
+def cache_file(data_path, cache_dir=None):
+    """The float32 .npy written by convert(), for code that memory-maps it per chunk (e.g. worker processes)."""
+    return os.path.join(cache_dir or cache_dir_for(data_path), f"{_stem(data_path)}.npy")
+
+def _source_info(path):
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def _count_rows(path, block_size=1 << 24):
+    """Line count without parsing (a final line without newline counts too)."""
+    rows, last = 0, b"\n"
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            rows += block.count(b"\n")
+            last = block[-1:]
+    return rows + (last != b"\n")
+
+def _count_columns(path):
+    with open(path, "r") as f:
+        return len(f.readline().split(","))
+
+def convert(data_path=DATA_PATH, label_path=LABEL_PATH, cache_dir=None, chunksize=2000):
+    """
+    Writes <stem>.npy (float32, rows x columns), <stem>.labels.npy and <stem>.meta.json.
+    Returns the meta dict.
+    """
+    cache_dir = cache_dir or cache_dir_for(data_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    stem = _stem(data_path)
+    data_file = cache_file(data_path, cache_dir)
+    tmp_file = data_file + ".tmp.npy"
+
+    start = time.perf_counter()
+    rows, columns = _count_rows(data_path), _count_columns(data_path)
+    written = 0
+    with open(tmp_file, "wb") as out:
+        # Header for the counted rows, then the chunks appended as raw float32 bytes
+        np.lib.format.write_array_header_1_0(out, {"descr": "<f4", "fortran_order": False, "shape": (rows, columns)})
+        for chunk in pd.read_csv(data_path, header=None, dtype=np.float32, chunksize=chunksize, engine="c"):
+            out.write(np.ascontiguousarray(chunk.to_numpy(dtype=np.float32, copy=False)).tobytes())
+            written += len(chunk)
+        # Blank lines are skipped by read_csv; pad so the header stays valid, readers slice to meta["rows"]
+        out.write(b"\0" * ((rows - written) * columns * 4))
+    rows = written
+    os.replace(tmp_file, data_file)
+
+    labels, labeled_rows = None, None
+    if label_path and os.path.exists(label_path):
+        labels = pd.read_csv(label_path, header=None, names=["Index", "Label"])["Label"].to_numpy().astype(str)
+        # Align data and labels the same way train_model.py always did
+        labeled_rows = min(rows, len(labels))
+        np.save(os.path.join(cache_dir, f"{stem}.labels.npy"), labels[:labeled_rows])
+
+    meta = {
+        "version": CACHE_VERSION,
+        "rows": rows,
+        "labeled_rows": labeled_rows,
+        "columns": columns,
+        "dtype": "float32",
+        "data": _source_info(data_path),
+        "labels": _source_info(label_path) if labels is not None else None,
+        "converted_in_seconds": round(time.perf_counter() - start, 2),
+    }
+    with open(os.path.join(cache_dir, f"{stem}.meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+def _is_fresh(meta, data_path, label_path):
+    if meta.get("version") != CACHE_VERSION or meta.get("data") != _source_info(data_path):
+        return False
+    if label_path:
+        return meta.get("labels") == _source_info(label_path)
+    return True
+
+def load_dataset(data_path=DATA_PATH, label_path=LABEL_PATH, cache_dir=None, rebuild=False):
+    """
+    Returns (X, y): X is a read-only float32 memmap (rows x columns), y the aligned label array.
+    With labels X is cut to the labelled rows; label_path=None returns every row and y=None.
+    Converts the CSV first when there is no up-to-date cache.
+    """
+    cache_dir = cache_dir or cache_dir_for(data_path)
+    stem = _stem(data_path)
+    meta_file = os.path.join(cache_dir, f"{stem}.meta.json")
+    meta = None
+    if not rebuild and os.path.exists(meta_file):
+        with open(meta_file) as f:
+            meta = json.load(f)
+        if not _is_fresh(meta, data_path, label_path):
+            meta = None
+    if meta is None:
+        print(f"Converting {data_path} to a float32 cache in {cache_dir} (one time)...")
+        meta = convert(data_path, label_path, cache_dir)
+        print(f"Cached {meta['rows']} x {meta['columns']} in {meta['converted_in_seconds']} s")
+
+    X = np.load(cache_file(data_path, cache_dir), mmap_mode="r")[:meta["rows"]]
+    if not label_path:
+        return X, None
+    return X[:meta["labeled_rows"]], np.load(os.path.join(cache_dir, f"{stem}.labels.npy"))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--labels", default=LABEL_PATH)
+    parser.add_argument("--cache-dir", default=None, help="Defaults to <data dir>/cache")
+    parser.add_argument("--chunksize", type=int, default=2000, help="CSV rows parsed at a time")
+    args = parser.parse_args()
+    meta = convert(args.data, args.labels, args.cache_dir, args.chunksize)
+    print(json.dumps(meta, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Local stand-in for the Walrus publisher and aggregator, for benchmarks and offline development.
+
+PUT /v1/blobs stores the body under a content-derived blob id, GET /v1/blobs/{blob_id} returns it.
+An optional artificial latency simulates a remote publisher.
+
+Run from the project root:
+    python -m scripts.fake_walrus --port 9001 --latency-ms 20
+    WALRUS_PUBLISHER_URL=http://127.0.0.1:9001 WALRUS_AGGREGATOR_URL=http://127.0.0.1:9001 python -m app.main
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import socket
+import threading
+import time
+from fastapi import FastAPI, Request, Response
+
+def create_app(latency_ms=0.0, fail_rate=0.0):
+    app = FastAPI(title="Fake Walrus")
+    blobs = {}
+    app.state.blobs = blobs
+    app.state.requests = 0
+    app.state.fail_rate = fail_rate
+    app.state.latency_ms = latency_ms
+
+    @app.put("/v1/blobs")
+    async def publish(request: Request):
+        app.state.requests += 1
+        if app.state.latency_ms:
+            await asyncio.sleep(app.state.latency_ms / 1000)
+        if app.state.fail_rate and (app.state.requests % max(1, round(1 / app.state.fail_rate))) == 0:
+            return Response(status_code=503, content="fake publisher failure")
+        body = await request.body()
+        blob_id = base64.urlsafe_b64encode(hashlib.sha256(body).digest()).decode().rstrip("=")
+        if blob_id in blobs:
+            return {"alreadyCertified": {"blobId": blob_id}}
+        blobs[blob_id] = body
+        return {"newBlob": {"blobId": blob_id, "size": len(body)}}
+
+    @app.get("/v1/blobs/{blob_id}")
+    async def read(blob_id: str):
+        app.state.requests += 1
+        if app.state.latency_ms:
+            await asyncio.sleep(app.state.latency_ms / 1000)
+        body = blobs.get(blob_id)
+        if body is None:
+            return Response(status_code=404)
+        return Response(content=body, media_type="application/json")
+
+    return app
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_in_thread(latency_ms=0.0, fail_rate=0.0, port=None):
+    """
+    Starts the stand-in on a background uvicorn thread. Returns (base_url, app, server).
+    Stop with server.should_exit = True.
+    """
+    import uvicorn
+    port = port or free_port()
+    app = create_app(latency_ms, fail_rate)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}", app, server
+
+def main():
+    import uvicorn
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of publishes answered with 503")
+    args = parser.parse_args()
+    uvicorn.run(create_app(args.latency_ms, args.fail_rate), host="127.0.0.1", port=args.port)
+
+if __name__ == "__main__":
+    main()
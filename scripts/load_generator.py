@@ -0,0 +1,392 @@
+"""
+Open-loop load generator for the CSI backend.
+
+N simulated devices (CSISimulator.MultiDeviceSimulator, one state machine per device) each send
+--rate packets per second on a fixed schedule, whether or not earlier requests have completed,
+so the offered load does not drop when the server slows down. Latency is measured from the
+scheduled send time (not the actual one), so client-side queueing counts against the server
+instead of hiding it.
+
+Measured:
+  ingest     POST /ingest or /ingest/batch response time (HTTP transport only)
+  broadcast  scheduled send of a packet -> prediction for its window received on /ws/monitor,
+             using the packet_timestamp_ns the server echoes in every prediction
+  send lag   how late the generator itself dispatched messages (high = the client is the bottleneck)
+
+The generator reports its own CPU use: on a shared host, or when "lag" grows while the server is
+idle, the client is the bottleneck and should run on another machine (or with --payload binary
+and a larger --batch).
+
+Run from the project root against a running server (python -m app.main):
+    python -m scripts.load_generator --devices 100 --rate 100 --duration 30
+    python -m scripts.load_generator --profile 0:10,30:1000,60:1000 --payload binary --batch 10
+    python -m scripts.load_generator --transport ws --connections 8 --payload binary --devices 500
+"""
+import argparse
+import asyncio
+import json
+import time
+import httpx
+import numpy as np
+import websockets
+from app.core.csi_codec import BINARY_CONTENT_TYPE, encode_frame
+from CSISimulator import MultiDeviceSimulator
+from scripts.bench_utils import HdrHistogram
+
+def parse_profile(spec):
+    """
+    "seconds:devices,..." -> [(seconds, devices), ...], active devices interpolated linearly
+    between points, e.g. 0:10,30:1000,60:1000 ramps to 1000 devices in 30 s and holds for 30 s.
+    """
+    points = []
+    for item in spec.split(","):
+        seconds, devices = item.split(":")
+        points.append((float(seconds), int(devices)))
+    points.sort()
+    if not points or points[0][0] != 0:
+        points.insert(0, (0.0, points[0][1] if points else 0))
+    return points
+
+class LoadStats:
+    """Counters and latency histograms (microseconds) for one reporting interval or a whole run."""
+    def __init__(self):
+        self.messages = 0
+        self.packets = 0
+        self.ok = 0
+        self.errors = {}
+        self.skipped = 0
+        self.predictions = 0
+        self.ingest = HdrHistogram()
+        self.broadcast = HdrHistogram()
+        self.send_lag = HdrHistogram()
+
+    def error(self, kind):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def merge(self, other):
+        self.messages += other.messages
+        self.packets += other.packets
+        self.ok += other.ok
+        self.skipped += other.skipped
+        self.predictions += other.predictions
+        for kind, n in other.errors.items():
+            self.errors[kind] = self.errors.get(kind, 0) + n
+        self.ingest.merge(other.ingest)
+        self.broadcast.merge(other.broadcast)
+        self.send_lag.merge(other.send_lag)
+
+    def to_dict(self, seconds):
+        return {
+            "seconds": seconds,
+            "messages": self.messages,
+            "packets": self.packets,
+            "packets_per_s": self.packets / seconds if seconds else 0.0,
+            "ok": self.ok,
+            "errors": dict(self.errors),
+            "error_rate": sum(self.errors.values()) / max(1, self.messages),
+            "skipped": self.skipped,
+            "predictions": self.predictions,
+            "ingest_ms": self.ingest.summary(scale=1000),
+            "broadcast_ms": self.broadcast.summary(scale=1000),
+            "send_lag_ms": self.send_lag.summary(scale=1000),
+        }
+
+class LoadGenerator:
+    def __init__(self, url="http://localhost:8000", profile=((0, 10),), rate=100, duration=None,
+                 subcarriers=1026, payload="json", transport="http", batch=1, connections=16,
+                 max_in_flight=10000, monitor=True, report_interval=1.0, timeout=10.0, seed=0,
+                 on_prediction=None):
+        """
+        url: Backend base URL (ws:// URLs are derived from it).
+        profile: [(seconds, devices), ...] active-device ramp, see parse_profile.
+        rate: Packets per second per device.
+        duration: Run length in seconds (default: the last profile point, forever for a single point).
+        payload: "json" or "binary" (csi_codec frames).
+        transport: "http" (POST /ingest, /ingest/batch when batch > 1) or "ws" (/ws/ingest).
+        batch: Packets per message per device; a device sends rate / batch messages per second.
+        connections: HTTP connection pool size, or the number of /ws/ingest connections.
+        max_in_flight: Unanswered HTTP requests above which new sends are skipped (and counted),
+            so an overloaded server cannot make the generator grow without bound.
+        monitor: Subscribe to /ws/monitor predictions for ingest -> broadcast latency.
+        on_prediction: Optional callback for every prediction of a simulated device.
+        """
+        self.url = url.rstrip("/")
+        self.ws_url = "ws" + self.url[len("http"):]
+        self.profile = list(profile)
+        self.rate = rate
+        if duration is None and len(self.profile) > 1:
+            duration = self.profile[-1][0]
+        self.duration = duration
+        self.payload = payload
+        self.transport = transport
+        self.batch = batch
+        self.connections = connections
+        self.max_in_flight = max_in_flight
+        self.monitor = monitor
+        self.report_interval = report_interval
+        self.timeout = timeout
+        self.on_prediction = on_prediction
+
+        max_devices = max(devices for _, devices in self.profile)
+        self.simulator = MultiDeviceSimulator(max_devices, subcarriers, rate, seed=seed)
+        self.device_ids = self.simulator.device_ids
+        self._device_index = {device_id: i for i, device_id in enumerate(self.device_ids)}
+        self.interval = LoadStats()
+        self.total = LoadStats()
+        self.in_flight = 0
+        self._wall_offset_ns = time.time_ns() - time.perf_counter_ns()
+
+    def active_devices(self, elapsed):
+        times, devices = zip(*self.profile)
+        return int(round(np.interp(elapsed, times, devices)))
+
+    def _timestamps_ns(self, scheduled):
+        """Packet timestamps of one message, 1/rate apart and ending at the scheduled send time."""
+        last = self._wall_offset_ns + int(scheduled * 1e9)
+        return last - (np.arange(self.batch)[::-1] * (1e9 / self.rate)).astype(np.int64)
+
+    def encode(self, device, csi, timestamps_ns):
+        """One message for a device: csi is its (batch, subcarriers) block. Returns (body, content type)."""
+        device_id = self.device_ids[device]
+        if self.payload == "binary":
+            body = b"".join(encode_frame(row, device_id=device_id, timestamp_ns=ts) for row, ts in zip(csi, timestamps_ns))
+            return body, BINARY_CONTENT_TYPE
+        if self.batch == 1 and self.transport == "http":
+            body = {"device_id": device_id, "csi": csi[0].tolist(), "timestamp_ns": int(timestamps_ns[0])}
+        else:
+            body = {"device_id": device_id, "packets": [
+                {"csi": row.tolist(), "timestamp_ns": int(ts)} for row, ts in zip(csi, timestamps_ns)
+            ]}
+        return json.dumps(body), "application/json"
+
+    async def _post(self, client, path, body, content_type, scheduled):
+        self.in_flight += 1
+        stats = self.interval
+        try:
+            response = await client.post(path, content=body, headers={"content-type": content_type})
+            if response.status_code == 200:
+                stats.ok += 1
+            else:
+                stats.error(f"http_{response.status_code}")
+        except httpx.TimeoutException:
+            stats.error("timeout")
+        except httpx.HTTPError as e:
+            stats.error(type(e).__name__)
+        finally:
+            self.in_flight -= 1
+        # Against the schedule, not the actual send, so time spent queued in the client counts too
+        stats.ingest.record((time.perf_counter() - scheduled) * 1e6)
+
+    async def _send_ws(self, websocket, body, scheduled):
+        stats = self.interval
+        try:
+            await websocket.send(body)
+            stats.ok += 1
+        except websockets.ConnectionClosed:
+            stats.error("ws_closed")
+        stats.ingest.record((time.perf_counter() - scheduled) * 1e6)
+
+    async def _read_ws_errors(self, websocket):
+        """/ws/ingest only answers when a batch is rejected."""
+        try:
+            async for _ in websocket:
+                self.interval.error("rejected")
+        except websockets.ConnectionClosed:
+            pass
+
+    async def _monitor(self, ready):
+        try:
+            async with websockets.connect(f"{self.ws_url}/ws/monitor?topics=predictions", max_size=None) as websocket:
+                ready.set()
+                async for message in websocket:
+                    received_ns = time.time_ns()
+                    data = json.loads(message)
+                    if data.get("device_id") not in self._device_index:
+                        continue
+                    self.interval.predictions += 1
+                    packet_ns = data.get("packet_timestamp_ns")
+                    if packet_ns:
+                        self.interval.broadcast.record((received_ns - packet_ns) / 1000)
+                    if self.on_prediction is not None:
+                        self.on_prediction(data)
+        except (OSError, websockets.WebSocketException) as e:
+            print(f"Monitor error: {e}")
+        finally:
+            ready.set()
+
+    async def _schedule(self, send):
+        """
+        Fixed-rate schedule: every period (batch / rate seconds) each active device sends one
+        message. Devices are spread over the period in ~1 ms slots instead of firing together.
+        """
+        period = self.batch / self.rate
+        start = time.perf_counter()
+        tasks = set()
+        tick = 0
+        while True:
+            tick_start = start + tick * period
+            elapsed = tick_start - start
+            # Ends on wall time too: a generator that cannot keep up stops on time, its lag shows why
+            if self.duration is not None and max(elapsed, time.perf_counter() - start) >= self.duration:
+                break
+            active = self.active_devices(elapsed)
+            csi, _, _ = self.simulator.step(self.batch)
+            slots = max(1, min(active, int(round(period * 1000))))
+            for slot, devices in enumerate(np.array_split(np.arange(active), slots)):
+                scheduled = tick_start + slot * period / slots
+                # Always yields, a generator that fell behind must still let responses and reports run
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+                lag = time.perf_counter() - scheduled
+                timestamps_ns = self._timestamps_ns(scheduled)
+                for device in devices:
+                    self.interval.send_lag.record(max(0.0, lag) * 1e6)
+                    if self.in_flight >= self.max_in_flight:
+                        self.interval.skipped += 1
+                        continue
+                    body, content_type = self.encode(device, csi[device], timestamps_ns)
+                    self.interval.messages += 1
+                    self.interval.packets += self.batch
+                    task = asyncio.create_task(send(device, body, content_type, scheduled))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            tick += 1
+        if tasks:
+            await asyncio.wait(tasks, timeout=self.timeout)
+
+    async def _report(self, started):
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(self.report_interval)
+            now = time.perf_counter()
+            cpu = time.process_time()
+            self._print_interval(now - started, now - last, (cpu - self._last_cpu) / (now - last))
+            self._last_cpu = cpu
+            last = now
+
+    def _print_interval(self, elapsed, seconds, cpu):
+        stats, self.interval = self.interval, LoadStats()
+        self.total.merge(stats)
+        ingest = stats.ingest.summary(scale=1000)
+        broadcast = stats.broadcast.summary(scale=1000)
+        lag = stats.send_lag.summary(scale=1000)
+        print(f"[{elapsed:6.1f}s] devices {self.active_devices(elapsed):5d} | {stats.packets / seconds:9,.0f} pkt/s "
+              f"| ok {stats.ok:6d} err {sum(stats.errors.values()):4d} skip {stats.skipped:4d} "
+              f"| ingest p50/p99 {_ms(ingest, 'p50')}/{_ms(ingest, 'p99')} ms "
+              f"| broadcast p50/p99 {_ms(broadcast, 'p50')}/{_ms(broadcast, 'p99')} ms "
+              f"| lag p99 {_ms(lag, 'p99')} ms | cpu {cpu * 100:3.0f}%")
+
+    async def run(self):
+        """Runs the profile and returns the summary dict of the whole run."""
+        monitor_task = None
+        if self.monitor:
+            ready = asyncio.Event()
+            monitor_task = asyncio.create_task(self._monitor(ready))
+            await ready.wait()
+
+        started = time.perf_counter()
+        self._last_cpu = time.process_time()
+        cpu_start = self._last_cpu
+        reporter = asyncio.create_task(self._report(started))
+        try:
+            if self.transport == "ws":
+                await self._run_ws()
+            else:
+                await self._run_http()
+            # Predictions for the last windows are still on their way
+            if monitor_task is not None:
+                await asyncio.sleep(min(2.0, self.timeout))
+        finally:
+            reporter.cancel()
+            if monitor_task is not None:
+                monitor_task.cancel()
+            seconds = time.perf_counter() - started
+            self.total.merge(self.interval)
+            self.interval = LoadStats()
+
+        summary = self.total.to_dict(seconds)
+        summary["config"] = {
+            "url": self.url, "profile": self.profile, "rate": self.rate, "payload": self.payload,
+            "transport": self.transport, "batch": self.batch, "connections": self.connections,
+            "subcarriers": self.simulator.num_subcarriers,
+        }
+        summary["client_cpu"] = (time.process_time() - cpu_start) / seconds
+        return summary
+
+    async def _run_http(self):
+        limits = httpx.Limits(max_connections=self.connections, max_keepalive_connections=self.connections)
+        path = "/ingest" if self.batch == 1 else "/ingest/batch"
+        async with httpx.AsyncClient(base_url=self.url, limits=limits, timeout=self.timeout) as client:
+            async def send(device, body, content_type, scheduled):
+                await self._post(client, path, body, content_type, scheduled)
+            await self._schedule(send)
+
+    async def _run_ws(self):
+        sockets = [await websockets.connect(f"{self.ws_url}/ws/ingest", max_size=None) for _ in range(self.connections)]
+        readers = [asyncio.create_task(self._read_ws_errors(websocket)) for websocket in sockets]
+        try:
+            async def send(device, body, content_type, scheduled):
+                await self._send_ws(sockets[device % len(sockets)], body, scheduled)
+            await self._schedule(send)
+        finally:
+            for websocket in sockets:
+                await websocket.close()
+            for reader in readers:
+                reader.cancel()
+
+def _ms(summary, key):
+    value = summary.get(key)
+    return "-" if value is None else f"{value:.1f}"
+
+def print_summary(summary):
+    print(f"\n{summary['packets']:,} packets in {summary['seconds']:.1f} s ({summary['packets_per_s']:,.0f} pkt/s), "
+          f"{summary['messages']:,} messages, {summary['ok']:,} ok, errors {summary['errors'] or 0} "
+          f"({summary['error_rate'] * 100:.2f}%), {summary['skipped']:,} skipped, "
+          f"{summary['predictions']:,} predictions, client cpu {summary['client_cpu'] * 100:.0f}%")
+    print(f"{'latency (ms)':<14} {'count':>9} {'mean':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'p99.9':>8} {'max':>8}")
+    for name in ("ingest_ms", "broadcast_ms", "send_lag_ms"):
+        s = summary[name]
+        if not s["count"]:
+            print(f"{name[:-3]:<14} {0:>9}")
+            continue
+        print(f"{name[:-3]:<14} {s['count']:>9} {s['mean']:>8.2f} {s['p50']:>8.2f} {s['p90']:>8.2f} "
+              f"{s['p99']:>8.2f} {s['p99.9']:>8.2f} {s['max']:>8.2f}")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--devices", type=int, default=10, help="Constant device count (ignored with --profile)")
+    parser.add_argument("--profile", default=None, help="Ramp as seconds:devices points, e.g. 0:10,30:1000,60:1000")
+    parser.add_argument("--rate", type=int, default=100, help="Packets per second per device")
+    parser.add_argument("--duration", type=float, default=None, help="Seconds (default: end of --profile, else 30)")
+    parser.add_argument("--subcarriers", type=int, default=1026)
+    parser.add_argument("--payload", choices=["json", "binary"], default="json")
+    parser.add_argument("--transport", choices=["http", "ws"], default="http")
+    parser.add_argument("--batch", type=int, default=1, help="Packets per message per device")
+    parser.add_argument("--connections", type=int, default=16, help="HTTP pool size or /ws/ingest connections")
+    parser.add_argument("--max-in-flight", type=int, default=10000)
+    parser.add_argument("--no-monitor", action="store_true", help="Skip the /ws/monitor broadcast latency")
+    parser.add_argument("--report-interval", type=float, default=1.0)
+    parser.add_argument("--json", default=None, help="Write the run summary to this file")
+    return parser
+
+def main():
+    args = build_parser().parse_args()
+    profile = parse_profile(args.profile) if args.profile else [(0.0, args.devices)]
+    duration = args.duration if args.duration is not None or args.profile else 30.0
+    generator = LoadGenerator(
+        url=args.url, profile=profile, rate=args.rate, duration=duration, subcarriers=args.subcarriers,
+        payload=args.payload, transport=args.transport, batch=args.batch, connections=args.connections,
+        max_in_flight=args.max_in_flight, monitor=not args.no_monitor, report_interval=args.report_interval,
+    )
+    try:
+        summary = asyncio.run(generator.run())
+    except KeyboardInterrupt:
+        print("Load generator stopped.")
+        return
+    print_summary(summary)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -1,60 +1,35 @@
+"""
+ESP32 stand-in: one simulated device sending 100 packets per second to /ingest and printing the
+predictions it gets back on /ws/monitor. A thin wrapper around scripts/load_generator.py, which
+takes the same options (more devices, binary payloads, ramps, latency percentiles).
+
+Run from the project root:
+    python -m scripts.simulator
+"""
 import asyncio
-import websockets
-import requests
-import json
-import numpy as np
-import time
 from datetime import datetime
+from scripts.load_generator import LoadGenerator, build_parser, parse_profile, print_summary
 
-BACKEND_URL = "http://localhost:8000"
-WS_URL = "ws://localhost:8000/ws/monitor"
-
-async def monitor_websocket():
-    try:
-        async with websockets.connect(WS_URL) as websocket:
-            print(f"[{datetime.now()}] Connected to WebSocket")
-            while True:
-                message = await websocket.recv()
-                data = json.loads(message)
-                print(f"[{data['timestamp']}] Prediction: {data['prediction']} | Confidence: {data['confidence']:.2f} | Mag: {data['magnitude']:.4f} | Emergency: {data['is_emergency']}")
-    except Exception as e:
-        print(f"WebSocket Error: {e}")
-
-async def simulate_esp32():
-    print(f"[{datetime.now()}] Starting ESP32 Simulation")
-    # Wait a bit for WS to connect
-    await asyncio.sleep(2)
-    
-    # Simulate 50 packets per second
-    while True:
-        # Generate mock CSI matrix matching the trained model (1026 features)
-        # Random data to simulate real sensor input
-        csi_matrix = np.random.normal(0, 1, (1026,))
-        
-        payload = {
-            "csi": csi_matrix.tolist()
-        }
-        
-        try:
-            # Send to ingest endpoint
-            response = requests.post(f"{BACKEND_URL}/ingest", json={"csi": csi_matrix.tolist()})
-            if response.status_code != 200:
-                print(f"Ingest Error: {response.text}")
-        except Exception as e:
-            print(f"Request Error: {e}")
-        
-        # Simulate 100 packets per second (10ms delay)
-        await asyncio.sleep(0.01) 
+def print_prediction(data):
+    print(f"[{data['timestamp']}] {data['device_id']} Prediction: {data['prediction']} | Confidence: {data['confidence']:.2f} "
+          f"| Mag: {data['magnitude']:.4f} | Emergency: {data['is_emergency']}")
 
-async def main():
-    # Run both simulator and monitor
-    await asyncio.gather(
-        monitor_websocket(),
-        simulate_esp32()
+def main():
+    parser = build_parser()
+    parser.set_defaults(devices=1, report_interval=10.0)
+    args = parser.parse_args()
+    profile = parse_profile(args.profile) if args.profile else [(0.0, args.devices)]
+    generator = LoadGenerator(
+        url=args.url, profile=profile, rate=args.rate, duration=args.duration, subcarriers=args.subcarriers,
+        payload=args.payload, transport=args.transport, batch=args.batch, connections=args.connections,
+        max_in_flight=args.max_in_flight, monitor=not args.no_monitor, report_interval=args.report_interval,
+        on_prediction=print_prediction,
     )
-
-if __name__ == "__main__":
+    print(f"[{datetime.now()}] Starting ESP32 Simulation")
     try:
-        asyncio.run(main())
+        print_summary(asyncio.run(generator.run()))
     except KeyboardInterrupt:
         print("Simulator stopped.")
+
+if __name__ == "__main__":
+    main()
@@ -1,70 +1,223 @@
-import pandas as pd
+"""
+Trains the RandomForest on the same input the server scores: sliding windows of packets reduced with
+the shared feature function (app/core/features.py, the window mean), one window every hop packets.
+
+Candidate forest sizes (and optionally window sizes) are fitted in parallel worker processes and
+evaluated on a time-blocked holdout (overlapping windows never straddle train and test). The winner is
+the candidate with the best accuracy per millisecond of single-window inference latency among those
+within --tolerance of the best balanced accuracy. It is refitted on all windows and saved together with
+model.meta.json (feature spec, window size, hop, sampling rate, scores), which ModelManager reads.
+
+Run from the project root:
+    python -m scripts.train_model
+    python -m scripts.train_model --trees 25,50,100,200 --depths none,12,20 --windows 100,200 --workers 8
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import joblib
 import numpy as np
-from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import classification_report, accuracy_score
-import joblib
-import os
+from sklearn.metrics import accuracy_score, balanced_accuracy_score, classification_report
+from app.core.features import WINDOW_MEAN, feature_function, sliding_windows, window_starts
+from app.core.forest_engine import FlatForest
+from app.core.model_manager import metadata_path
+from scripts.dataset_cache import load_dataset
 
 # Paths
 DATA_PATH = "data/dataset/data.csv"
 LABEL_PATH = "data/dataset/label.csv"
 MODEL_PATH = "app/models/model.pkl"
 
-def train():
-    print("Loading data...")
-    # Load data (no header in data.csv based on peak)
-    X = pd.read_csv(DATA_PATH, header=None)
-    # Load labels
-    y_raw = pd.read_csv(LABEL_PATH, header=None, names=["Index", "Label"])
-    y = y_raw["Label"]
+# Map labels to user requirements: Düşme, Hareketsizlik, Normal
+LABEL_MAPPING = {
+    "get_down": "Düşme",
+    "sitting": "Hareketsizlik",
+    "lying": "Hareketsizlik",
+    "standing": "Hareketsizlik",
+    "no_person": "Hareketsizlik",
+    "walking": "Normal",
+    "get_up": "Normal",
+}
+
+def build_windows(X, labels, window, hop, feature=WINDOW_MEAN, chunk_windows=256):
+    """
+    Returns (features, window_labels, starts). Each window is labelled with its majority class,
+    counted with a cumulative one-hot sum instead of a loop over windows.
+    """
+    starts = window_starts(len(X), window, hop)
+    reduce = feature_function(feature)
+    features = np.empty((len(starts), X.shape[1]), dtype=np.float64)
+    # Chunked so only chunk_windows windows of the memmap are paged in at a time
+    for first in range(0, len(starts), chunk_windows):
+        rows = X[starts[first]:starts[min(first + chunk_windows, len(starts)) - 1] + window]
+        features[first:first + chunk_windows] = reduce(sliding_windows(rows, window, hop))
+
+    classes, codes = np.unique(labels, return_inverse=True)
+    counts = np.zeros((len(labels) + 1, len(classes)), dtype=np.int32)
+    np.add.at(counts, (np.arange(1, len(labels) + 1), codes), 1)
+    counts = np.cumsum(counts, axis=0)
+    per_window = counts[starts + window] - counts[starts]
+    return features, classes[np.argmax(per_window, axis=1)], starts
 
-    # Align X and y in case of mismatch
-    min_rows = min(len(X), len(y))
-    X = X.iloc[:min_rows]
-    y = y.iloc[:min_rows]
+def blocked_split(starts, window, block_rows, test_every=5):
+    """
+    Every test_every-th block of block_rows rows is held out; training windows overlapping any test
+    window are dropped so no packet is seen in both sets.
+    """
+    if len(starts) == 0:
+        raise ValueError("No windows to split")
+    test = (starts // block_rows) % test_every == 0
+    covered = np.zeros(starts[-1] + window + 1, dtype=np.int32)
+    np.add.at(covered, starts[test], 1)
+    np.add.at(covered, starts[test] + window, -1)
+    covered = np.cumsum(covered) > 0
+    prefix = np.concatenate(([0], np.cumsum(covered)))
+    overlaps = (prefix[starts + window] - prefix[starts]) > 0
+    return np.flatnonzero(~test & ~overlaps), np.flatnonzero(test)
+
+def measure_latency(model, n_features, engine, repeats=200):
+    """Median single-window predict_proba time in ms, the way the server calls it."""
+    model.n_jobs = 1
+    predict_proba = FlatForest.from_sklearn(model).predict_proba if engine == "flat" else model.predict_proba
+    row = np.random.default_rng(0).normal(size=(1, n_features))
+    for _ in range(10):
+        predict_proba(row)
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        predict_proba(row)
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.median(samples))
+
+def fit_candidate(task):
+    """Worker process: fits one configuration on the memory-mapped window features."""
+    window, features_path, labels_path, train_idx, test_idx, params = task
+    features = np.load(features_path, mmap_mode="r")
+    labels = np.load(labels_path)
+    model = RandomForestClassifier(random_state=42, n_jobs=1, **params)
+    start = time.perf_counter()
+    model.fit(features[train_idx], labels[train_idx])
+    fit_seconds = time.perf_counter() - start
+    predicted = model.predict(features[test_idx])
+    return {
+        "window_size": window,
+        "params": params,
+        "balanced_accuracy": float(balanced_accuracy_score(labels[test_idx], predicted)),
+        "accuracy": float(accuracy_score(labels[test_idx], predicted)),
+        "fit_seconds": round(fit_seconds, 2),
+        "model": model,
+    }
 
+def parse_list(value, cast):
+    return [None if item.strip().lower() == "none" else cast(item) for item in value.split(",") if item.strip()]
+
+def train(args):
+    print("Loading data...")
+    # float32 memmap of data.csv with aligned labels; the CSV is only parsed on the first run
+    X, y_raw = load_dataset(args.data, args.labels)
+    y = np.array([LABEL_MAPPING.get(label, label) for label in y_raw])
     print(f"Data shape after alignment: {X.shape}")
 
-    # 1. Map labels to user requirements: Düşme, Hareketsizlik, Normal
-    # Mapping logic:
-    # get_down -> Düşme
-    # sitting, lying, standing, no_person -> Hareketsizlik
-    # walking, get_up -> Normal
-    
-    mapping = {
-        "get_down": "Düşme",
-        "sitting": "Hareketsizlik",
-        "lying": "Hareketsizlik",
-        "standing": "Hareketsizlik",
-        "no_person": "Hareketsizlik",
-        "walking": "Normal",
-        "get_up": "Normal"
+    windows = parse_list(args.windows, int)
+    grid = [{"n_estimators": trees, "max_depth": depth} for trees in parse_list(args.trees, int) for depth in parse_list(args.depths, int)]
+    tasks, datasets = [], {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for window in windows:
+            features, labels, starts = build_windows(X, y, window, args.hop)
+            if len(starts) == 0:
+                raise SystemExit(f"The recording has {len(X)} packets, fewer than one {window}-packet window "
+                                 f"({window / args.sampling_rate:g} s at --sampling-rate {args.sampling_rate}); "
+                                 f"pass smaller --windows or a longer recording")
+            train_idx, test_idx = blocked_split(starts, window, block_rows=args.block_seconds * args.sampling_rate)
+            if len(train_idx) == 0 or len(test_idx) == 0:
+                raise SystemExit(f"window {window}: {len(train_idx)} train / {len(test_idx)} test windows, the recording "
+                                 f"is too short for --block-seconds {args.block_seconds} holdout blocks "
+                                 f"at --sampling-rate {args.sampling_rate}")
+            print(f"window {window}: {len(features)} windows, {len(train_idx)} train / {len(test_idx)} test, "
+                  f"classes {dict((str(c), int(n)) for c, n in zip(*np.unique(labels, return_counts=True)))}")
+            features_path = os.path.join(workdir, f"features_{window}.npy")
+            labels_path = os.path.join(workdir, f"labels_{window}.npy")
+            np.save(features_path, features)
+            np.save(labels_path, labels)
+            datasets[window] = (features, labels, test_idx)
+            for params in grid:
+                tasks.append((window, features_path, labels_path, train_idx, test_idx, params))
+
+        print(f"Fitting {len(tasks)} candidates on {args.workers} worker processes...")
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(fit_candidate, tasks))
+
+    # Latency measured one candidate at a time in this process, so fits running in parallel do not skew it
+    for result in results:
+        result["latency_ms"] = measure_latency(result["model"], X.shape[1], args.engine)
+        result["accuracy_per_ms"] = result["balanced_accuracy"] / result["latency_ms"]
+
+    best_score = max(r["balanced_accuracy"] for r in results)
+    eligible = [r for r in results if r["balanced_accuracy"] >= best_score - args.tolerance]
+    chosen = max(eligible, key=lambda r: r["accuracy_per_ms"])
+
+    print(f"{'window':>6} {'trees':>5} {'depth':>5} {'bal_acc':>8} {'acc':>6} {'latency':>9} {'acc/ms':>8}")
+    for r in sorted(results, key=lambda r: -r["accuracy_per_ms"]):
+        marker = " <- chosen" if r is chosen else (" " if r in eligible else " (below tolerance)")
+        print(f"{r['window_size']:>6} {r['params']['n_estimators']:>5} {str(r['params']['max_depth']):>5} "
+              f"{r['balanced_accuracy']:>8.3f} {r['accuracy']:>6.3f} {r['latency_ms']:>7.3f}ms {r['accuracy_per_ms']:>8.2f}{marker}")
+
+    features, labels, test_idx = datasets[chosen["window_size"]]
+    print("Holdout classification report (chosen candidate):")
+    print(classification_report(labels[test_idx], chosen["model"].predict(features[test_idx]), zero_division=0))
+
+    # Refit the chosen configuration on every window for the deployed model
+    print("Refitting on all windows...")
+    model = RandomForestClassifier(random_state=42, n_jobs=-1, **chosen["params"])
+    model.fit(features, labels)
+    model.n_jobs = 1
+
+    meta = {
+        "feature": WINDOW_MEAN,
+        "window_size": chosen["window_size"],
+        "hop": args.hop,
+        "sampling_rate": args.sampling_rate,
+        "n_features": int(X.shape[1]),
+        "classes": [str(c) for c in model.classes_],
+        "label_mapping": LABEL_MAPPING,
+        "params": chosen["params"],
+        "holdout": {
+            "balanced_accuracy": chosen["balanced_accuracy"],
+            "accuracy": chosen["accuracy"],
+            "latency_ms": chosen["latency_ms"],
+            "engine": args.engine,
+        },
+        "windows": len(features),
+        "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
     }
-    
-    y_mapped = y.map(mapping)
-    
-    print(f"Mapped Labels distribution:\n{y_mapped.value_counts()}")
-
-    # 2. Split data
-    X_train, X_test, y_train, y_test = train_test_split(X, y_mapped, test_size=0.2, random_state=42)
-
-    # 3. Train Model
-    print("Training Random Forest model...")
-    model = RandomForestClassifier(n_estimators=100, random_state=42, n_jobs=-1)
-    model.fit(X_train, y_train)
-
-    # 4. Evaluate
-    y_pred = model.predict(X_test)
-    print(f"Accuracy: {accuracy_score(y_test, y_pred)}")
-    print("Classification Report:")
-    print(classification_report(y_test, y_pred))
-
-    # 5. Save Model
-    print(f"Saving model to {MODEL_PATH}...")
-    os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
-    joblib.dump(model, MODEL_PATH)
+
+    print(f"Saving model to {args.out}...")
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    # Metadata first: a watcher reloading on the .pkl change must already see the matching spec
+    with open(metadata_path(args.out), "w") as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+    joblib.dump(model, args.out)
     print("Training complete.")
 
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--labels", default=LABEL_PATH)
+    parser.add_argument("--out", default=MODEL_PATH, help="Model path, model.meta.json is written next to it")
+    parser.add_argument("--sampling-rate", type=int, default=100, help="Packets per second of the recording")
+    parser.add_argument("--windows", default="200", help="Window sizes in packets to try (the server default is 2 s = 200)")
+    parser.add_argument("--hop", type=int, default=int(os.getenv("CSI_INFERENCE_HOP", "25")))
+    parser.add_argument("--trees", default="25,50,100,200")
+    parser.add_argument("--depths", default="none,12,20")
+    parser.add_argument("--tolerance", type=float, default=0.01, help="Accepted balanced-accuracy loss for a faster model")
+    parser.add_argument("--block-seconds", type=int, default=10, help="Holdout block length")
+    parser.add_argument("--engine", default=os.getenv("CSI_INFERENCE_ENGINE", "sklearn"), choices=["sklearn", "flat"])
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    train(parser.parse_args())
+
 if __name__ == "__main__":
-    train()
+    main()
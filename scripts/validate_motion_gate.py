@@ -0,0 +1,116 @@
+"""
+Replays a labelled CSI recording through MotionGate the way the backend sees it (one packet per
+row, windows due every CSI_INFERENCE_HOP packets) and reports how many windows would reach the
+classifier, per label, and whether every fall (get_down episode) still gets scored.
+
+Run from the project root:
+    python -m scripts.validate_motion_gate --data data/dataset/data.csv --labels data/dataset/label.csv
+    python -m scripts.validate_motion_gate --synthetic   # no dataset: idle room, walking and falls
+"""
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from app.core.device_registry import DeviceState
+from app.core.motion_gate import MotionGate
+from app.core.csi_processor import SignalProcessor
+
+FALL_LABEL = "get_down"
+
+def load_recording(data_path, label_path):
+    data = pd.read_csv(data_path, header=None).to_numpy(dtype=np.float32)
+    labels = pd.read_csv(label_path, header=None, names=["Index", "Label"])["Label"].to_numpy()
+    rows = min(len(data), len(labels))
+    return data[:rows], labels[:rows]
+
+def synthetic_recording(rate, minutes, n_features=64, seed=0):
+    """Mostly an empty room, some walking, and falls followed by lying still."""
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(5, 15, n_features)
+    segments = []
+    while sum(len(labels) for _, labels in segments) < minutes * 60 * rate:
+        kind = rng.choice(["no_person", "walking", "fall"], p=[0.6, 0.25, 0.15])
+        if kind == "no_person":
+            n = int(rng.uniform(30, 120) * rate)
+            segments.append((base + rng.normal(0, 0.05, (n, n_features)), np.full(n, "no_person", dtype=object)))
+        elif kind == "walking":
+            n = int(rng.uniform(5, 20) * rate)
+            t = np.arange(n) / rate
+            sway = 1.5 * np.sin(2 * np.pi * 1.2 * t)[:, None] * rng.uniform(0.5, 1.5, n_features)
+            segments.append((base + sway + rng.normal(0, 0.4, (n, n_features)), np.full(n, "walking", dtype=object)))
+        else:
+            n_fall, n_lying = int(1.0 * rate), int(rng.uniform(5, 15) * rate)
+            drop = np.linspace(0, 1, n_fall)[:, None] * rng.uniform(-3, 3, n_features)
+            fall = base + drop + rng.normal(0, 0.8, (n_fall, n_features))
+            lying = base + drop[-1] + rng.normal(0, 0.05, (n_lying, n_features))
+            labels = np.array([FALL_LABEL] * n_fall + ["lying"] * n_lying, dtype=object)
+            segments.append((np.vstack([fall, lying]), labels))
+    data = np.vstack([s[0] for s in segments]).astype(np.float32)
+    labels = np.concatenate([s[1] for s in segments])
+    return data, labels
+
+def replay(data, labels, rate, hop, window_seconds, gate):
+    device = DeviceState("replay", window_size_seconds=window_seconds, sampling_rate=rate)
+    window = device.buffer.max_len
+    magnitudes = SignalProcessor.calculate_magnitudes(data)
+    timestamps = (np.arange(len(data)) * (1e9 / rate)).astype(np.int64)
+    decisions = []  # (last row of the window, scored)
+    start = time.perf_counter()
+    for end in range(hop, len(data) + 1, hop):
+        gate.update(device, magnitudes[end - hop:end], timestamps[end - hop:end])
+        if end >= window:
+            decisions.append((end - 1, gate.should_score(device)))
+    elapsed = time.perf_counter() - start
+    return decisions, elapsed
+
+def fall_episodes(labels):
+    is_fall = np.concatenate(([False], labels == FALL_LABEL, [False]))
+    edges = np.flatnonzero(np.diff(is_fall.astype(np.int8)))
+    return list(zip(edges[::2], edges[1::2] - 1))
+
+def report(labels, decisions, window, elapsed, gate):
+    rows = np.array([row for row, _ in decisions])
+    scored = np.array([s for _, s in decisions])
+    print(f"windows: {len(decisions)}  scored: {scored.sum()}  gated: {(~scored).sum()}  "
+          f"classifier calls cut {len(decisions) / max(1, scored.sum()):.1f}x  "
+          f"(gate cost {elapsed * 1e6 / max(1, len(decisions)):.1f} us per window)")
+    window_labels = labels[rows]
+    for label in sorted(set(window_labels)):
+        mask = window_labels == label
+        print(f"  {label:>10}: {mask.sum():6d} windows, {scored[mask].mean() * 100:5.1f}% scored")
+
+    # A fall counts as caught when a window containing part of it was scored
+    episodes = fall_episodes(labels)
+    caught = 0
+    for first, last in episodes:
+        covering = (rows >= first) & (rows - window + 1 <= last)
+        caught += bool(scored[covering].any())
+    print(f"falls: {len(episodes)} episodes, {caught} scored at least once, {len(episodes) - caught} missed")
+    print(f"gate stats: {gate.snapshot()}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default="data/dataset/data.csv")
+    parser.add_argument("--labels", default="data/dataset/label.csv")
+    parser.add_argument("--synthetic", action="store_true", help="Generate a recording instead of reading --data")
+    parser.add_argument("--minutes", type=float, default=60, help="Length of the synthetic recording")
+    parser.add_argument("--rate", type=int, default=100, help="Packets per second of the recording")
+    parser.add_argument("--hop", type=int, default=int(os.getenv("CSI_INFERENCE_HOP", "25")))
+    parser.add_argument("--window-seconds", type=float, default=2)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        data, labels = synthetic_recording(args.rate, args.minutes)
+    else:
+        if not os.path.exists(args.data):
+            parser.error(f"{args.data} not found (use --synthetic to run without the dataset)")
+        data, labels = load_recording(args.data, args.labels)
+    print(f"recording: {len(data)} packets x {data.shape[1]} features at {args.rate} Hz")
+
+    gate = MotionGate(sampling_rate=args.rate)
+    decisions, elapsed = replay(data, labels, args.rate, args.hop, args.window_seconds, gate)
+    report(labels, decisions, int(args.window_seconds * args.rate), elapsed, gate)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from app.core.csi_codec import HEADER, decode_frame, decode_frames, encode_frame, group_packets
+
+def test_float32_round_trip():
+    csi = np.random.default_rng(0).normal(40, 3, 1026).astype(np.float32)
+    body = encode_frame(csi, device_id="esp32-ğ", seq=7, timestamp_ns=123456789)
+    packet, end = decode_frame(body)
+    assert end == len(body)
+    assert packet["device_id"] == "esp32-ğ"
+    assert packet["seq"] == 7
+    assert packet["timestamp_ns"] == 123456789
+    np.testing.assert_array_equal(packet["csi"], csi)
+
+def test_int16_matrix_round_trip():
+    csi = np.arange(-6, 6, dtype=np.int16).reshape(4, 3)
+    packet, _ = decode_frame(encode_frame(csi, dtype="int16"))
+    assert packet["csi"].dtype == np.int16
+    np.testing.assert_array_equal(packet["csi"], csi)
+    # Empty id and zero timestamp mean "not sent"
+    assert packet["device_id"] is None
+    assert packet["timestamp_ns"] is None
+
+def test_concatenated_frames():
+    frames = [encode_frame(np.full(4, i, dtype=np.float32), device_id=f"d{i % 2}", timestamp_ns=i + 1) for i in range(3)]
+    packets = decode_frames(b"".join(frames))
+    assert [p["device_id"] for p in packets] == ["d0", "d1", "d0"]
+    grouped = group_packets(packets, "default")
+    block, timestamps = grouped["d0"]
+    np.testing.assert_array_equal(block[:, 0], [0, 2])
+    assert timestamps == [1, 3]
+
+def test_group_packets_without_timestamps_uses_server_time():
+    grouped = group_packets([{"csi": [1.0, 2.0]}, {"csi": [3.0, 4.0], "timestamp_ns": 5}], "default")
+    block, timestamps = grouped["default"]
+    assert block.shape == (2, 2)
+    assert timestamps is None
+
+@pytest.mark.parametrize("cut", [1, HEADER.size - 1, HEADER.size + 2, -1])
+def test_truncated_frames_are_rejected(cut):
+    body = encode_frame(np.ones(8, dtype=np.float32), device_id="abc")
+    with pytest.raises(ValueError):
+        decode_frame(body[:cut])
+
+def test_truncated_trailing_frame_is_rejected():
+    body = encode_frame(np.ones(8, dtype=np.float32)) * 2
+    with pytest.raises(ValueError):
+        decode_frames(body[:-3])
+
+@pytest.mark.parametrize("offset, value", [(0, b"XX"), (2, b"\x09"), (3, b"\x07")])
+def test_bad_header_fields_are_rejected(offset, value):
+    body = bytearray(encode_frame(np.ones(2, dtype=np.float32)))
+    body[offset:offset + len(value)] = value
+    with pytest.raises(ValueError):
+        decode_frame(bytes(body))
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+from app.core.csi_processor import CSIBuffer, RollingFeatures
+from app.core.features import window_mean
+
+def make_buffer(max_len=20, n_features=8):
+    return CSIBuffer(window_size_seconds=1, sampling_rate=max_len, n_features=n_features, features=RollingFeatures())
+
+def test_rolling_mean_matches_window():
+    buffer = make_buffer()
+    rng = np.random.default_rng(0)
+    for _ in range(75):
+        buffer.append(rng.normal(40, 3, 8))
+    np.testing.assert_allclose(buffer.feature_vector(), window_mean(buffer.window_view()), rtol=1e-6)
+
+def test_variance_is_only_tracked_on_request():
+    untracked = make_buffer()
+    untracked.append(np.ones(8))
+    assert untracked.features._sumsq is None and untracked.features.var() is None
+
+    buffer = CSIBuffer(window_size_seconds=1, sampling_rate=20, n_features=8, features=RollingFeatures(track_variance=True))
+    rng = np.random.default_rng(3)
+    for _ in range(45):
+        buffer.append(rng.normal(40, 3, 8))
+    np.testing.assert_allclose(buffer.features.var(), np.var(buffer.window_view(), axis=0, dtype=np.float64), rtol=1e-4)
+
+def test_non_finite_packet_recovers_after_one_window():
+    buffer = make_buffer()
+    rng = np.random.default_rng(1)
+    for _ in range(30):
+        buffer.append(rng.normal(40, 3, 8))
+    bad = rng.normal(40, 3, 8)
+    bad[2], bad[5] = np.nan, np.inf
+    buffer.append(bad)
+    assert not np.isfinite(buffer.feature_vector()).all()
+
+    for _ in range(buffer.max_len):
+        buffer.append(rng.normal(40, 3, 8))
+    mean = buffer.feature_vector()
+    assert np.isfinite(mean).all()
+    np.testing.assert_allclose(mean, window_mean(buffer.window_view()), rtol=1e-6)
+
+def test_non_finite_block_recovers_after_one_window():
+    buffer = make_buffer()
+    rng = np.random.default_rng(2)
+    buffer.extend(rng.normal(40, 3, (25, 8)))
+    block = rng.normal(40, 3, (5, 8))
+    block[0, 0] = np.inf
+    buffer.extend(block)
+    for _ in range(buffer.max_len // 5):
+        buffer.extend(rng.normal(40, 3, (5, 8)))
+    np.testing.assert_allclose(buffer.feature_vector(), window_mean(buffer.window_view()), rtol=1e-6)
+
+def test_ring_keeps_the_newest_packets_in_order():
+    buffer = CSIBuffer(window_size_seconds=1, sampling_rate=4, n_features=2)
+    assert buffer.window_view() is None
+    for i in range(6):
+        buffer.append(np.array([i, -i]), timestamp_ns=i)
+    assert buffer.is_full() and len(buffer) == 4
+    np.testing.assert_array_equal(buffer.window_view(ordered=True)[:, 0], [2, 3, 4, 5])
+    # Magnitudes are stored, not the raw (signed) values
+    np.testing.assert_array_equal(buffer.window_view(ordered=True)[:, 1], [2, 3, 4, 5])
+    np.testing.assert_array_equal(buffer.timestamps(), [2, 3, 4, 5])
+    assert buffer.last_timestamp() == 5
+
+def test_extend_matches_appending_one_by_one():
+    rng = np.random.default_rng(4)
+    rows = rng.normal(40, 3, (23, 8))
+    appended, extended = make_buffer(), make_buffer()
+    for row in rows:
+        appended.append(row, timestamp_ns=1)
+    for start in range(0, len(rows), 7):
+        extended.extend(rows[start:start + 7], timestamps_ns=1)
+    np.testing.assert_array_equal(appended.window_view(), extended.window_view())
+    np.testing.assert_allclose(appended.feature_vector(), extended.feature_vector(), rtol=1e-12)
+
+def test_extend_larger_than_the_window_keeps_the_tail():
+    buffer = make_buffer(max_len=5, n_features=1)
+    buffer.extend(np.arange(12).reshape(12, 1))
+    np.testing.assert_array_equal(buffer.window_view().ravel(), [7, 8, 9, 10, 11])
+    np.testing.assert_allclose(buffer.feature_vector(), [9.0])
+
+def test_wrong_packet_size_is_rejected():
+    buffer = make_buffer()
+    with pytest.raises(ValueError):
+        buffer.append(np.ones(3))
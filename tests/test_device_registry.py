@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+from app.core.device_registry import DeviceRegistry
+
+def test_devices_are_kept_in_last_seen_order_and_capped():
+    registry = DeviceRegistry(max_devices=2, idle_timeout=60)
+    registry.get("a", now=0)
+    registry.get("b", now=1)
+    registry.get("a", now=2)
+    registry.get("c", now=3)
+    assert list(registry.devices) == ["a", "c"]
+    assert registry.evicted == 1
+
+def test_idle_devices_are_evicted():
+    registry = DeviceRegistry(idle_timeout=10)
+    registry.get("a", now=0)
+    registry.get("b", now=8)
+    assert registry.evict_idle(now=12) == 1
+    assert "a" not in registry and "b" in registry
+
+def test_malformed_first_packet_does_not_fix_the_width():
+    registry = DeviceRegistry(window_size_seconds=1, sampling_rate=10, n_features=1026)
+    buffer = registry.get("a").buffer
+    with pytest.raises(ValueError):
+        buffer.append(np.array([1.0, 2.0, 3.0]))
+    assert len(buffer) == 0
+
+    buffer.append(np.ones(1026))
+    buffer.extend(np.ones((5, 1026)))
+    assert len(buffer) == 6
+    with pytest.raises(ValueError):
+        buffer.extend(np.ones((2, 3)))
@@ -0,0 +1,41 @@
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from app.core.forest_engine import FlatForest
+
+def fit_forest(X, y):
+    return RandomForestClassifier(n_estimators=20, max_depth=6, random_state=0).fit(X, y)
+
+def make_data(rows=400, features=12, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(40, 3, (rows, features)).astype(np.float32)
+    y = (X[:, 0] + X[:, 3] > 80).astype(int) + (X[:, 5] > 42)
+    return X, y
+
+def test_predict_proba_matches_sklearn():
+    X, y = make_data()
+    model = fit_forest(X, y)
+    flat = FlatForest.from_sklearn(model)
+    np.testing.assert_allclose(flat.predict_proba(X), model.predict_proba(X), rtol=1e-12, atol=1e-15)
+    np.testing.assert_array_equal(flat.predict(X), model.predict(X))
+
+def test_nan_rows_follow_missing_go_to_left():
+    X, y = make_data()
+    rng = np.random.default_rng(1)
+    # Trained with missing values, so the trees learn a NaN direction per split
+    X_train = X.copy()
+    X_train[rng.random(X.shape) < 0.2] = np.nan
+    model = fit_forest(X_train, y)
+    flat = FlatForest.from_sklearn(model)
+    assert flat.missing_left.any()
+
+    X_test, _ = make_data(rows=100, seed=2)
+    X_test[rng.random(X_test.shape) < 0.3] = np.nan
+    np.testing.assert_allclose(flat.predict_proba(X_test), model.predict_proba(X_test), rtol=1e-12, atol=1e-15)
+
+def test_nan_rows_on_forest_trained_without_missing_values():
+    X, y = make_data()
+    model = fit_forest(X, y)
+    flat = FlatForest.from_sklearn(model)
+    X_test = X[:50].copy()
+    X_test[::3, [0, 3, 5]] = np.nan
+    np.testing.assert_allclose(flat.predict_proba(X_test), model.predict_proba(X_test), rtol=1e-12, atol=1e-15)
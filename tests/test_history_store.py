@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+from app.core.history_store import HistoryStore
+
+@pytest.fixture
+def store(tmp_path):
+    return HistoryStore(path=str(tmp_path / "history.sqlite3"), flush_interval_ms=1)
+
+async def all_pages(store, limit, **filters):
+    pages, cursor = [], None
+    while True:
+        entries, cursor = await store.query(limit=limit, cursor=cursor, **filters)
+        pages.append([entry["id"] for entry in entries])
+        if cursor is None:
+            return pages
+
+def test_cursor_pages_are_newest_first_without_gaps(store):
+    async def run():
+        # Equal timestamps are ordered by id, so a page boundary inside a tie loses nothing
+        for i, ts in enumerate([100.0, 101.0, 101.0, 101.0, 102.0, 103.5, 103.5]):
+            store.add("Düşme", "KRİTİK", ts=ts, device_id=f"d{i % 2}")
+        pages = await all_pages(store, limit=3)
+        await store.stop()
+        return pages
+
+    assert asyncio.run(run()) == [[7, 6, 5], [4, 3, 2], [1]]
+
+def test_filters_and_time_range(store):
+    async def run():
+        for i in range(10):
+            store.add("Düşme" if i % 3 else "Hareketsizlik", "KRİTİK" if i % 3 else "UYARI",
+                      ts=1000.0 + i, device_id=f"d{i % 2}", user="ayse" if i < 5 else "mehmet")
+        device = await all_pages(store, limit=2, device_id="d1")
+        risk, _ = await store.query(risk="UYARI")
+        window, _ = await store.query(since=1003.0, until=1006.0, user="ayse")
+        await store.stop()
+        return device, [e["id"] for e in risk], [e["id"] for e in window]
+
+    device, risk, window = asyncio.run(run())
+    assert device == [[10, 8], [6, 4], [2]]
+    assert risk == [10, 7, 4, 1]
+    assert window == [5, 4]
+
+def test_blob_id_is_attached_after_the_insert_it_follows(store):
+    async def run():
+        store.add("Düşme", "KRİTİK", event_id=41)
+        store.set_blob_id([41], "blobA")
+        entries, _ = await store.query()
+        await store.stop()
+        return entries
+
+    (entry,) = asyncio.run(run())
+    assert entry["blobId"] == "blobA" and entry["eventId"] == 41
+
+def test_events_persist_across_reopen(tmp_path):
+    path = str(tmp_path / "history.sqlite3")
+
+    async def run():
+        first = HistoryStore(path=path)
+        first.start()
+        first.add("Düşme", "KRİTİK", ts=5.0)
+        await first.stop()
+        second = HistoryStore(path=path)
+        count = await second.count()
+        await second.stop()
+        return count
+
+    assert asyncio.run(run()) == 1
+
+def test_invalid_cursor_is_rejected(store):
+    async def run():
+        with pytest.raises(ValueError):
+            await store.query(cursor="not-a-cursor")
+        await store.stop()
+
+    asyncio.run(run())
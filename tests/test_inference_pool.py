@@ -0,0 +1,72 @@
+import asyncio
+import time
+import numpy as np
+import pytest
+from app.core.inference_pool import BatchingPredictor
+
+def row_sums(X):
+    return list(X.sum(axis=1))
+
+def test_concurrent_requests_share_a_batch():
+    async def run():
+        predictor = BatchingPredictor(row_sums, max_batch_size=8, max_wait_ms=20, workers=1)
+        results = await asyncio.gather(*(predictor.submit(np.full(3, i, dtype=float)) for i in range(5)))
+        await predictor.aclose()
+        return predictor, results
+
+    predictor, results = asyncio.run(run())
+    assert results == [0.0, 3.0, 6.0, 9.0, 12.0]
+    assert predictor.stats["batches"] == 1
+    assert predictor.stats["max_batch"] == 5
+
+def test_batch_size_is_capped():
+    async def run():
+        predictor = BatchingPredictor(row_sums, max_batch_size=2, max_wait_ms=20, workers=2)
+        await asyncio.gather(*(predictor.submit(np.ones(3)) for _ in range(5)))
+        await predictor.aclose()
+        return predictor
+
+    predictor = asyncio.run(run())
+    assert predictor.stats["max_batch"] == 2
+    assert predictor.stats["rows"] == 5
+
+def test_predictor_errors_reach_every_caller():
+    def fail(X):
+        raise RuntimeError("model broken")
+
+    async def run():
+        predictor = BatchingPredictor(fail, max_wait_ms=5, workers=1)
+        results = await asyncio.gather(*(predictor.submit(np.ones(3)) for _ in range(3)), return_exceptions=True)
+        await predictor.aclose()
+        return results
+
+    assert all(isinstance(result, RuntimeError) for result in asyncio.run(run()))
+
+def test_aclose_waits_for_running_batches():
+    def slow(X):
+        time.sleep(0.05)
+        return row_sums(X)
+
+    async def run():
+        predictor = BatchingPredictor(slow, max_wait_ms=1, workers=1)
+        pending = asyncio.ensure_future(predictor.submit(np.ones(3)))
+        await asyncio.sleep(0.01)  # dispatched, now running in the worker
+        await predictor.aclose()
+        return await asyncio.wait_for(pending, 1)
+
+    assert asyncio.run(run()) == 3.0
+
+def test_restart_fails_requests_of_a_dead_loop():
+    async def run():
+        predictor = BatchingPredictor(row_sums, workers=1)
+        assert await predictor.submit(np.ones(3)) == 3.0
+        predictor.batch_task.cancel()
+        await asyncio.sleep(0)
+        orphan = asyncio.get_running_loop().create_future()
+        predictor.queue.put_nowait((np.ones(3), orphan))
+        assert await predictor.submit(np.full(3, 2.0)) == 6.0
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(orphan, 1)
+        await predictor.aclose()
+
+    asyncio.run(run())
@@ -0,0 +1,92 @@
+import asyncio
+from app.core.device_registry import DeviceState
+from app.core.inference_scheduler import InferenceScheduler
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+        self.release = asyncio.Event()
+
+    async def __call__(self, device, magnitude):
+        self.calls.append((device.device_id, magnitude))
+        await self.release.wait()
+
+class Gate:
+    def __init__(self, allow):
+        self.allow = allow
+
+    def should_score(self, device):
+        return self.allow
+
+    def snapshot(self):
+        return {}
+
+def test_windows_are_requested_every_hop_packets():
+    async def run():
+        recorder = Recorder()
+        recorder.release.set()
+        scheduler = InferenceScheduler(recorder, hop=5)
+        device = DeviceState("a")
+        for magnitude in range(12):
+            scheduler.notify(device, magnitude)
+            await asyncio.sleep(0)
+        scheduler.notify(device, 99, packets=10)  # a batch counts all of its packets
+        await asyncio.sleep(0)
+        return recorder.calls, scheduler.stats
+
+    calls, stats = asyncio.run(run())
+    assert calls == [("a", 4), ("a", 9), ("a", 99)]
+    assert stats["requested"] == 3
+
+def test_requests_during_a_run_coalesce_into_one_pending_run():
+    async def run():
+        recorder = Recorder()
+        scheduler = InferenceScheduler(recorder, hop=1)
+        device = DeviceState("a")
+        scheduler.notify(device, 1.0)
+        await asyncio.sleep(0)
+        for magnitude in (2.0, 3.0, 4.0):
+            scheduler.notify(device, magnitude)
+        recorder.release.set()
+        while device.inference_task is not None:
+            await asyncio.sleep(0)
+        return recorder.calls, scheduler.stats, scheduler.in_flight
+
+    calls, stats, in_flight = asyncio.run(run())
+    # The pending run uses the latest magnitude, the intermediate requests are folded away
+    assert calls == [("a", 1.0), ("a", 4.0)]
+    assert stats["scheduled"] == 1 and stats["coalesced"] == 3 and stats["completed"] == 2
+    assert in_flight == 0
+
+def test_global_cap_drops_new_devices():
+    async def run():
+        recorder = Recorder()
+        scheduler = InferenceScheduler(recorder, hop=1, max_in_flight=2)
+        for device_id in "abc":
+            scheduler.notify(DeviceState(device_id), 1.0)
+        await asyncio.sleep(0)
+        stats = dict(scheduler.stats)
+        recorder.release.set()
+        await asyncio.sleep(0.01)
+        return recorder.calls, stats
+
+    calls, stats = asyncio.run(run())
+    assert [device_id for device_id, _ in calls] == ["a", "b"]
+    assert stats["dropped"] == 1
+
+def test_gate_skips_idle_windows_and_failures_are_counted():
+    async def failing(device, magnitude):
+        raise RuntimeError("model broken")
+
+    async def run():
+        gated = InferenceScheduler(failing, hop=1, gate=Gate(False))
+        gated.notify(DeviceState("a"), 1.0)
+        scheduler = InferenceScheduler(failing, hop=1, gate=Gate(True))
+        device = DeviceState("b")
+        scheduler.notify(device, 1.0)
+        await asyncio.sleep(0.01)
+        return gated.stats, scheduler.stats, device.inference_task
+
+    gated, stats, task = asyncio.run(run())
+    assert gated["gated"] == 1 and gated["scheduled"] == 0
+    assert stats["failed"] == 1 and task is None
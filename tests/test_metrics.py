@@ -0,0 +1,28 @@
+import math
+from app.core.metrics import Counter, Gauge, Histogram, Registry
+
+def test_special_values_use_prometheus_spelling():
+    registry = Registry()
+    values = {("nan",): math.nan, ("pos",): math.inf, ("neg",): -math.inf}
+    Gauge("special", "special values", ["kind"], function=lambda: values, registry=registry)
+    text = registry.render()
+    assert 'special{kind="nan"} NaN\n' in text
+    assert 'special{kind="pos"} +Inf\n' in text
+    assert 'special{kind="neg"} -Inf\n' in text
+
+def test_numbers_and_histogram_buckets():
+    registry = Registry()
+    counter = Counter("requests_total", "requests", registry=registry)
+    counter.inc()
+    counter.inc(2)
+    histogram = Histogram("latency_seconds", "latency", buckets=(0.1, 1.0), registry=registry)
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5.0)
+    text = registry.render()
+    assert "requests_total 3\n" in text
+    assert 'latency_seconds_bucket{le="0.1"} 1\n' in text
+    assert 'latency_seconds_bucket{le="1"} 2\n' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3\n' in text
+    assert "latency_seconds_sum 5.55\n" in text
+    assert "latency_seconds_count 3\n" in text
@@ -0,0 +1,114 @@
+import asyncio
+import pytest
+from app.core.walrus_outbox import WalrusOutbox
+
+class FakeClient:
+    def __init__(self, failures=0, delay=0.0):
+        self.failures = failures
+        self.delay = delay
+        self.published = []
+
+    async def publish_blob(self, data, data_type="event", epochs=1):
+        await asyncio.sleep(self.delay)
+        if self.failures:
+            self.failures -= 1
+            return None
+        self.published.append((data_type, data))
+        return f"blob{len(self.published)}"
+
+async def wait_until(predicate, timeout=3.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        assert loop.time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+@pytest.fixture
+def outbox_path(tmp_path):
+    return str(tmp_path / "outbox.sqlite3")
+
+def test_published_events_notify_listeners(outbox_path):
+    async def run():
+        client = FakeClient()
+        outbox = WalrusOutbox(client, path=outbox_path, base_backoff=0.01)
+        published = []
+
+        async def listener(ids, blob_id, data_type):
+            published.append((ids, blob_id, data_type))
+
+        outbox.listeners.append(listener)
+        outbox.start()
+        event_id = await outbox.enqueue({"risk": "KRİTİK"})
+        await wait_until(lambda: published)
+        pending = await outbox.pending()
+        await outbox.stop()
+        return event_id, published, pending
+
+    event_id, published, pending = asyncio.run(run())
+    assert published == [([event_id], "blob1", "event")]
+    assert pending == 0
+
+def test_failed_publishes_are_retried_with_backoff(outbox_path):
+    async def run():
+        client = FakeClient(failures=2)
+        outbox = WalrusOutbox(client, path=outbox_path, base_backoff=0.05, max_backoff=0.1)
+        outbox.start()
+        await outbox.enqueue({"n": 1})
+        await wait_until(lambda: client.published)
+        await outbox.stop()
+        return outbox.stats, outbox._execute(lambda db: db.execute("SELECT attempts, last_error FROM outbox").fetchone())
+
+    stats, row = asyncio.run(run())
+    assert stats["failed_attempts"] == 2
+    assert stats["published"] == 1
+    assert row == (3, None)
+
+def test_events_are_batched_by_type(outbox_path):
+    async def run():
+        client = FakeClient()
+        outbox = WalrusOutbox(client, path=outbox_path, batch_size=3)
+        for n in range(3):
+            await outbox.enqueue({"n": n})
+        outbox.start()
+        await wait_until(lambda: outbox.stats["published"] == 3)
+        await outbox.stop()
+        return client.published
+
+    published = asyncio.run(run())
+    assert len(published) == 1
+    data_type, data = published[0]
+    assert data_type == "event_batch"
+    assert [event["data"]["n"] for event in data["events"]] == [0, 1, 2]
+
+def test_unpublished_rows_survive_a_restart(outbox_path):
+    async def run():
+        slow = FakeClient(delay=10)
+        outbox = WalrusOutbox(slow, path=outbox_path)
+        outbox.start()
+        await outbox.enqueue({"n": 1})
+        await wait_until(lambda: outbox._publish_tasks)
+        # The publish cannot finish within the timeout, so it is cancelled and left pending
+        await outbox.stop(timeout=0.05)
+        assert not outbox._publish_tasks
+
+        client = FakeClient()
+        restarted = WalrusOutbox(client, path=outbox_path)
+        assert await restarted.pending() == 1
+        restarted.start()
+        await wait_until(lambda: client.published)
+        await restarted.stop()
+        return client.published
+
+    assert asyncio.run(run()) == [("event", {"n": 1})]
+
+def test_stop_waits_for_running_publishes(outbox_path):
+    async def run():
+        client = FakeClient(delay=0.1)
+        outbox = WalrusOutbox(client, path=outbox_path)
+        outbox.start()
+        await outbox.enqueue({"n": 1})
+        await wait_until(lambda: outbox._publish_tasks)
+        await outbox.stop()
+        return outbox.stats["published"]
+
+    assert asyncio.run(run()) == 1
@@ -0,0 +1,97 @@
+import asyncio
+import json
+from app.api.websocket_handler import DROP_NEW, DROP_OLDEST, LATEST, ConnectionManager
+
+class BlockedWebSocket:
+    """Accepts one frame and then never finishes sending, like a client that stopped reading."""
+    def __init__(self):
+        self.sent = []
+        self.closed = False
+        self.release = asyncio.Event()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+        await self.release.wait()
+
+    async def close(self):
+        self.closed = True
+
+async def stalled_client(manager, topics=None):
+    websocket = BlockedWebSocket()
+    await manager.connect(websocket, topics=topics)
+    await manager.broadcast({"n": 0})
+    await asyncio.sleep(0)  # the writer takes frame 0 and blocks on it
+    return websocket, manager.clients[websocket]
+
+def queued(client):
+    return [json.loads(frame)["n"] for frame in list(client.queue._queue)]
+
+def run_policy(policy):
+    async def run():
+        manager = ConnectionManager(queue_size=3, overflow_policy=policy, max_consecutive_drops=0)
+        _, client = await stalled_client(manager)
+        for n in range(1, 6):
+            await manager.broadcast({"n": n})
+        return queued(client), client.dropped
+
+    return asyncio.run(run())
+
+def test_drop_oldest_keeps_the_newest_frames():
+    assert run_policy(DROP_OLDEST) == ([3, 4, 5], 2)
+
+def test_drop_new_keeps_the_oldest_frames():
+    assert run_policy(DROP_NEW) == ([1, 2, 3], 2)
+
+def test_latest_discards_the_backlog_on_overflow():
+    # Frame 4 overflows and replaces 1-3, frame 5 fits behind it
+    assert run_policy(LATEST) == ([4, 5], 1)
+
+def test_client_overflowing_in_a_row_is_disconnected_and_closed():
+    async def run():
+        manager = ConnectionManager(queue_size=2, overflow_policy=DROP_OLDEST, max_consecutive_drops=3)
+        websocket, _ = await stalled_client(manager)
+        for n in range(1, 6):
+            await manager.broadcast({"n": n})
+        await asyncio.sleep(0)
+        return manager, websocket
+
+    manager, websocket = asyncio.run(run())
+    assert websocket not in manager.clients
+    assert websocket.closed
+    assert manager.stats["slow_disconnects"] == 1
+
+def test_messages_reach_only_subscribed_topics():
+    async def run():
+        manager = ConnectionManager()
+        emergency, everything = BlockedWebSocket(), BlockedWebSocket()
+        emergency.release.set()
+        everything.release.set()
+        await manager.connect(emergency, topics=["emergency"])
+        await manager.connect(everything)
+        await manager.broadcast({"n": 1}, topics=("predictions",))
+        await manager.broadcast({"n": 2}, topics=("predictions", "emergency"))
+        await asyncio.sleep(0.01)
+        return emergency.sent, everything.sent, manager.stats["encodes"]
+
+    emergency, everything, encodes = asyncio.run(run())
+    assert emergency == [{"n": 2}]
+    assert everything == [{"n": 1}, {"n": 2}]
+    assert encodes == 2
+
+def test_malformed_subscribe_is_answered_with_an_error():
+    async def run():
+        manager = ConnectionManager()
+        websocket = BlockedWebSocket()
+        websocket.release.set()
+        await manager.connect(websocket, topics=["predictions"])
+        await manager.handle_command(websocket, '{"subscribe": "emergency"}')
+        await manager.handle_command(websocket, '{"subscribe": ["emergency"]}')
+        await asyncio.sleep(0.01)
+        return websocket.sent
+
+    error, ack = asyncio.run(run())
+    assert "error" in error
+    assert ack["subscribed"] == ["emergency", "predictions"]